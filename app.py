@@ -1,12 +1,23 @@
+import time
+_import_start = time.perf_counter()
+
 import streamlit as st
 import tempfile
-import zipfile
 from pathlib import Path
 from io import BytesIO
+from parsers import load_spec
 from parsers.openapi import parse_openapi
 from parsers.word import parse_word_doc
-from llm.generator import generate_code_from_description
-from templates.writer import write_generated_code
+from llm.generator import (
+    generate_code_chunked, generate_code_from_description, generate_skeleton_code, get_coalescer,
+    stream_code_from_description
+)
+from llm.archetype import select_archetype
+from llm import metrics
+from templates.writer import write_generated_code, StreamingJavaWriter, ZipSink
+
+# transformers/torch are only imported once the first generation runs
+IMPORT_SECONDS = time.perf_counter() - _import_start
 
 st.set_page_config(
     page_title="Hashira - AI Code Generator",
@@ -14,6 +25,23 @@ st.set_page_config(
     layout="wide"
 )
 
+def show_stage_metrics(snapshot):
+    """Seconds per pipeline stage, token counts and decode speed"""
+    stages = snapshot["stages"]
+    if not stages:
+        st.caption("Nothing recorded yet")
+        return
+    columns = st.columns(min(len(stages), 4))
+    for i, (stage, timer) in enumerate(sorted(stages.items(), key=lambda item: -item[1]["seconds"])):
+        columns[i % len(columns)].metric(stage, f"{timer['seconds']:.2f}s")
+    counters = snapshot["counters"]
+    decode = stages.get("decode", {}).get("seconds")
+    if counters.get("generated_tokens") and decode:
+        st.caption(
+            f"{counters.get('prompt_tokens', 0)} prompt tokens, {counters['generated_tokens']} generated "
+            f"at {counters['generated_tokens'] / decode:.1f} tokens/s"
+        )
+
 st.title("⚡ Hashira - API Code Generator")
 st.markdown("Generate Java code from API specifications using AI")
 
@@ -27,6 +55,27 @@ with st.sidebar:
     """)
     
     use_archetype = st.checkbox("Use Code Archetype", value=False)
+    spec_detail = st.selectbox(
+        "OpenAPI Detail",
+        ["summary", "full"],
+        help="full also gives the model parameters, request bodies and response schemas"
+    )
+    skeleton = st.checkbox(
+        "Skeleton Mode",
+        value=False,
+        help="Controllers, signatures and DTOs come straight from the spec (or the endpoint tables of a .docx) and the model only writes method bodies"
+    )
+    chunked = st.checkbox(
+        "Chunked Generation",
+        value=False,
+        help="Generate each operation separately in batched model calls (better for large specs)"
+    )
+    batch_size = st.slider("Batch Size", min_value=1, max_value=16, value=4, disabled=not (chunked or skeleton))
+    use_cache = st.checkbox(
+        "Use Generation Cache",
+        value=True,
+        help="Return previously generated code instantly when the same spec is submitted again"
+    )
     
     st.markdown("---")
     st.markdown("### About")
@@ -36,6 +85,14 @@ with st.sidebar:
     
     First run will download ~6GB model.
     """)
+    st.caption(f"Imports took {IMPORT_SECONDS:.2f}s")
+    with st.expander("📊 Metrics since startup"):
+        totals = metrics.collect()
+        show_stage_metrics(totals)
+        cache = totals["cache"]
+        st.caption(f"Cache hit rate {cache['hit_rate']:.0%} ({cache['hits']} hits, {cache['misses']} misses)")
+        if totals["peak_rss_bytes"] is not None:
+            st.caption(f"Peak RSS {totals['peak_rss_bytes'] / (1 << 20):.0f} MB")
 
 # Main content
 col1, col2 = st.columns([1, 1])
@@ -66,6 +123,7 @@ if st.button("🚀 Generate Code", type="primary", use_container_width=True):
     if not uploaded_file:
         st.error("Please upload an API specification file first!")
     else:
+        run_start = metrics.get_metrics().snapshot()
         try:
             # Create temporary directory for processing
             with tempfile.TemporaryDirectory() as temp_dir:
@@ -79,9 +137,9 @@ if st.button("🚀 Generate Code", type="primary", use_container_width=True):
                 
                 # Parse input file
                 if input_file.suffix in [".yaml", ".yml", ".json"]:
-                    api_description = parse_openapi(input_file)
+                    api_description = parse_openapi(input_file, spec_detail)
                 elif input_file.suffix == ".docx":
-                    api_description = parse_word_doc(input_file)
+                    api_description = parse_word_doc(input_file, spec_detail)
                 else:
                     raise ValueError("Unsupported file type")
                 
@@ -89,61 +147,92 @@ if st.button("🚀 Generate Code", type="primary", use_container_width=True):
                 
                 # Process archetype files
                 archetype_snippets = ""
+                archetype_dir = None
                 if use_archetype and archetype_files:
                     status_placeholder.info("📚 Processing archetype files...")
+                    archetype_dir = temp_path / "archetype"
+                    archetype_dir.mkdir()
                     for arch_file in archetype_files:
-                        content = arch_file.read().decode('utf-8')
-                        archetype_snippets += f"\n// FILE: {arch_file.name}\n{content}"
+                        (archetype_dir / arch_file.name).write_bytes(arch_file.read())
+                    # Only the classes and methods relevant to the API go into the prompt
+                    archetype_snippets = select_archetype(archetype_dir, api_description, persist=False)
                     st.success(f"✅ Loaded {len(archetype_files)} archetype files")
                 
+                # Java files go straight into the download archive, not to disk
+                zip_buffer = BytesIO()
+                output = ZipSink(zip_buffer)
+                
                 # Generate code
                 status_placeholder.info("🤖 Generating code with AI model... (this may take a minute)")
-                with st.spinner("Running AI model..."):
-                    generated_code = generate_code_from_description(api_description, archetype_snippets)
+                if skeleton:
+                    with st.spinner("Generating method bodies..."):
+                        generated_code = generate_skeleton_code(
+                            load_spec(input_file), archetype_snippets, batch_size, use_cache=use_cache,
+                            archetype_dir=archetype_dir
+                        )
+                    status_placeholder.info("💾 Writing Java files...")
+                    java_files = write_generated_code(generated_code, output)
+                elif chunked:
+                    with st.spinner("Running AI model..."):
+                        generated_code = generate_code_chunked(
+                            api_description, archetype_snippets, batch_size, use_cache=use_cache,
+                            archetype_dir=archetype_dir
+                        )
+                    status_placeholder.info("💾 Writing Java files...")
+                    java_files = write_generated_code(generated_code, output)
+                elif get_coalescer() is not None:
+                    # Sessions generating at the same time share one batched pipeline call
+                    with st.spinner("Running AI model..."):
+                        generated_code = generate_code_from_description(
+                            api_description, archetype_snippets, use_cache=use_cache
+                        )
+                    status_placeholder.info("💾 Writing Java files...")
+                    java_files = write_generated_code(generated_code, output)
+                else:
+                    # Render the code as it is decoded, writing each class as soon as it closes
+                    live_output = st.empty()
+                    writer = StreamingJavaWriter(output)
+                    generated_code = ""
+                    for chunk in stream_code_from_description(api_description, archetype_snippets, use_cache=use_cache):
+                        generated_code += chunk
+                        writer.feed(chunk)
+                        live_output.code(generated_code, language="java")
+                    writer.close()
+                    java_files = writer.written
+                    generated_code = generated_code.strip()
+                    live_output.empty()
+                output.close()
                 
                 st.success("✅ Code generation complete!")
-                
-                # Write generated code
-                status_placeholder.info("💾 Writing Java files...")
-                output_path = temp_path / "generated_code"
-                output_path.mkdir(exist_ok=True)
-                write_generated_code(generated_code, output_path)
+                with st.expander("📊 Where the time went"):
+                    show_stage_metrics(metrics.since(run_start))
                 
                 # Display generated code
                 st.header("📦 Generated Code")
                 
-                java_files = list(output_path.glob("*.java"))
                 
                 if java_files:
                     st.success(f"✅ Generated {len(java_files)} Java files")
                     
                     # Show code in tabs
                     if len(java_files) <= 5:
-                        tabs = st.tabs([f.name for f in java_files])
+                        tabs = st.tabs([Path(f).name for f in java_files])
                         for tab, java_file in zip(tabs, java_files):
                             with tab:
-                                code_content = java_file.read_text()
-                                st.code(code_content, language="java")
+                                st.code(output.read(java_file), language="java")
                     else:
                         # If many files, use selectbox
                         selected_file = st.selectbox(
                             "Select file to view:",
                             java_files,
-                            format_func=lambda x: x.name
+                            format_func=lambda x: Path(x).name
                         )
                         if selected_file:
-                            code_content = selected_file.read_text()
-                            st.code(code_content, language="java")
-                    
-                    # Create ZIP for download
-                    zip_buffer = BytesIO()
-                    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                        for java_file in java_files:
-                            zip_file.write(java_file, java_file.name)
+                            st.code(output.read(selected_file), language="java")
                     
                     st.download_button(
                         label="📥 Download All Files (ZIP)",
-                        data=zip_buffer.getvalue(),
+                        data=zip_buffer,
                         file_name="generated_code.zip",
                         mime="application/zip",
                         use_container_width=True
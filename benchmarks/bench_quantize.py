@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Compare fp32, int8 and bf16 inference of the main model.
+
+Each precision runs in a fresh process: it loads the model (quantizing it,
+or reading the cached int8 model), generates code greedily for a few
+operations of a spec, and reports load time, weight footprint, peak RSS,
+decode speed and how many outputs match fp32 exactly. Run it twice to time
+the int8 load from the cache as well.
+
+Downloads the model on first use.
+
+Usage:
+    python -m benchmarks.bench_quantize
+    python -m benchmarks.bench_quantize --model Salesforce/codegen-350M-mono --precisions fp32 int8
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from parsers.openapi import parse_openapi
+from llm import generator, quantize
+from llm.metrics import peak_rss_bytes
+
+def run_child(model_name, precision, spec, operations, max_new_tokens):
+    """Child process body: load, generate, print one JSON line of results"""
+    from transformers import AutoTokenizer, pipeline
+
+    start = time.perf_counter()
+    model = quantize.load_model(model_name, precision)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    pipe = pipeline("text-generation", model=model, tokenizer=tokenizer)
+    load_seconds = time.perf_counter() - start
+
+    params = dict(do_sample=False, max_new_tokens=max_new_tokens)
+    prompts = [generator.build_prompt(unit) for unit in generator.split_operations(parse_openapi(spec))[:operations]]
+    outputs, tokens, seconds = [], 0, 0.0
+    for prompt in prompts:
+        start = time.perf_counter()
+        text = pipe(prompt, return_full_text=False, **params)[0]["generated_text"]
+        seconds += time.perf_counter() - start
+        tokens += len(tokenizer.encode(text, add_special_tokens=False))
+        outputs.append(text)
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "footprint_bytes": quantize.footprint_bytes(model),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "tokens_per_second": tokens / seconds if seconds else 0.0,
+        "outputs": outputs,
+    }))
+
+def measure(args, precision):
+    result = subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.bench_quantize", "--child", precision, "--model", args.model,
+            "--spec", args.spec, "--operations", str(args.operations), "--max-new-tokens", str(args.max_new_tokens),
+        ],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        last_line = (result.stderr.strip().splitlines() or ["failed"])[-1]
+        print(f"⚠️  {precision}: {last_line}")
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and decode speed of int8 and bf16 inference against fp32")
+    parser.add_argument("--model", type=str, default=generator.DEFAULT_MODEL, help="Model to compare")
+    parser.add_argument("--precisions", nargs="+", choices=quantize.PRECISIONS, default=list(quantize.PRECISIONS), help="Precisions to run (default: all)")
+    parser.add_argument("--spec", type=str, default="tests/sample_api.yaml", help="OpenAPI spec to generate from")
+    parser.add_argument("--operations", type=int, default=3, help="Operations to generate (default: 3)")
+    parser.add_argument("--max-new-tokens", type=int, default=200, help="Tokens per operation (default: 200)")
+    parser.add_argument("--child", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.model, args.child, Path(args.spec), args.operations, args.max_new_tokens)
+        return
+
+    print(f"{args.model}, {args.operations} operations, {args.max_new_tokens} new tokens each")
+    results = {precision: measure(args, precision) for precision in args.precisions}
+    reference = results.get("fp32")
+    for precision, result in results.items():
+        if result is None:
+            continue
+        line = (
+            f"  {precision:<5} load {result['load_seconds']:>6.1f}s   weights {result['footprint_bytes'] / (1 << 20):>7.0f} MB   "
+            f"peak RSS {result['peak_rss_bytes'] / (1 << 20):>7.0f} MB   {result['tokens_per_second']:>6.1f} tokens/s"
+        )
+        if reference and precision != "fp32":
+            same = sum(a == b for a, b in zip(result["outputs"], reference["outputs"]))
+            line += (
+                f"   {reference['footprint_bytes'] / result['footprint_bytes']:.1f}x smaller, "
+                f"{result['tokens_per_second'] / reference['tokens_per_second']:.2f}x speed, "
+                f"{same}/{len(reference['outputs'])} outputs as fp32"
+            )
+        print(line)
+
+if __name__ == "__main__":
+    main()
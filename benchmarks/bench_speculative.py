@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Compare plain greedy decoding with draft-assisted decoding.
+
+Generates code for each operation of a spec twice with the main model, once
+alone and once with --draft verifying its proposals, and reports latency,
+speedup and draft acceptance. Fails if any assisted output differs from the
+plain greedy one.
+
+Downloads both models on first use.
+
+Usage:
+    python -m benchmarks.bench_speculative --draft bigcode/tiny_starcoder_py
+    python -m benchmarks.bench_speculative --model gpt2-large --draft distilgpt2 --operations 4
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+from parsers.openapi import parse_openapi
+from llm import generator, speculative
+
+def decode(pipe, prompt, params):
+    with speculative.assist(pipe) as assist:
+        start = time.perf_counter()
+        text = pipe(prompt, return_full_text=False, **params, **assist.kwargs)[0]["generated_text"]
+        seconds = time.perf_counter() - start
+        assist.generated_tokens = len(pipe.tokenizer.encode(text, add_special_tokens=False))
+    return text, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare greedy decoding with and without a draft model")
+    parser.add_argument("--model", type=str, default=generator.DEFAULT_MODEL, help="Main model")
+    parser.add_argument("--draft", type=str, required=True, help="Draft model sharing the main model's tokenizer")
+    parser.add_argument("--spec", type=str, default="tests/sample_api.yaml", help="OpenAPI spec to generate from")
+    parser.add_argument("--operations", type=int, default=3, help="Operations to generate (default: 3)")
+    parser.add_argument("--max-new-tokens", type=int, default=200, help="Tokens per operation (default: 200)")
+    args = parser.parse_args()
+
+    from transformers import pipeline
+    pipe = pipeline("text-generation", model=args.model)
+    generator.set_pipeline(pipe, args.model)
+    params = speculative.greedy(dict(generator.GENERATION_KWARGS, max_new_tokens=args.max_new_tokens))
+
+    units = generator.split_operations(parse_openapi(Path(args.spec)))[:args.operations]
+    prompts = [generator.build_prompt(unit) for unit in units]
+
+    os.environ.pop("HASHIRA_DRAFT_MODEL", None)
+    plain = [decode(pipe, prompt, params) for prompt in prompts]
+
+    os.environ["HASHIRA_DRAFT_MODEL"] = args.draft
+    if speculative.get_draft_model(pipe) is None:
+        sys.exit(1)
+    assisted = [decode(pipe, prompt, params) for prompt in prompts]
+
+    mismatches = 0
+    for i, ((plain_text, plain_seconds), (assisted_text, assisted_seconds)) in enumerate(zip(plain, assisted)):
+        same = plain_text == assisted_text
+        mismatches += not same
+        print(
+            f"operation {i}: {plain_seconds:6.2f}s plain, {assisted_seconds:6.2f}s assisted "
+            f"({plain_seconds / assisted_seconds:.2f}x){'' if same else '  ❌ output differs'}"
+        )
+
+    plain_total = sum(seconds for _, seconds in plain)
+    assisted_total = sum(seconds for _, seconds in assisted)
+    stats = speculative.stats()
+    print(f"\nTotal: {plain_total:.2f}s plain, {assisted_total:.2f}s assisted ({plain_total / assisted_total:.2f}x)")
+    print(
+        f"Draft acceptance: {stats['acceptance_rate']:.0%} "
+        f"({stats['tokens_per_target_forward']:.2f} tokens per main model pass)"
+    )
+    if mismatches:
+        print(f"❌ {mismatches} assisted outputs differ from greedy decoding")
+        sys.exit(1)
+    print("✅ Assisted outputs match greedy decoding")
+
+if __name__ == "__main__":
+    main()
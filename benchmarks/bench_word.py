@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Compare the streaming Word parser with a python-docx DOM parse.
+
+Writes synthetic manuals (about 4 sections per page) and parses each one
+in a fresh process, so peak RSS covers lxml's native memory as well as
+Python objects. The python-docx side is skipped when it is not installed.
+
+Usage:
+    python -m benchmarks.bench_word
+    python -m benchmarks.bench_word --sections 400 1600 6400 --repeat 5
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from benchmarks.synthetic import write_docx
+from llm.metrics import peak_rss_bytes
+
+PARSERS = ("stream", "python-docx")
+
+def parse_with_python_docx(path):
+    """What parse_word_doc did before streaming: load the whole DOM, join paragraph text"""
+    from docx import Document
+
+    doc = Document(path)
+    text = "\n".join(p.text for p in doc.paragraphs if p.text.strip())
+    rows = [[cell.text for cell in row.cells] for table in doc.tables for row in table.rows]
+    return text, rows
+
+def run_child(parser_name, path, repeat):
+    """Child process body: best time of repeat parses, then peak RSS"""
+    if parser_name == "stream":
+        from parsers.word import parse_word_doc
+        parse = parse_word_doc
+    else:
+        parse = parse_with_python_docx
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(path)
+        best = min(best, time.perf_counter() - start)
+    print(json.dumps({"seconds": best, "peak_rss_bytes": peak_rss_bytes()}))
+
+def measure(parser_name, path, repeat):
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_word", "--child", parser_name, str(path), "--repeat", str(repeat)],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        last_line = (result.stderr.strip().splitlines() or ["failed"])[-1]
+        print(f"⚠️  {parser_name} on {path.name}: {last_line}")
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory of the streaming Word parser against python-docx")
+    parser.add_argument("--sections", type=int, nargs="+", default=[400, 1600], help="Sections per manual (default: 400 1600, about 100 and 400 pages)")
+    parser.add_argument("--repeat", type=int, default=3, help="Parses per process; the fastest is kept (default: 3)")
+    parser.add_argument("--child", nargs=2, metavar=("PARSER", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], Path(args.child[1]), args.repeat)
+        return
+
+    try:
+        import docx  # noqa: F401
+        parsers = PARSERS
+    except ImportError:
+        print("⚠️  python-docx is not installed; timing the streaming parser only")
+        parsers = PARSERS[:1]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for sections in args.sections:
+            path = write_docx(Path(temp_dir) / f"manual_{sections}.docx", sections)
+            with zipfile.ZipFile(path) as package:
+                xml_mb = package.getinfo("word/document.xml").file_size / 1024 / 1024
+            print(f"\n{sections} sections (~{sections // 4} pages, {xml_mb:.1f} MB of document.xml)")
+            results = {name: measure(name, path, args.repeat) for name in parsers}
+            for name, result in results.items():
+                if result is not None:
+                    print(
+                        f"  {name:<12} {result['seconds'] * 1000:>9.1f} ms   "
+                        f"peak RSS {result['peak_rss_bytes'] / 1024 / 1024:>7.1f} MB"
+                    )
+            stream, dom = results.get("stream"), results.get("python-docx")
+            if stream and dom:
+                print(
+                    f"  streaming is {dom['seconds'] / stream['seconds']:.2f}x faster and peaks at "
+                    f"{stream['peak_rss_bytes'] / dom['peak_rss_bytes']:.0%} of python-docx's RSS"
+                )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark the generated-code writer on multi-megabyte model outputs.
+
+Builds synthetic Java output (controllers with nested method bodies,
+braces inside strings and comments, prose between classes), then times
+the splitter on the whole string and fed token-sized chunks, plus
+write_generated_code end to end.
+
+Usage: python -m benchmarks.bench_writer [--megabytes 1 4 16]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from templates.writer import JavaTypeSplitter, write_generated_code
+
+METHOD = '''
+    @GetMapping("/items/{id}")
+    public ResponseEntity<String> getNUM(@PathVariable long id) {
+        // braces in comments } and strings "}{" must not end the class
+        if (id < 0) {
+            throw new IllegalArgumentException("bad id: {" + id + "}");
+        }
+        for (int i = 0; i < 3; i++) { total += i; }
+        return ResponseEntity.ok("item-" + id);
+    }
+'''
+
+def synthetic_output(megabytes):
+    """Java source of roughly the given size, as a model would emit it"""
+    parts = ["Here is the implementation:\n```java\npackage com.example.api;\n\nimport java.util.*;\n\n"]
+    size, n = 0, 0
+    while size < megabytes * 1024 * 1024:
+        body = "".join(METHOD.replace("NUM", str(n * 10 + m)) for m in range(10))
+        part = f"@RestController\npublic class Controller{n} {{\n    private int total;\n{body}}}\n\nNext class:\n"
+        parts.append(part)
+        size += len(part)
+        n += 1
+    parts.append("```\n")
+    return "".join(parts), n
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def split_whole(code):
+    splitter = JavaTypeSplitter()
+    return splitter.feed(code) + splitter.close()
+
+def split_streamed(code, chunk_size):
+    splitter = JavaTypeSplitter()
+    types = []
+    for i in range(0, len(code), chunk_size):
+        types += splitter.feed(code[i:i + chunk_size])
+    return types + splitter.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JavaTypeSplitter and write_generated_code")
+    parser.add_argument("--megabytes", type=float, nargs="+", default=[1, 4, 16], help="Sizes of synthetic output to test")
+    parser.add_argument("--chunk-size", type=int, default=16, help="Characters per fed chunk in the streamed run (default: 16, about 4 tokens)")
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'classes':>8} {'split':>12} {'streamed':>12} {'write':>12}")
+    for megabytes in args.megabytes:
+        code, classes = synthetic_output(megabytes)
+        mb = len(code) / (1024 * 1024)
+
+        split_seconds, types = timed(lambda: split_whole(code))
+        stream_seconds, streamed = timed(lambda: split_streamed(code, args.chunk_size))
+        assert len(types) == len(streamed) == classes, f"expected {classes} classes, got {len(types)}/{len(streamed)}"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            write_seconds, written = timed(lambda: write_generated_code(code, Path(temp_dir)))
+            assert len(written) == classes
+
+        print(
+            f"{mb:>6.1f}MB {classes:>8} {mb / split_seconds:>8.1f}MB/s "
+            f"{mb / stream_seconds:>8.1f}MB/s {mb / write_seconds:>8.1f}MB/s"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Cold-start regression check for the MCP server.
+
+Launches server.py as a fresh process and times the MCP handshake plus
+the parse tools over stdio, the way a client would see them. Fails when
+any step exceeds its bound, when a parse tool does not find the sample's
+endpoint or when startup imported transformers/torch.
+
+Usage: python -m benchmarks.cold_start [--max-seconds 5]
+"""
+import argparse
+import json
+import queue
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SAMPLE_SPEC = ROOT / "tests" / "sample_api.yaml"
+SAMPLE_DOC = ROOT / "tests" / "sample_doc.docx"
+HEAVY_MODULES = ("transformers", "torch")
+
+class StdioClient:
+    """Minimal newline-delimited JSON-RPC client for an MCP stdio server"""
+
+    def __init__(self, command):
+        self.process = subprocess.Popen(
+            command, cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+        self._next_id = 0
+
+    def _read(self):
+        for line in self.process.stdout:
+            self._lines.put(line)
+
+    def notify(self, method, params=None):
+        self._send({"jsonrpc": "2.0", "method": method, "params": params or {}})
+
+    def call(self, method, params, timeout):
+        self._next_id += 1
+        request_id = self._next_id
+        self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"{method} did not answer within {timeout:.1f}s")
+            try:
+                message = json.loads(self._lines.get(timeout=remaining))
+            except queue.Empty:
+                continue
+            if message.get("id") == request_id:
+                if "error" in message:
+                    raise RuntimeError(f"{method} failed: {message['error']}")
+                return message["result"]
+
+    def _send(self, message):
+        self.process.stdin.write(json.dumps(message) + "\n")
+        self.process.stdin.flush()
+
+    def close(self):
+        self.process.kill()
+        self.process.wait()
+
+def heavy_imports():
+    """Modules from HEAVY_MODULES that importing the server pulls in"""
+    code = "import sys, server; print(','.join(m for m in %r if m in sys.modules))" % (HEAVY_MODULES,)
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return [m for m in output.stdout.strip().split(",") if m]
+
+def measure(timeout):
+    timings = {}
+    start = time.perf_counter()
+    client = StdioClient([sys.executable, "server.py"])
+    try:
+        client.call("initialize", {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {"name": "hashira-cold-start", "version": "0"},
+        }, timeout)
+        client.notify("notifications/initialized")
+        timings["handshake"] = time.perf_counter() - start
+
+        step = time.perf_counter()
+        client.call("tools/list", {}, timeout)
+        timings["list_tools"] = time.perf_counter() - step
+
+        for tool, path, operation in (
+            ("parse_openapi_spec", SAMPLE_SPEC, "GET /hello"),
+            ("parse_word_api_doc", SAMPLE_DOC, "GET /greet"),
+        ):
+            step = time.perf_counter()
+            result = client.call("tools/call", {"name": tool, "arguments": {"file_path": str(path)}}, timeout)
+            timings[tool] = time.perf_counter() - step
+            # A fast error answer must not pass for a fast parse
+            text = result["content"][0]["text"]
+            if operation not in text:
+                raise RuntimeError(f"{tool} did not find {operation} in {path.name}: {text[:200]}")
+    finally:
+        client.close()
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Bound the MCP server cold start and parse tool latency")
+    parser.add_argument("--max-seconds", type=float, default=5.0, help="Upper bound for handshake and for the whole run (default: 5)")
+    args = parser.parse_args()
+
+    failures = []
+    loaded = heavy_imports()
+    if loaded:
+        failures.append(f"importing server loaded {', '.join(loaded)}")
+
+    timings = measure(timeout=args.max_seconds * 2)
+    for name, seconds in timings.items():
+        print(f"{name:>20}: {seconds:.3f}s")
+    if timings["handshake"] > args.max_seconds:
+        failures.append(f"handshake took {timings['handshake']:.2f}s (limit {args.max_seconds:.2f}s)")
+    if timings["total"] > args.max_seconds:
+        failures.append(f"cold start to last parse took {timings['total']:.2f}s (limit {args.max_seconds:.2f}s)")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Cold start within bounds")
+
+if __name__ == "__main__":
+    main()
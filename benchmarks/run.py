@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of every pipeline stage.
+
+For synthetic OpenAPI specs of each size it times parsing (cold and from
+the parse cache), prompt construction, generation against StubPipeline
+(no model weights) and write_generated_code. For synthetic .docx
+manuals it times parse_word_doc. Each stage keeps the best of --repeat
+runs. Results are saved as JSON, and with --baseline the run fails when
+a stage is slower than the baseline by more than --tolerance.
+
+Usage:
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --sizes 10 100 1000 --baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Keep the benchmark's caches out of the user's cache directory
+os.environ["HASHIRA_CACHE_DIR"] = tempfile.mkdtemp(prefix="hashira-bench-")
+
+from benchmarks.synthetic import StubPipeline, write_docx, write_openapi_spec
+from parsers.openapi import load_openapi, parse_openapi
+from parsers.word import parse_word_doc
+from llm import generator
+from templates.writer import write_generated_code
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+DEFAULT_DOCX_SECTIONS = [100, 1000]
+# Differences below this are timer noise, whatever the tolerance says
+NOISE_FLOOR_SECONDS = 0.005
+
+def best_of(repeat, func):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def bench_openapi(size, work_dir, repeat, batch_size):
+    spec_path = write_openapi_spec(work_dir / f"spec_{size}.yaml", size)
+    results = {}
+
+    results["parse_openapi_cold"], _ = best_of(repeat, lambda: load_openapi(spec_path, use_cache=False))
+    parse_openapi(spec_path)
+    results["parse_openapi_cached"], description = best_of(repeat, lambda: parse_openapi(spec_path))
+
+    def build_prompts():
+        return [generator.build_prompt(unit) for unit in generator.split_operations(description)]
+    results["build_prompts"], prompts = best_of(repeat, build_prompts)
+
+    results["generate_chunked"], code = best_of(
+        repeat, lambda: generator.generate_code_chunked(description, batch_size=batch_size, use_cache=False)
+    )
+
+    def write():
+        with tempfile.TemporaryDirectory() as output_dir:
+            return write_generated_code(code, Path(output_dir))
+    results["write_generated_code"], files = best_of(repeat, write)
+
+    assert len(files) == len(prompts), f"expected {len(prompts)} files, wrote {len(files)}"
+    return {f"{stage}/{size}": seconds for stage, seconds in results.items()}
+
+def bench_docx(sections, work_dir, repeat):
+    doc_path = write_docx(work_dir / f"doc_{sections}.docx", sections)
+    seconds, _ = best_of(repeat, lambda: parse_word_doc(doc_path))
+    return {f"parse_word_doc/{sections}": seconds}
+
+def compare(results, baseline, tolerance):
+    """Stages slower than baseline * (1 + tolerance), ignoring timer noise"""
+    regressions = []
+    for key, seconds in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        if seconds > reference * (1 + tolerance) and seconds - reference > NOISE_FLOOR_SECONDS:
+            regressions.append((key, reference, seconds))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every Hashira pipeline stage on synthetic inputs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Operations per synthetic OpenAPI spec")
+    parser.add_argument("--docx-sections", type=int, nargs="*", default=DEFAULT_DOCX_SECTIONS, help="Sections per synthetic .docx manual (about 4 per page)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest is kept (default: 3)")
+    parser.add_argument("--batch-size", type=int, default=8, help="Batch size for chunked generation (default: 8)")
+    parser.add_argument("--output", type=str, default=None, help="Write results to this JSON file")
+    parser.add_argument("--baseline", type=str, default=None, help="Fail if any stage is slower than in this results file")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown against --baseline, as a fraction (default: 0.5)")
+    args = parser.parse_args()
+
+    generator.set_pipeline(StubPipeline(), "stub")
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = Path(temp_dir)
+        for size in args.sizes:
+            results.update(bench_openapi(size, work_dir, args.repeat, args.batch_size))
+        for sections in args.docx_sections:
+            results.update(bench_docx(sections, work_dir, args.repeat))
+
+    width = max(len(key) for key in results)
+    for key, seconds in results.items():
+        print(f"{key:<{width}} {seconds * 1000:>10.2f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for key, reference, seconds in regressions:
+            print(f"❌ {key}: {seconds * 1000:.2f} ms vs baseline {reference * 1000:.2f} ms")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No stage slower than baseline by more than {args.tolerance:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Synthetic inputs for the benchmarks: OpenAPI specs with any number of
+operations and large .docx files, plus a stand-in for the model pipeline.
+"""
+import random
+import zipfile
+import zlib
+from xml.sax.saxutils import escape
+
+import yaml
+
+RESOURCES = ["users", "orders", "products", "invoices", "payments", "shipments", "reviews", "carts"]
+METHODS = ["get", "post", "put", "delete", "patch"]
+
+def make_openapi_spec(operations, seed=0):
+    """OpenAPI document with the given number of operations.
+
+    Every resource gets a component schema that its operations reference
+    through $ref, so resolution cost scales with the spec like it does in
+    real specs.
+    """
+    rng = random.Random(seed)
+    schemas = {}
+    for resource in RESOURCES:
+        name = resource[:-1].title()
+        schemas[name] = {
+            "type": "object",
+            "required": ["id"],
+            "properties": {
+                "id": {"type": "integer", "format": "int64"},
+                "name": {"type": "string"},
+                "createdAt": {"type": "string", "format": "date-time"},
+                "tags": {"type": "array", "items": {"type": "string"}},
+            },
+        }
+
+    paths, count, n = {}, 0, 0
+    while count < operations:
+        resource = RESOURCES[n % len(RESOURCES)]
+        ref = {"$ref": f"#/components/schemas/{resource[:-1].title()}"}
+        path = f"/{resource}/v{n // len(RESOURCES)}/{{id}}"
+        item = {}
+        for method in rng.sample(METHODS, k=min(len(METHODS), operations - count)):
+            operation = {
+                "summary": f"{method.title()} {resource} variant {n}",
+                "operationId": f"{method}{resource.title()}{n}",
+                "tags": [resource],
+                "parameters": [
+                    {"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}},
+                    {"name": "expand", "in": "query", "schema": {"type": "string"}},
+                ],
+                "responses": {"200": {"description": "OK", "content": {"application/json": {"schema": ref}}}},
+            }
+            if method in ("post", "put", "patch"):
+                operation["requestBody"] = {"content": {"application/json": {"schema": ref}}}
+            item[method] = operation
+            count += 1
+        paths[path] = item
+        n += 1
+
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": f"Synthetic API ({operations} operations)", "version": "1.0.0"},
+        "paths": paths,
+        "components": {"schemas": schemas},
+    }
+
+def write_openapi_spec(path, operations, seed=0):
+    with open(path, "w") as f:
+        yaml.safe_dump(make_openapi_spec(operations, seed), f, sort_keys=False)
+    return path
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+</Types>"""
+
+_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+_W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+def _paragraph(text, style=None):
+    props = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    return f'<w:p>{props}<w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+def _table(rows):
+    cells = "".join(
+        "<w:tr>" + "".join(f"<w:tc>{_paragraph(cell)}</w:tc>" for cell in row) + "</w:tr>" for row in rows
+    )
+    return f"<w:tbl>{cells}</w:tbl>"
+
+def write_docx(path, sections, seed=0):
+    """API manual with one heading, prose and an endpoint table per section.
+
+    The package is written directly as OOXML parts, so building a
+    400-page document takes a fraction of a second and needs no python-docx.
+    """
+    rng = random.Random(seed)
+    body = []
+    for n in range(sections):
+        resource = RESOURCES[n % len(RESOURCES)]
+        body.append(_paragraph(f"{resource.title()} API, part {n}", "Heading1"))
+        for _ in range(4):
+            body.append(_paragraph(
+                f"The {resource} endpoints manage {resource} records. " * rng.randint(2, 6)
+            ))
+        body.append(_table([["Method", "Path", "Description"]] + [
+            [method.upper(), f"/{resource}/v{n}/{{id}}", f"{method.title()} a {resource[:-1]}"]
+            for method in rng.sample(METHODS, 3)
+        ]))
+    document = f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document xmlns:w="{_W}"><w:body>{"".join(body)}</w:body></w:document>'
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        docx.writestr("_rels/.rels", _RELS)
+        docx.writestr("word/document.xml", document)
+    return path
+
+class StubPipeline:
+    """Stand-in for the transformers text-generation pipeline.
+
+    Accepts the same call signature and answers each prompt with a Java
+    controller that has one method per operation in the prompt (or a short
+    body for skeleton method prompts), so the stages around the model can be
+    timed without loading any weights.
+    """
+
+    class _Tokenizer:
+        pad_token_id = 0
+        padding_side = "left"
+
+    tokenizer = _Tokenizer()
+
+    def _complete(self, prompt):
+        if "body of the Spring Boot controller method" in prompt:
+            return "// Stub body\nreturn ResponseEntity.ok().build();\n}\n"
+        operations = [line.strip() for line in prompt.splitlines() if line.startswith("- ") and "/" in line]
+        methods = "".join(
+            f'    // {operation}\n    public ResponseEntity<String> op{i}() {{\n        return ResponseEntity.ok("{i}");\n    }}\n'
+            for i, operation in enumerate(operations)
+        )
+        name = f"Stub{zlib.crc32(prompt.encode())}Controller"
+        return f"package com.example.api;\n\n@RestController\npublic class {name} {{\n{methods}}}\n"
+
+    def __call__(self, prompts, return_full_text=True, **kwargs):
+        if isinstance(prompts, str):
+            text = self._complete(prompts)
+            return [{"generated_text": prompts + text if return_full_text else text}]
+        return [[{"generated_text": self._complete(prompt)}] for prompt in prompts]
@@ -1,42 +1,202 @@
 # -*- coding: utf-8 -*-
+import time
+_import_start = time.perf_counter()
+
 import argparse
 import os
 from pathlib import Path
+from parsers import load_spec
 from parsers.openapi import parse_openapi
 from parsers.word import parse_word_doc
-from llm.generator import generate_code_from_description
+from llm.generator import generate_code_from_description, generate_code_chunked, generate_units, generate_skeleton_code
+from llm.incremental import regenerate_incremental
+from llm.batch import discover_jobs, run_batch, format_report
+from llm.cache import get_cache
+from llm import daemon, metrics
+from llm.replicas import configured_replicas, format_stats, get_replica_pool
+from llm.archetype import select_archetype
 from templates.writer import write_generated_code
 
+# Nothing above loads transformers/torch; that only happens on in-process generation
+IMPORT_SECONDS = time.perf_counter() - _import_start
+
+def _run(args, op, local, **kwargs):
+    """Run op on the --replicas pool, else on a hashira-daemon if one is
+    listening, else call local in-process.
+
+    Returns the result and the cache statistics of whichever process ran it;
+    the replicas' and the daemon's stage timings are merged into this
+    process's metrics.
+    """
+    pool = get_replica_pool()
+    if pool is not None:
+        return pool.run(op, **kwargs), pool.cache_stats()
+    if not args.no_daemon:
+        try:
+            response = daemon.request(op, **kwargs)
+            print(f"⚡ Generated by hashira-daemon ({response['model']})")
+            metrics.get_metrics().merge(response.get("metrics", {}))
+            return response["result"], response["cache"]
+        except daemon.DaemonUnavailable:
+            pass
+    return local(**kwargs), get_cache().stats()
+
+def _archetype_dir(args):
+    # Absolute, because the daemon does not share our working directory
+    return str(Path(args.archetype).resolve()) if args.archetype else None
+
+def generate(args, api_description, archetype_snippets, archetype_dir=None):
+    """Generate code for the whole description in one prompt or in chunks"""
+    kwargs = {"api_desc": api_description, "archetype": archetype_snippets, "use_cache": not args.no_cache}
+    if args.chunked:
+        # Archetype snippets are picked per work unit rather than for the whole spec
+        archetype_dir = str(Path(archetype_dir).resolve()) if archetype_dir else _archetype_dir(args)
+        kwargs.update(batch_size=args.batch_size, group_by=args.group_by, archetype_dir=archetype_dir)
+        return _run(args, "generate_chunked", generate_code_chunked, **kwargs)
+    return _run(args, "generate", generate_code_from_description, **kwargs)
+
+def generate_skeleton(args, input_path):
+    """Render controllers and DTOs from the spec and generate only the method bodies"""
+    def local(input_path, **kwargs):
+        return generate_skeleton_code(load_spec(Path(input_path)), **kwargs)
+
+    return _run(
+        args, "generate_skeleton", local,
+        input_path=str(input_path.resolve()), batch_size=args.batch_size, use_cache=not args.no_cache,
+        archetype_dir=_archetype_dir(args)
+    )
+
+def generate_incremental(args, input_path, output_path):
+    """Regenerate only the operations that changed since the last run into output_path"""
+    stats = {}
+
+    def generate(units, **kwargs):
+        results, cache_stats = _run(args, "generate_units", generate_units, units=units, **kwargs)
+        stats.update(cache_stats)
+        return results
+
+    summary = regenerate_incremental(
+        input_path, output_path, args.spec_detail, generate,
+        batch_size=args.batch_size, use_cache=not args.no_cache, archetype_dir=_archetype_dir(args)
+    )
+    return summary, stats or get_cache().stats()
+
+def generate_batch(args, output_path):
+    """Run every job of --batch against one resident model and report throughput"""
+    jobs = discover_jobs(args.batch, output_path)
+    print(f"\n📋 Batch of {len(jobs)} jobs from {args.batch}")
+
+    def generate_job(api_description, archetype_snippets, archetype_dir=None):
+        return generate(args, api_description, archetype_snippets, archetype_dir)[0]
+
+    return run_batch(
+        jobs, output_path, generate_job,
+        parse_workers=args.parse_workers, detail=args.spec_detail, archetype_dir=args.archetype,
+        resume=not args.restart, generate_workers=configured_replicas()
+    )
+
+def print_profile(cache_stats=None):
+    """Print where the run's time went, per pipeline stage"""
+    snapshot = metrics.collect()
+    if cache_stats:
+        snapshot["cache"] = cache_stats
+    print("📊 Profile:\n" + metrics.format_report(snapshot) + "\n")
+    pool = get_replica_pool()
+    if pool is not None:
+        print("🧵 Replicas:\n" + format_stats(pool.stats()) + "\n")
+
 def main():
     parser = argparse.ArgumentParser(description="Generate API code from OpenAPI or Word docs using a local LLM")
-    parser.add_argument("--input", type=str, required=True, help="Path to OpenAPI spec (.yaml/.json) or Word doc (.docx)")
+    parser.add_argument("--input", type=str, default=None, help="Path to OpenAPI spec (.yaml/.json) or Word doc (.docx)")
+    parser.add_argument("--batch", type=str, default=None, help="Generate many specs in one run: a directory, a glob pattern or a .jsonl job file; each job is written to its own folder under --output")
     parser.add_argument("--output", type=str, required=True, help="Output directory for generated code")
-    parser.add_argument("--archetype", type=str, default=None, help="Optional path to code archetype folder")
+    parser.add_argument("--archetype", type=str, default=None, help="Optional path to code archetype folder; the most relevant classes and methods are indexed and selected for the prompt")
+    parser.add_argument("--spec-detail", choices=["summary", "full"], default="summary", help="OpenAPI detail in the prompt: one line per operation, or also parameters and schemas")
+    parser.add_argument("--chunked", action="store_true", help="Generate each operation separately in batched pipeline calls")
+    parser.add_argument("--batch-size", type=int, default=4, help="Work units decoded together in --chunked mode (default: 4)")
+    parser.add_argument("--group-by", choices=["operation", "resource"], default="operation", help="How --chunked mode splits the spec into work units")
+    parser.add_argument("--skeleton", action="store_true", help="Render controllers, signatures and DTOs from the spec and only ask the model for method bodies")
+    parser.add_argument("--incremental", action="store_true", help="Only regenerate operations added or changed since the last --incremental run into --output, and delete outputs of removed ones")
+    parser.add_argument("--parse-workers", type=int, default=None, help="Processes parsing --batch inputs (default: CPU count)")
+    parser.add_argument("--restart", action="store_true", help="Rerun all --batch jobs instead of resuming after the last completed one")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk generation cache")
+    parser.add_argument("--draft-model", type=str, default=None, help="Small model with the same tokenizer that drafts tokens for the main model to verify (greedy assisted decoding); a running daemon uses its own --draft-model")
+    parser.add_argument("--precision", choices=["fp32", "int8", "bf16"], default=None, help="Load the model in fp32, with dynamic int8 quantization (cached for reuse) or in bfloat16 where the CPU supports it (default: $HASHIRA_PRECISION or fp32); a running daemon uses its own --precision")
+    parser.add_argument("--offline", action="store_true", help="Only load models from the local Hugging Face cache, never from the network")
+    parser.add_argument("--replicas", type=int, default=1, help="Run this many model replicas in separate processes, each pinned to its own share of the cores; --batch jobs and --chunked shards are spread over them (default: 1, in-process)")
+    parser.add_argument("--replica-threads", type=int, default=None, help="Torch threads per replica (default: the replica's share of the cores)")
+    parser.add_argument("--profile", action="store_true", help="Print time per stage (parse, model load, prefill, decode, write), token counts, cache hit rate and peak memory")
+    parser.add_argument("--no-daemon", action="store_true", help="Always load the model in-process, even if hashira-daemon is running")
     args = parser.parse_args()
+    if bool(args.input) == bool(args.batch):
+        parser.error("exactly one of --input or --batch is required")
+    if args.skeleton and (args.batch or args.incremental):
+        parser.error("--skeleton needs a single --input and cannot be combined with --incremental")
+    print(f"⏱️  Imports took {IMPORT_SECONDS:.2f}s")
+    if args.draft_model:
+        os.environ["HASHIRA_DRAFT_MODEL"] = args.draft_model
+    if args.precision:
+        os.environ["HASHIRA_PRECISION"] = args.precision
+    if args.offline:
+        os.environ["HASHIRA_OFFLINE"] = "1"
+    if args.replicas > 1:
+        os.environ["HASHIRA_REPLICAS"] = str(args.replicas)
+    if args.replica_threads:
+        os.environ["HASHIRA_REPLICA_THREADS"] = str(args.replica_threads)
+    metrics.observe("import", IMPORT_SECONDS)
 
-    input_path = Path(args.input)
     output_path = Path(args.output)
     output_path.mkdir(parents=True, exist_ok=True)
 
-    if input_path.suffix in [".yaml", ".yml", ".json"]:
-        api_description = parse_openapi(input_path)
-    elif input_path.suffix == ".docx":
-        api_description = parse_word_doc(input_path)
+    if args.batch:
+        report = generate_batch(args, output_path)
+        print("\n" + format_report(report))
+        print(f"\n✅ Batch complete! Report saved to: {output_path / 'batch-report.json'}\n")
+        if args.profile:
+            print_profile()
+        return
+
+    input_path = Path(args.input)
+
+    if args.incremental:
+        print("\n🔍 Comparing spec against the output manifest...")
+        summary, stats = generate_incremental(args, input_path, output_path)
+        print(
+            f"\n✅ Incremental generation complete: {summary['added']} added, {summary['changed']} changed, "
+            f"{summary['removed']} removed, {summary['unchanged']} unchanged ({summary['files_written']} files written, "
+            f"{summary['files_deleted']} deleted). Files saved to: {output_path}\n"
+        )
+        if args.profile:
+            print_profile(stats)
+        return
+
+    if args.skeleton:
+        print("\n🦴 Generating method bodies for the spec skeleton...")
+        generated_code, stats = generate_skeleton(args, input_path)
     else:
-        raise ValueError("Unsupported file type. Use .yaml, .json, or .docx")
+        if input_path.suffix in [".yaml", ".yml", ".json"]:
+            api_description = parse_openapi(input_path, args.spec_detail)
+        elif input_path.suffix == ".docx":
+            api_description = parse_word_doc(input_path, args.spec_detail)
+        else:
+            raise ValueError("Unsupported file type. Use .yaml, .json, or .docx")
+
+        archetype_snippets = ""
+        if args.archetype and not args.chunked:
+            archetype_snippets = select_archetype(args.archetype, api_description)
 
-    archetype_snippets = ""
-    if args.archetype:
-        for path in Path(args.archetype).rglob("*.java"):
-            archetype_snippets += "\n// FILE: {}\n".format(path.name) + path.read_text()
+        print("\n📤 Generating code from description...")
+        generated_code, stats = generate(args, api_description, archetype_snippets)
 
-    print("\n📤 Generating code from description...")
-    generated_code = generate_code_from_description(api_description, archetype_snippets)
+    if not args.no_cache:
+        print(f"🗄️  Cache: {stats['hits']} hits, {stats['misses']} misses ({stats['entries']} entries, {stats['bytes'] / 1024:.0f} KB)")
 
     print("\n💾 Writing generated code to output folder...")
     write_generated_code(generated_code, output_path)
 
     print(f"\n✅ Code generation complete! Files saved to: {output_path}\n")
+    if args.profile:
+        print_profile(stats)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from llm.cache import cache_root
+
+DEFAULT_TOP_K = int(os.environ.get("HASHIRA_ARCHETYPE_TOP_K", "8"))
+# Rough prompt budget for archetype snippets, in tokens
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("HASHIRA_ARCHETYPE_TOKENS", "1500"))
+# How often a loaded index re-checks its tree for changed files; one run of
+# the CLI checks once, a long-lived server picks up edits within this time
+REFRESH_SECONDS = float(os.environ.get("HASHIRA_ARCHETYPE_REFRESH_SECONDS", "30"))
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+# Bump when the chunk format changes so stale on-disk indexes are rebuilt
+INDEX_VERSION = 1
+
+_WORD = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|[0-9]+")
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for code)"""
+    return len(text) // 4 + 1
+
+def tokenize(text):
+    """Split identifiers on camelCase/snake_case and fold simple plurals,
+    so "getUserOrders" matches "GET /users/{id}/orders"."""
+    terms = []
+    for word in _WORD.findall(text):
+        word = word.lower()
+        if len(word) > 3 and word.endswith("s"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+def _skip_literal(source, i):
+    """Return the index just past the string/char literal or comment at i"""
+    if source.startswith("//", i):
+        end = source.find("\n", i)
+        return len(source) if end == -1 else end
+    if source.startswith("/*", i):
+        end = source.find("*/", i + 2)
+        return len(source) if end == -1 else end + 2
+    quote = source[i]
+    i += 1
+    while i < len(source) and source[i] != quote:
+        i += 2 if source[i] == "\\" else 1
+    return i + 1
+
+def split_chunks(source, file_name):
+    """Split a Java file into a type-level chunk and one chunk per method.
+
+    The type chunk keeps the declaration and field lines (members without a
+    body); every member with a body at depth 1 becomes its own chunk.
+    """
+    chunks, outline = [], []
+    depth, member_start, i = 0, 0, 0
+    while i < len(source):
+        c = source[i]
+        if c in "\"'" or source.startswith("//", i) or source.startswith("/*", i):
+            i = _skip_literal(source, i)
+            continue
+        if c == "{":
+            if depth == 0:
+                outline.append(source[member_start:i + 1].strip())
+                member_start = i + 1
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 1:
+                chunks.append(source[member_start:i + 1].strip())
+                member_start = i + 1
+            elif depth == 0:
+                outline.append("}")
+                member_start = i + 1
+        elif c == ";" and depth == 1:
+            outline.append(source[member_start:i + 1].strip())
+            member_start = i + 1
+        i += 1
+
+    header = f"// FILE: {file_name}\n"
+    result = [header + "\n".join(outline)] if outline else [header + source]
+    return result + [header + chunk for chunk in chunks if chunk]
+
+class ArchetypeIndex:
+    """BM25 index over class and method chunks of an archetype source tree.
+
+    Instead of pasting every archetype file into the prompt, callers ask for
+    the chunks most relevant to an endpoint, capped at top_k and at a token
+    budget, so the prompt size stays constant however big the tree is. The
+    index is saved under ~/.cache/hashira/archetypes and refreshed by file
+    mtime, so only changed files are re-chunked.
+    """
+
+    def __init__(self, root, persist=True):
+        self.root = Path(root).resolve()
+        self.persist = persist
+        digest = hashlib.sha256(str(self.root).encode("utf-8")).hexdigest()[:16]
+        self.index_path = cache_root() / "archetypes" / f"{digest}.json"
+        self.files = {}
+        # time.monotonic() of the last refresh, None before the first
+        self.refreshed = None
+        if persist:
+            self._load()
+
+    def _load(self):
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION:
+            self.files = data["files"]
+
+    def _save(self):
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.index_path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "files": self.files}, f)
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            print(f"Archetype index write failed: {str(e)}", file=sys.stderr)
+
+    def refresh(self):
+        """Re-chunk new or modified files and drop deleted ones"""
+        # Built aside and swapped in, so searches on other threads never see it change
+        files, seen, changed = dict(self.files), set(), 0
+        for path in self.root.rglob("*.java"):
+            rel = str(path.relative_to(self.root))
+            seen.add(rel)
+            stat = path.stat()
+            entry = files.get(rel)
+            if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                continue
+            text = path.read_text(encoding="utf-8", errors="replace")
+            files[rel] = {
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "chunks": [
+                    {"text": chunk, "tf": Counter(tokenize(chunk)), "length": len(tokenize(chunk))}
+                    for chunk in split_chunks(text, path.name)
+                ],
+            }
+            changed += 1
+
+        removed = [rel for rel in files if rel not in seen]
+        for rel in removed:
+            del files[rel]
+        self.files = files
+        self.refreshed = time.monotonic()
+        if (changed or removed) and self.persist:
+            self._save()
+        if changed or removed:
+            print(f"✓ Archetype index: {changed} files updated, {len(removed)} removed ({len(self.files)} files)", file=sys.stderr)
+        return self
+
+    def chunks(self):
+        for entry in self.files.values():
+            yield from entry["chunks"]
+
+    def search(self, query, top_k=DEFAULT_TOP_K):
+        """Return up to top_k (score, chunk) pairs ranked by BM25"""
+        chunks = list(self.chunks())
+        if not chunks:
+            return []
+        terms = set(tokenize(query))
+        avg_length = sum(chunk["length"] for chunk in chunks) / len(chunks) or 1
+        df = Counter(term for chunk in chunks for term in terms if term in chunk["tf"])
+
+        scored = []
+        for chunk in chunks:
+            score = 0.0
+            for term in terms:
+                tf = chunk["tf"].get(term, 0)
+                if not tf:
+                    continue
+                idf = math.log(1 + (len(chunks) - df[term] + 0.5) / (df[term] + 0.5))
+                score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * chunk["length"] / avg_length))
+            scored.append((score, chunk))
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return scored[:top_k]
+
+    def select(self, query, top_k=DEFAULT_TOP_K, token_budget=DEFAULT_TOKEN_BUDGET):
+        """Most relevant snippets for query, joined and capped at token_budget"""
+        selected, used = [], 0
+        for _, chunk in self.search(query, top_k):
+            cost = estimate_tokens(chunk["text"])
+            if used + cost > token_budget:
+                continue
+            selected.append(chunk["text"])
+            used += cost
+        return "\n\n".join(selected)
+
+# Indexes already loaded in this process, by archetype root
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_index(root, persist=True):
+    """The index of root, re-checked against the tree at most every REFRESH_SECONDS"""
+    root = Path(root).resolve()
+    with _indexes_lock:
+        if root not in _indexes:
+            _indexes[root] = ArchetypeIndex(root, persist)
+        index = _indexes[root]
+        if index.refreshed is None or time.monotonic() - index.refreshed >= REFRESH_SECONDS:
+            index.refresh()
+    return index
+
+def select_archetype(root, query, top_k=DEFAULT_TOP_K, token_budget=DEFAULT_TOKEN_BUDGET, persist=True):
+    """Archetype snippets from root relevant to query, or "" if root is missing"""
+    if not root or not Path(root).exists():
+        return ""
+    return get_index(root, persist).select(query, top_k, token_budget)
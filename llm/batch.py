@@ -0,0 +1,216 @@
+import glob
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from parsers.openapi import parse_openapi
+from parsers.word import parse_word_doc
+from llm.archetype import select_archetype
+from llm.generator import generate_code_chunked, generate_code_from_description
+from templates.writer import write_generated_code
+
+SUPPORTED_SUFFIXES = (".yaml", ".yml", ".json", ".docx")
+
+# Completed jobs are appended here, so a crashed batch resumes where it stopped
+STATE_NAME = ".hashira-batch.jsonl"
+REPORT_NAME = "batch-report.json"
+
+class BatchJob:
+    __slots__ = ("id", "input", "output", "archetype")
+
+    def __init__(self, job_id, input_path, output, archetype=None):
+        self.id = job_id
+        self.input = input_path
+        self.output = output
+        self.archetype = archetype
+
+def _unique_id(job_id, seen):
+    candidate, n = job_id, 1
+    while candidate in seen:
+        n += 1
+        candidate = f"{job_id}-{n}"
+    seen.add(candidate)
+    return candidate
+
+def discover_jobs(source, output_root):
+    """Expand a batch source into jobs.
+
+    source may be a directory (every spec file directly inside it), a glob
+    pattern, or a JSONL file with one {"input", "id"?, "output"?,
+    "archetype"?} object per line; relative paths in a JSONL file are
+    resolved against the file's directory. Each job writes to
+    output_root/<id> unless it names its own output.
+    """
+    source_path = Path(source)
+    seen, jobs = set(), []
+
+    if source_path.suffix == ".jsonl" and source_path.is_file():
+        base = source_path.parent
+        for line_number, line in enumerate(source_path.read_text(encoding="utf-8").splitlines(), 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "input" not in entry:
+                print(f"⚠️  Skipping line {line_number} of {source_path}: no \"input\"")
+                continue
+            input_path = base / entry["input"]
+            job_id = _unique_id(str(entry.get("id", input_path.stem)), seen)
+            output = base / entry["output"] if "output" in entry else output_root / job_id
+            archetype = base / entry["archetype"] if entry.get("archetype") else None
+            jobs.append(BatchJob(job_id, input_path, output, archetype))
+        return jobs
+
+    if source_path.is_dir():
+        paths = sorted(p for p in source_path.iterdir() if p.suffix in SUPPORTED_SUFFIXES)
+    else:
+        paths = sorted(Path(p) for p in glob.glob(source, recursive=True) if Path(p).suffix in SUPPORTED_SUFFIXES)
+    for path in paths:
+        job_id = _unique_id(path.stem, seen)
+        jobs.append(BatchJob(job_id, path, output_root / job_id))
+    return jobs
+
+def _parse_job(job_id, input_path, detail):
+    """Runs in a worker process: parse one input into an API description"""
+    start = time.perf_counter()
+    if input_path.suffix in [".yaml", ".yml", ".json"]:
+        description = parse_openapi(input_path, detail)
+    elif input_path.suffix == ".docx":
+        description = parse_word_doc(input_path, detail)
+    else:
+        raise ValueError(f"Unsupported file type: {input_path.suffix}")
+    return job_id, description, time.perf_counter() - start
+
+def load_completed(output_root):
+    """Ids of jobs recorded as done in the batch state file"""
+    done = set()
+    try:
+        with open(output_root / STATE_NAME, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash
+                    continue
+                if record.get("status") == "done":
+                    done.add(record["id"])
+    except OSError:
+        pass
+    return done
+
+def _record(state_file, record):
+    state_file.write(json.dumps(record) + "\n")
+    state_file.flush()
+    os.fsync(state_file.fileno())
+
+def default_generate(api_description, archetype, chunked=False, batch_size=4, use_cache=True, archetype_dir=None):
+    if chunked:
+        return generate_code_chunked(
+            api_description, archetype, batch_size, use_cache=use_cache, archetype_dir=archetype_dir
+        )
+    return generate_code_from_description(api_description, archetype, use_cache=use_cache)
+
+def _generate_job(job, api_description, parse_seconds, generate, archetype_dir, generate_kwargs):
+    """Generate and write one parsed job; returns its record"""
+    record = {"id": job.id, "parse_seconds": round(parse_seconds, 3)}
+    try:
+        started = time.perf_counter()
+        archetype_root = job.archetype or archetype_dir
+        archetype = select_archetype(archetype_root, api_description) if archetype_root else ""
+        code = generate(api_description, archetype, archetype_dir=archetype_root and str(archetype_root),
+                        **generate_kwargs)
+        generated = time.perf_counter()
+        job.output.mkdir(parents=True, exist_ok=True)
+        files = write_generated_code(code, job.output)
+        done = time.perf_counter()
+        record.update(
+            status="done",
+            generate_seconds=round(generated - started, 3),
+            write_seconds=round(done - generated, 3),
+            latency_seconds=round(parse_seconds + done - started, 3),
+            files=len(files),
+            output=str(job.output),
+        )
+        print(f"✓ {job.id}: {len(files)} files in {done - started:.1f}s")
+    except Exception as e:
+        record.update(status="failed", error=str(e))
+        print(f"❌ {job.id}: {str(e)}")
+    return record
+
+def run_batch(jobs, output_root, generate=default_generate, parse_workers=None, detail="summary",
+              archetype_dir=None, resume=True, generate_workers=1, **generate_kwargs):
+    """Run many generation jobs against one resident pipeline.
+
+    Inputs are parsed in a process pool. Jobs are handed to generate as soon
+    as their parse completes, so the model is loaded once for the whole
+    batch; generate_workers jobs are generated at a time (more than one only
+    pays off when generate is served by several model replicas). Finished
+    jobs are appended to a state file in output_root, and with resume=True
+    they are skipped on the next run.
+    Returns the report that is also saved as batch-report.json.
+    """
+    output_root.mkdir(parents=True, exist_ok=True)
+    completed = load_completed(output_root) if resume else set()
+    pending = {job.id: job for job in jobs if job.id not in completed}
+    if completed:
+        print(f"↩️  Resuming: {len(jobs) - len(pending)} of {len(jobs)} jobs already done")
+
+    results = []
+    start = time.perf_counter()
+    with open(output_root / STATE_NAME, "a", encoding="utf-8") as state_file, \
+            ProcessPoolExecutor(max_workers=parse_workers) as pool, \
+            ThreadPoolExecutor(max_workers=generate_workers, thread_name_prefix="hashira-batch") as generators:
+        parses = {pool.submit(_parse_job, job.id, job.input, detail): job.id for job in pending.values()}
+        running = set(parses)
+        while running:
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future not in parses:
+                    # A generation finished; records are only written from this thread
+                    record = future.result()
+                    _record(state_file, record)
+                    results.append(record)
+                    continue
+
+                job = pending[parses[future]]
+                try:
+                    _, api_description, parse_seconds = future.result()
+                except Exception as e:
+                    record = {"id": job.id, "status": "failed", "error": f"parse: {str(e)}"}
+                    print(f"❌ {job.id}: {record['error']}")
+                    _record(state_file, record)
+                    results.append(record)
+                    continue
+                running.add(generators.submit(
+                    _generate_job, job, api_description, parse_seconds, generate, archetype_dir, generate_kwargs
+                ))
+
+    wall = time.perf_counter() - start
+    done_count = sum(1 for record in results if record["status"] == "done")
+    report = {
+        "jobs": len(jobs),
+        "skipped": len(jobs) - len(pending),
+        "done": done_count,
+        "failed": len(results) - done_count,
+        "wall_seconds": round(wall, 3),
+        "jobs_per_minute": round(done_count / wall * 60, 2) if wall > 0 else 0.0,
+        "results": results,
+    }
+    with open(output_root / REPORT_NAME, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def format_report(report):
+    lines = [f"{'job':<32} {'status':<7} {'parse':>7} {'generate':>9} {'write':>7} {'latency':>8}"]
+    for record in report["results"]:
+        lines.append(
+            f"{record['id'][:32]:<32} {record['status']:<7} {record.get('parse_seconds', 0):>6.2f}s "
+            f"{record.get('generate_seconds', 0):>8.2f}s {record.get('write_seconds', 0):>6.2f}s "
+            f"{record.get('latency_seconds', 0):>7.2f}s"
+        )
+    lines.append(
+        f"{report['done']} done, {report['failed']} failed, {report['skipped']} skipped in "
+        f"{report['wall_seconds']:.1f}s ({report['jobs_per_minute']:.1f} jobs/min)"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Default size bound for the on-disk generation cache (256 MB)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Eviction goes down to this share of max_bytes, so a full cache is not
+# scanned again on the very next put
+EVICT_TO = 0.9
+
+# Puts between rescans of the directory; other processes sharing it grow
+# it without this one's running total noticing
+RESCAN_PUTS = 100
+
+def cache_root():
+    """Root directory for everything Hashira caches locally"""
+    return Path(os.environ.get("HASHIRA_CACHE_DIR", Path.home() / ".cache" / "hashira"))
+
+class GenerationCache:
+    """Content-addressed store of generated code with LRU eviction.
+
+    Entries are keyed by a hash of the final prompt, the model name and the
+    sampling parameters, and live as one file each so the CLI, the MCP server
+    and the Streamlit app can share a cache directory. Reads bump the file
+    mtime, and eviction removes the least recently used files once the total
+    size exceeds max_bytes. The total is kept up to date as entries are
+    written, so the directory is only scanned to evict and every
+    RESCAN_PUTS puts.
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = Path(directory) if directory else cache_root() / "generations"
+        self.max_bytes = max_bytes or int(os.environ.get("HASHIRA_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.hits = 0
+        self.misses = 0
+        # Bytes in the directory as last scanned plus what this process wrote since; None before the first scan
+        self._bytes = None
+        self._puts = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(prompt, model_name, params):
+        payload = json.dumps({"prompt": prompt, "model": model_name, "params": params}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return self.directory / f"{key}.txt"
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding="utf-8")
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, key, text):
+        path = self._path(key)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            try:
+                replaced = path.stat().st_size
+            except OSError:
+                replaced = 0
+            # Write to a temp file first so concurrent readers never see partial entries
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        except OSError as e:
+            # A read-only or full cache must never break generation
+            print(f"Cache write failed: {str(e)}", file=sys.stderr)
+            return
+        self._track(len(text.encode("utf-8")) - replaced)
+
+    def _track(self, delta):
+        with self._lock:
+            self._puts += 1
+            if self._bytes is None or self._puts % RESCAN_PUTS == 0:
+                self._bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._bytes += delta
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        entries = []
+        for path in self.directory.glob("*.txt"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+                if total <= self.max_bytes * EVICT_TO:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+        self._bytes = total
+
+    def remember_model(self, model_name):
+        """Record the model that actually loaded, so the next process can
+        compute cache keys without loading it first"""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            (self.directory / "last_model").write_text(model_name, encoding="utf-8")
+        except OSError:
+            pass
+
+    def last_model(self):
+        try:
+            return (self.directory / "last_model").read_text(encoding="utf-8").strip() or None
+        except OSError:
+            return None
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        with self._lock:
+            self._bytes = None
+
+    def stats(self):
+        entries = self._entries() if self.directory.exists() else []
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+_cache = None
+
+def get_cache():
+    """Process-wide cache instance shared by all entry points"""
+    global _cache
+    if _cache is None:
+        _cache = GenerationCache()
+    return _cache
@@ -0,0 +1,122 @@
+"""
+Coalescing of concurrent generation requests into batched pipeline calls.
+
+Each MCP client or Streamlit session calling generate_code_from_description
+otherwise gets its own pipeline call, and they run one after another. A
+Coalescer sits in front of the pipeline: the first request opens a window,
+requests arriving within it (up to a maximum batch size) join it, and the
+batch runs as one padded generation whose outputs go back to their callers.
+A lone request waits one window at most.
+
+HASHIRA_COALESCE_WINDOW_MS sets the window (default 0, which turns
+coalescing off) and HASHIRA_COALESCE_MAX_BATCH the batch size (default 4).
+The time each request waits for its batch is recorded as the queue_wait
+stage, and coalesced_batches / coalesced_requests count the batches run.
+"""
+import os
+import threading
+import time
+
+from llm import metrics
+
+def configured_window():
+    """Coalescing window in seconds; 0 means disabled"""
+    return max(float(os.environ.get("HASHIRA_COALESCE_WINDOW_MS", "0")), 0.0) / 1000
+
+def configured_max_batch():
+    return max(int(os.environ.get("HASHIRA_COALESCE_MAX_BATCH", "4")), 1)
+
+class _Request:
+    __slots__ = ("item", "cancel_event", "enqueued", "done", "result", "error")
+
+    def __init__(self, item, cancel_event):
+        self.item = item
+        self.cancel_event = cancel_event
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class _AllCancelled:
+    """Cancel event of a batch: set once every request in it is cancelled"""
+
+    def __init__(self, events):
+        self.events = events
+
+    def is_set(self):
+        return all(event is not None and event.is_set() for event in self.events)
+
+class Coalescer:
+    """Runs run(items, cancel_event) -> results on batches of concurrent requests.
+
+    submit() blocks its caller until the batch holding its item has run.
+    A single dispatcher thread makes every call, one batch at a time,
+    holding lock if one is given. run itself must be safe to call while
+    other threads use the pipeline; llm.generator serializes every
+    pipeline call with one lock.
+    """
+
+    def __init__(self, run, window, max_batch, lock=None):
+        self.run = run
+        self.window = window
+        self.max_batch = max_batch
+        self.lock = lock or threading.Lock()
+        self._queue = []
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._dispatch, name="hashira-coalescer", daemon=True)
+        self._thread.start()
+
+    def submit(self, item, cancel_event=None):
+        """Result for item; None if cancel_event is set before its batch starts"""
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        request = _Request(item, cancel_event)
+        with self._cond:
+            self._queue.append(request)
+            self._cond.notify()
+        while not request.done.wait(0.1):
+            if cancel_event is not None and cancel_event.is_set():
+                with self._cond:
+                    if request in self._queue:
+                        self._queue.remove(request)
+                        return None
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            deadline = self._queue[0].enqueued + self.window
+            while len(self._queue) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+        return batch
+
+    def _dispatch(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                # Every request was cancelled while the window was open
+                continue
+            started = time.perf_counter()
+            for request in batch:
+                metrics.observe("queue_wait", started - request.enqueued)
+            metrics.incr("coalesced_batches")
+            metrics.incr("coalesced_requests", len(batch))
+            try:
+                with self.lock:
+                    results = self.run(
+                        [request.item for request in batch], _AllCancelled([request.cancel_event for request in batch])
+                    )
+                for request, result in zip(batch, results):
+                    request.result = result
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            for request in batch:
+                request.done.set()
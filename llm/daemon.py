@@ -0,0 +1,204 @@
+"""
+Hashira model daemon
+Keeps the text-generation pipeline resident and serves generation requests
+over a Unix socket, so repeated CLI runs skip model loading entirely.
+
+Protocol: one JSON object per line in each direction.
+    request:  {"op": "generate" | "generate_chunked" | "generate_units" | "generate_skeleton" | "metrics" | "ping" | "shutdown", "args": {...}}
+    response: {"ok": true, "result": ..., "model": ..., "cache": {...}, "metrics": {...}} or {"ok": false, "error": "..."}
+
+generate_skeleton takes the absolute "input_path" of an OpenAPI file or Word manual instead
+of a description, since the skeleton is built from the parsed spec.
+Generation responses carry the stage timings of that request only; the
+"metrics" op returns everything recorded since the daemon started.
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from pathlib import Path
+
+from llm.cache import cache_root, get_cache
+from llm import generator, metrics, speculative
+from parsers import load_spec
+
+# How long the client waits for the daemon to accept a connection
+CONNECT_TIMEOUT = 0.5
+
+class DaemonUnavailable(ConnectionError):
+    """No daemon is listening on the socket"""
+
+def socket_path():
+    return Path(os.environ.get("HASHIRA_SOCKET", cache_root() / "daemon.sock"))
+
+def request(op, path=None, **args):
+    """Send one request to the daemon and return its result.
+
+    Raises DaemonUnavailable when nothing is listening and RuntimeError when
+    the daemon reports an error.
+    """
+    path = path or socket_path()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(str(path))
+        except OSError as e:
+            raise DaemonUnavailable(f"No Hashira daemon at {path}: {str(e)}")
+        # Generation can take minutes, so only the connect is time-bounded
+        sock.settimeout(None)
+        sock.sendall(json.dumps({"op": op, "args": args}).encode("utf-8") + b"\n")
+        with sock.makefile("r", encoding="utf-8") as f:
+            line = f.readline()
+    finally:
+        sock.close()
+
+    if not line:
+        raise DaemonUnavailable(f"Hashira daemon at {path} closed the connection")
+    response = json.loads(line)
+    if not response.get("ok"):
+        raise RuntimeError(response.get("error", "Unknown daemon error"))
+    return response
+
+def is_running(path=None):
+    try:
+        request("ping", path)
+        return True
+    except (DaemonUnavailable, RuntimeError, ValueError):
+        return False
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            message = json.loads(line)
+            response = self.server.dispatch(message.get("op"), message.get("args") or {})
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+class ModelDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server around the resident pipeline.
+
+    Connections are handled on their own threads so ping and shutdown are
+    answered at once, but generations are serialized: the pipeline is not
+    safe to call from several threads. With HASHIRA_COALESCE_WINDOW_MS set,
+    "generate" requests arriving together run as one batched call instead.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._generate_lock = threading.Lock()
+        # Concurrent "generate" requests are batched; the coalescer holds the same lock per batch
+        self._coalescer = generator.get_coalescer(self._generate_lock)
+        self.requests_served = 0
+        super().__init__(str(self.path), _Handler)
+        os.chmod(self.path, 0o600)
+
+    def dispatch(self, op, args):
+        if op == "ping":
+            return {"ok": True, "result": "pong", "model": generator.current_model_name(), "pid": os.getpid()}
+        if op == "shutdown":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"ok": True, "result": "shutting down"}
+        if op == "metrics":
+            return {"ok": True, "result": metrics.collect()}
+        if op not in ("generate", "generate_chunked", "generate_units", "generate_skeleton"):
+            return {"ok": False, "error": f"Unknown op: {op}"}
+
+        if op == "generate" and self._coalescer is not None:
+            start = time.time()
+            result = generator.generate_code_from_description(**args)
+            self.requests_served += 1
+            print(f"✓ Served {op} request in {time.time() - start:.1f}s")
+            # Requests overlap, so stage timings cannot be attributed to one of them
+            return {
+                "ok": True, "result": result, "model": generator.current_model_name(), "cache": get_cache().stats(),
+                "metrics": {},
+            }
+
+        with self._generate_lock:
+            start = time.time()
+            before = metrics.get_metrics().snapshot()
+            if op == "generate_chunked":
+                result = generator.generate_code_chunked(**args)
+            elif op == "generate_units":
+                result = generator.generate_units(**args)
+            elif op == "generate_skeleton":
+                result = generator.generate_skeleton_code(load_spec(Path(args.pop("input_path"))), **args)
+            else:
+                result = generator.generate_code_from_description(**args)
+            self.requests_served += 1
+            print(f"✓ Served {op} request in {time.time() - start:.1f}s")
+            request_metrics = metrics.since(before)
+        return {
+            "ok": True, "result": result, "model": generator.current_model_name(), "cache": get_cache().stats(),
+            "metrics": request_metrics,
+        }
+
+def serve(path=None):
+    path = Path(path or socket_path())
+    if path.exists():
+        if is_running(path):
+            raise RuntimeError(f"A Hashira daemon is already listening on {path}")
+        # Left behind by a daemon that did not shut down cleanly
+        path.unlink()
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    start = time.time()
+    speculative.get_draft_model(generator.get_pipeline())
+    print(f"✓ Model ready in {time.time() - start:.1f}s")
+
+    server = ModelDaemon(path)
+    print(f"🚀 Hashira daemon listening on {path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if path.exists():
+            path.unlink()
+        print(f"👋 Hashira daemon stopped after {server.requests_served} requests")
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the Hashira model loaded and serve CLI generation requests over a Unix socket")
+    parser.add_argument("--socket", type=str, default=None, help="Socket path (default: $HASHIRA_SOCKET or ~/.cache/hashira/daemon.sock)")
+    parser.add_argument("--draft-model", type=str, default=None, help="Small model with the same tokenizer for assisted decoding (default: $HASHIRA_DRAFT_MODEL)")
+    parser.add_argument("--precision", choices=["fp32", "int8", "bf16"], default=None, help="Model precision (default: $HASHIRA_PRECISION or fp32)")
+    parser.add_argument("--offline", action="store_true", help="Only load models from the local Hugging Face cache")
+    parser.add_argument("--stop", action="store_true", help="Stop a running daemon")
+    parser.add_argument("--status", action="store_true", help="Report whether a daemon is running")
+    args = parser.parse_args()
+
+    path = Path(args.socket) if args.socket else socket_path()
+    if args.stop:
+        try:
+            request("shutdown", path)
+            print(f"✓ Stopped daemon at {path}")
+        except DaemonUnavailable:
+            print(f"No daemon running at {path}")
+    elif args.status:
+        try:
+            info = request("ping", path)
+            print(f"✓ Daemon running at {path} (pid {info['pid']}, model {info['model']})")
+        except DaemonUnavailable:
+            print(f"No daemon running at {path}")
+    else:
+        if args.draft_model:
+            os.environ["HASHIRA_DRAFT_MODEL"] = args.draft_model
+        if args.precision:
+            os.environ["HASHIRA_PRECISION"] = args.precision
+        if args.offline:
+            os.environ["HASHIRA_OFFLINE"] = "1"
+        serve(path)
+
+if __name__ == "__main__":
+    main()
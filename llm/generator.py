@@ -1,40 +1,223 @@
-from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
-import os
+# transformers and torch are imported inside the functions that need them:
+# they take seconds to load, and parse-only callers never touch the model.
+import functools
+from threading import Event, Lock, RLock, Thread
+import sys
+import time
+from llm.cache import get_cache
+from llm.prefix_cache import get_prefix_cache
+from llm.archetype import estimate_tokens, select_archetype
+from llm import loader, metrics, quantize, speculative
+from llm.coalescer import Coalescer, configured_max_batch, configured_window
+from llm.stopping import JavaCompleteCriteria, supports_per_sequence
+from templates.skeleton import build_skeleton, extract_body, DEFAULT_PACKAGE
 
 # Lazy load the model - only initialize when first called
 _pipe = None
+_model_name = None
+_load_lock = Lock()
+
+# Held around every pipeline call: server jobs, batch workers and the
+# coalescer call in from different threads, and neither the model nor the
+# draft model's forward hooks (see llm.speculative) are safe to share
+_pipeline_lock = RLock()
+
+DEFAULT_MODEL = "bigcode/starcoderbase"
+
+# Method bodies are a few statements, not whole classes
+BODY_MAX_NEW_TOKENS = 256
+
+# Default budget for generating a description: package, imports and class
+# boilerplate plus a share per operation, capped at MAX_NEW_TOKENS and, once
+# the model is loaded, at what its context leaves after the prompt (see
+# fit_context). JavaCompleteCriteria ends decoding earlier once the code is complete.
+BASE_NEW_TOKENS = 192
+TOKENS_PER_OPERATION = 160
+MAX_NEW_TOKENS = 4096
+
+HTTP_METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS")
+
+GENERATION_KWARGS = {
+    "do_sample": True,
+    "temperature": 0.2,
+    "top_p": 0.95,
+    "repetition_penalty": 1.1,
+}
+
+# Tried in order; see llm.loader for how each is resolved and loaded
+MODEL_CANDIDATES = (DEFAULT_MODEL, "Salesforce/codegen-350M-mono", "distilgpt2")
 
 def get_pipeline():
-    global _pipe
-    if _pipe is None:
+    global _pipe, _model_name
+    if _pipe is not None:
+        return _pipe
+    with _load_lock:
+        if _pipe is not None:
+            # Loaded by another thread while this one waited
+            return _pipe
+        start = time.perf_counter()
+        import transformers  # noqa: F401
+        imported = time.perf_counter()
+        print(f"✓ Imported transformers in {imported - start:.1f}s", file=sys.stderr)
+
         # Using StarCoder - best model for code generation
         # Priority: StarCoder > CodeGen > DistilGPT2
-        try:
-            model_name = "bigcode/starcoderbase"
-            _pipe = pipeline("text-generation", model=model_name)
-            print(f"✓ Loaded model: {model_name}")
-        except Exception as e:
-            # Fallback to CodeGen if StarCoder fails
-            try:
-                model_name = "Salesforce/codegen-350M-mono"
-                _pipe = pipeline("text-generation", model=model_name)
-                print(f"✓ Loaded fallback model: {model_name}")
-            except Exception as e2:
-                # Final fallback to DistilGPT2
-                model_name = "distilgpt2"
-                _pipe = pipeline("text-generation", model=model_name)
-                print(f"✓ Loaded backup model: {model_name}")
+        precision = quantize.configured_precision()
+        pipe, model_name = loader.load_first(
+            MODEL_CANDIDATES, functools.partial(quantize.load_pipeline, precision=precision), precision
+        )
+        kind = "model" if model_name == DEFAULT_MODEL else "fallback model"
+        print(f"✓ Loaded {kind}: {model_name} ({precision})", file=sys.stderr)
+        _enable_batching(pipe)
+        get_cache().remember_model(model_name)
+        # Published last, so other threads never see a half-prepared pipeline
+        _model_name = model_name
+        _pipe = pipe
+        ready = time.perf_counter()
+        metrics.observe("model_load", ready - start)
+        print(f"⏱️  Model ready in {ready - start:.1f}s (transformers import {imported - start:.1f}s, model {ready - imported:.1f}s)", file=sys.stderr)
     return _pipe
 
-def generate_code_from_description(api_desc, archetype=""):
-    archetype_text = f'Use this code style as reference:\n{archetype}\n' if archetype else ''
-    
-    prompt = f"""You are a senior Java developer. Generate complete, working Java code for the following API specification.
+def set_pipeline(pipe, model_name):
+    """Use an already constructed pipeline (or a stand-in with the same
+    call signature, as the benchmarks do) instead of loading one"""
+    global _pipe, _model_name
+    _pipe = pipe
+    _model_name = model_name
+
+def _enable_batching(pipe):
+    # Decoder-only models need a pad token and left padding to be batched
+    tokenizer = pipe.tokenizer
+    if tokenizer.pad_token_id is None:
+        tokenizer.pad_token_id = pipe.model.config.eos_token_id
+    tokenizer.padding_side = "left"
+
+class CancelCriteria:
+    """Stop decoding at the next token once the given threading.Event is set.
+
+    StoppingCriteriaList only needs a callable, so this does not subclass
+    transformers.StoppingCriteria and the module stays import-light.
+    """
+
+    def __init__(self, cancel_event):
+        self.cancel_event = cancel_event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return self.cancel_event.is_set()
+
+class DecodeClock:
+    """Never stops decoding; splits a pipeline call into prefill and decode time.
+
+    begin() is called right before each generate() call (one per batch).
+    Stopping criteria run once per generated token, so the first call
+    after it marks the end of that batch's prefill.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.prefill = 0.0
+        self._began = None
+
+    def begin(self):
+        self._began = time.perf_counter()
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if self._began is not None:
+            self.prefill += time.perf_counter() - self._began
+            self._began = None
+        return False
+
+def _stop_kwargs(cancel_event, clock=None, complete=None, abandoned=None):
+    events = (cancel_event, abandoned)
+    criteria = [c for c in (clock, *(event and CancelCriteria(event) for event in events), complete) if c]
+    if not criteria:
+        return {}
+    try:
+        from transformers import StoppingCriteriaList
+    except ImportError:
+        # Only a stand-in pipeline (see set_pipeline) runs without transformers
+        return {}
+    return {"stopping_criteria": StoppingCriteriaList(criteria)}
+
+def _complete_criteria(pipe, prompts, max_new_tokens, assist, mode="types", budgets=None):
+    """Criteria ending each sequence once its Java is complete (see llm.stopping)"""
+    # Assisted steps add several tokens at once, so prompt lengths cannot be inferred
+    lengths = [len(pipe.tokenizer(prompt)["input_ids"]) for prompt in prompts] if assist.kwargs else None
+    return JavaCompleteCriteria(pipe.tokenizer, max_new_tokens, mode, lengths, budgets)
+
+def token_budget(api_desc):
+    """max_new_tokens for generating api_desc, scaled by its number of operations"""
+    operations = sum(1 for line in api_desc.split("\n") if _is_operation(line))
+    return min(BASE_NEW_TOKENS + TOKENS_PER_OPERATION * max(operations, 1), MAX_NEW_TOKENS)
 
-API Specification:
-{api_desc}
+def context_length(pipe):
+    """Tokens the loaded model attends over, prompt included, or None if its config does not say"""
+    config = getattr(getattr(pipe, "model", None), "config", None)
+    for name in ("max_position_embeddings", "n_positions", "n_ctx"):
+        value = getattr(config, name, None)
+        if isinstance(value, int) and value > 0:
+            return value
+    return None
 
-{archetype_text}
+def fit_context(pipe, prompts, max_new_tokens):
+    """max_new_tokens capped so the longest of prompts (batches are padded to
+    it) plus its generation fits the model's context"""
+    limit = context_length(pipe)
+    if limit is None:
+        return max_new_tokens
+    longest = max(len(pipe.tokenizer(prompt)["input_ids"]) for prompt in prompts)
+    if longest >= limit:
+        raise ValueError(f"The prompt is {longest} tokens, which fills the model's {limit}-token context")
+    return min(max_new_tokens, limit - longest)
+
+def _count_tokens(pipe, texts):
+    encode = getattr(pipe.tokenizer, "encode", None)
+    if encode is None:
+        return sum(estimate_tokens(text) for text in texts)
+    return sum(len(encode(text, add_special_tokens=False)) for text in texts)
+
+def _record_generation(pipe, clock, prompts, outputs):
+    """Record prefill/decode time and token counts of one pipeline call;
+    returns the number of generated tokens"""
+    elapsed = time.perf_counter() - clock.start
+    generated = _count_tokens(pipe, outputs)
+    metrics.observe("prefill", clock.prefill)
+    metrics.observe("decode", elapsed - clock.prefill)
+    metrics.incr("generations", len(prompts))
+    metrics.incr("prompt_tokens", _count_tokens(pipe, prompts))
+    metrics.incr("generated_tokens", generated)
+    return generated
+
+def _generation_params(max_new_tokens):
+    params = dict(GENERATION_KWARGS, max_new_tokens=max_new_tokens)
+    if speculative.enabled():
+        # Assisted and plain greedy runs share cache entries: their output is identical
+        params = speculative.greedy(params)
+    return params
+
+def _cancelled(cancel_event):
+    return cancel_event is not None and cancel_event.is_set()
+
+def current_model_name():
+    """Name of the loaded model, or the best guess without loading it"""
+    return _model_name or get_cache().last_model() or DEFAULT_MODEL
+
+def _cache_key(prompt, params):
+    model = current_model_name()
+    precision = quantize.configured_precision()
+    # Quantized models decode slightly differently, so they get entries of their own
+    return get_cache().make_key(prompt, model if precision == "fp32" else f"{model}@{precision}", params)
+
+# Prompts open with the parts shared between calls (instructions, then
+# archetype) and end with what changes, so llm.prefix_cache can reuse the
+# key/value cache of everything before the marker line
+SPEC_MARKER = "API Specification:\n"
+METHOD_MARKER = "Method:\n"
+
+def build_prompt(api_desc, archetype=""):
+    archetype_text = f'Use this code style as reference:\n{archetype}\n\n' if archetype else ''
+
+    return f"""You are a senior Java developer. Generate complete, working Java code for the API specification at the end.
 
 Generate complete Java classes with:
 - Proper package declarations
@@ -44,7 +227,112 @@ Generate complete Java classes with:
 - Error handling
 - Complete method implementations
 
-Return ONLY valid, compilable Java code without any explanations."""
+Return ONLY valid, compilable Java code without any explanations.
+
+{archetype_text}{SPEC_MARKER}{api_desc}
+"""
+
+def build_body_prompt(context, archetype=""):
+    """Prompt for one method body of a skeleton controller (see templates.skeleton)"""
+    archetype_text = f'Use this code style as reference:\n{archetype}\n\n' if archetype else ''
+
+    return f"""You are a senior Java developer. Write the body of the Spring Boot controller method at the end.
+Return ONLY the Java statements inside the method body, without the signature or the closing brace.
+
+{archetype_text}{METHOD_MARKER}{context}"""
+
+def _prompt_prefix(prompt):
+    """The part of a built prompt shared with other prompts, through its marker line"""
+    for marker in (SPEC_MARKER, METHOD_MARKER):
+        end = prompt.find(marker)
+        if end != -1:
+            return prompt[:end + len(marker)]
+    return None
+
+def _prefix_kwargs(pipe, prompt, assist):
+    # Assisted decoding drives its own cache for both models
+    prefix = _prompt_prefix(prompt)
+    if prefix is None or assist.kwargs:
+        return {}
+    return get_prefix_cache().past_for(pipe, current_model_name(), prompt, prefix)
+
+def _is_operation(line):
+    # Upper-case method then a path, so prose such as "Get the user" is not an operation
+    words = line.strip().lstrip("-* ").split()
+    return len(words) > 1 and words[0] in HTTP_METHODS and words[1].startswith("/")
+
+def split_operations(api_desc, group_by="operation"):
+    """Split an API description into independent work units.
+
+    Lines naming an HTTP method are operations; any lines before the first
+    operation (e.g. "OpenAPI Spec:") are kept as a header on every unit.
+    With group_by="resource", operations sharing the first path segment
+    are generated together so one controller gets all of its endpoints.
+    """
+    header, groups = [], {}
+    for line in api_desc.split('\n'):
+        if not line.strip():
+            continue
+        if _is_operation(line):
+            words = line.strip().lstrip("-* ").split()
+            if group_by == "resource" and len(words) > 1:
+                key = words[1].rstrip(":").strip("/").split("/")[0]
+            else:
+                key = len(groups)
+            groups.setdefault(key, []).append(line)
+        elif groups:
+            # Continuation lines belong to the most recent operation
+            groups[list(groups)[-1]].append(line)
+        else:
+            header.append(line)
+
+    if not groups:
+        return [api_desc]
+    return ["\n".join(header + lines) for lines in groups.values()]
+
+def _fallback_code(api_desc):
+    # Return a basic but complete Java template
+    endpoints = []
+    for line in api_desc.split('\n'):
+        if 'GET' in line or 'POST' in line or 'PUT' in line or 'DELETE' in line:
+            endpoints.append(f"    // TODO: Implement {line.strip()}")
+
+    newline = '\n'
+    return f"""package com.example.api;
+
+import org.springframework.web.bind.annotation.*;
+import org.springframework.http.ResponseEntity;
+
+@RestController
+public class GeneratedApiController {{
+{newline.join(endpoints)}
+}}
+"""
+
+def generate_code_from_description(api_desc, archetype="", max_new_tokens=None, use_cache=True, cancel_event=None):
+    prompt = build_prompt(api_desc, archetype)
+    params = _generation_params(max_new_tokens or token_budget(api_desc))
+    cache = get_cache()
+
+    if use_cache:
+        cached = cache.get(_cache_key(prompt, params))
+        if cached is not None:
+            print("✓ Loaded generated code from cache", file=sys.stderr)
+            return cached
+
+    coalescer = get_coalescer()
+    if coalescer is not None:
+        try:
+            result = coalescer.submit((prompt, params["max_new_tokens"]), cancel_event)
+        except Exception as e:
+            print(f"Generation error: {str(e)}", file=sys.stderr)
+            return _fallback_code(api_desc)
+        if result is None:
+            # Cancelled before its batch started
+            return ""
+        if use_cache and not _cancelled(cancel_event):
+            cache.put(_cache_key(prompt, params), result)
+        return result
 
     try:
         pipe = get_pipeline()
@@ -52,52 +340,267 @@ Return ONLY valid, compilable Java code without any explanations."""
         if pipe is None:
             raise RuntimeError("Model not loaded")
         
-        # Generate code with optimized parameters
-        result = pipe(
-            prompt,
-            max_new_tokens=800,
-            do_sample=True,
-            temperature=0.2,
-            top_p=0.95,
-            repetition_penalty=1.1
-        )[0]["generated_text"]
-        
-        # Extract only the generated part (remove the prompt)
-        if prompt in result:
-            result = result.replace(prompt, "").strip()
+        # Generate code with optimized parameters; the cache key keeps the requested budget
+        run_params = dict(params, max_new_tokens=fit_context(pipe, [prompt], params["max_new_tokens"]))
+        with _pipeline_lock, speculative.assist(pipe) as assist:
+            clock = DecodeClock()
+            complete = _complete_criteria(pipe, [prompt], run_params["max_new_tokens"], assist)
+            clock.begin()
+            result = pipe(
+                prompt, **run_params, **assist.kwargs, **_prefix_kwargs(pipe, prompt, assist),
+                **_stop_kwargs(cancel_event, clock, complete)
+            )[0]["generated_text"]
+            
+            # Extract only the generated part (remove the prompt)
+            if prompt in result:
+                result = result.replace(prompt, "").strip()
+            assist.generated_tokens = _record_generation(pipe, clock, [prompt], [result])
         
+        # A cancelled decode is truncated, so never cache it
+        if use_cache and not _cancelled(cancel_event):
+            cache.put(_cache_key(prompt, params), result)
         return result
         
     except Exception as e:
-        print(f"Generation error: {str(e)}")
-        # Return a basic but complete Java template
-        endpoints = []
-        for line in api_desc.split('\n'):
-            if 'GET' in line or 'POST' in line or 'PUT' in line or 'DELETE' in line:
-                endpoints.append(f"    // TODO: Implement {line.strip()}")
-        
-        newline = '\n'
-        return f"""package com.example.api;
+        print(f"Generation error: {str(e)}", file=sys.stderr)
+        return _fallback_code(api_desc)
 
-import org.springframework.web.bind.annotation.*;
-import org.springframework.http.ResponseEntity;
+def stream_code_from_description(api_desc, archetype="", max_new_tokens=None, use_cache=True, cancel_event=None):
+    """Yield generated code in chunks as the model decodes it.
 
-Return only valid Java code.
-"""
+    Same prompt, parameters and cache as generate_code_from_description; the
+    decode runs on a background thread and a TextIteratorStreamer hands text
+    back as soon as each token is produced. A cache hit is yielded whole.
+    """
+    prompt = build_prompt(api_desc, archetype)
+    params = _generation_params(max_new_tokens or token_budget(api_desc))
+    cache = get_cache()
+
+    if use_cache:
+        cached = cache.get(_cache_key(prompt, params))
+        if cached is not None:
+            print("✓ Loaded generated code from cache", file=sys.stderr)
+            yield cached
+            return
+
+    chunks = []
     try:
         pipe = get_pipeline()
-        result = pipe(prompt, max_new_tokens=1024, do_sample=False)[0]["generated_text"]
-        return result
+
+        if pipe is None:
+            raise RuntimeError("Model not loaded")
+
+        from transformers import TextIteratorStreamer
+        streamer = TextIteratorStreamer(pipe.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        errors = []
+        run_params = dict(params, max_new_tokens=fit_context(pipe, [prompt], params["max_new_tokens"]))
+
+        # Set when the caller stops iterating early, so the decode ends too
+        abandoned = Event()
+
+        with _pipeline_lock, speculative.assist(pipe) as assist:
+            clock = DecodeClock()
+            complete = _complete_criteria(pipe, [prompt], run_params["max_new_tokens"], assist)
+
+            def run():
+                try:
+                    clock.begin()
+                    pipe(
+                        prompt, streamer=streamer, **run_params, **assist.kwargs, **_prefix_kwargs(pipe, prompt, assist),
+                        **_stop_kwargs(cancel_event, clock, complete, abandoned)
+                    )
+                except Exception as e:
+                    errors.append(e)
+                    streamer.end()
+
+            thread = Thread(target=run, daemon=True)
+            thread.start()
+            try:
+                for chunk in streamer:
+                    chunks.append(chunk)
+                    yield chunk
+            finally:
+                # The lock is only released once the decode has really stopped
+                abandoned.set()
+                thread.join()
+            if errors:
+                raise errors[0]
+            assist.generated_tokens = _record_generation(pipe, clock, [prompt], chunks)
+
     except Exception as e:
-        # Fallback to a simple template if model fails
-        return f"""
-public class GeneratedAPI {{
-    // API Description:
-    // {api_desc}
-    
-    // Note: Model loading failed. Please check your internet connection.
-    // Error: {str(e)}
-    
-    // Implement your API endpoints here based on the description above
-}}
-"""
\ No newline at end of file
+        print(f"Generation error: {str(e)}", file=sys.stderr)
+        # Only fall back to the template if nothing has been streamed yet
+        if not chunks:
+            yield _fallback_code(api_desc)
+        return
+
+    if use_cache and not _cancelled(cancel_event):
+        cache.put(_cache_key(prompt, params), "".join(chunks).strip())
+
+def generate_units(
+    units, archetype="", batch_size=4, max_new_tokens=None, use_cache=True, cancel_event=None, archetype_dir=None
+):
+    """Generate code for each work unit, in order, running them in padded batches.
+
+    Units found in the generation cache are skipped. With archetype_dir, each
+    unit gets the archetype snippets most relevant to it instead of archetype.
+    The default budget fits the largest unit; smaller ones stop once their
+    code is complete. Raises if the model cannot be loaded or generation fails.
+    """
+    max_new_tokens = max_new_tokens or max((token_budget(unit) for unit in units), default=BASE_NEW_TOKENS)
+    if archetype_dir:
+        prompts = [build_prompt(unit, select_archetype(archetype_dir, unit)) for unit in units]
+    else:
+        prompts = [build_prompt(unit, archetype) for unit in units]
+    return generate_prompts(prompts, batch_size, max_new_tokens, use_cache, cancel_event)
+
+def generate_prompts(
+    prompts, batch_size=4, max_new_tokens=800, use_cache=True, cancel_event=None, complete="types", budgets=None
+):
+    """Complete each prompt, in order, in padded batches; cached prompts are skipped.
+    complete is the llm.stopping mode: "types" for classes, "body" for method
+    bodies. budgets optionally caps each prompt's new tokens below
+    max_new_tokens. Raises if the model cannot be loaded or generation fails."""
+    params = _generation_params(max_new_tokens)
+    cache = get_cache()
+
+    results = [cache.get(_cache_key(prompt, params)) if use_cache else None for prompt in prompts]
+    pending = [i for i, result in enumerate(results) if result is None]
+    if len(pending) < len(prompts):
+        print(f"✓ Loaded {len(prompts) - len(pending)} work units from cache", file=sys.stderr)
+    if not pending:
+        return results
+
+    pipe = get_pipeline()
+
+    if pipe is None:
+        raise RuntimeError("Model not loaded")
+
+    # Cache entries stay keyed by the requested budget
+    run_params = dict(params, max_new_tokens=fit_context(pipe, [prompts[i] for i in pending], max_new_tokens))
+    with _pipeline_lock, speculative.assist(pipe) as assist:
+        if assist.kwargs:
+            # transformers only supports assisted decoding one sequence at a time
+            batch_size = 1
+        clock = DecodeClock()
+        criteria = _complete_criteria(
+            pipe, [prompts[i] for i in pending], run_params["max_new_tokens"], assist, complete,
+            budgets and [budgets[i] for i in pending]
+        )
+        outputs = []
+        if batch_size == 1 and not assist.kwargs:
+            # Unbatched, so each prompt can start from its cached prefix
+            for i in pending:
+                clock.begin()
+                outputs.append(pipe(
+                    prompts[i], return_full_text=False, **run_params, **_prefix_kwargs(pipe, prompts[i], assist),
+                    **_stop_kwargs(cancel_event, clock, criteria)
+                ))
+        else:
+            # One pipeline call per batch, so the clock knows where each generate() starts
+            for start in range(0, len(pending), batch_size):
+                clock.begin()
+                outputs += pipe(
+                    [prompts[i] for i in pending[start:start + batch_size]],
+                    batch_size=batch_size,
+                    return_full_text=False,
+                    **run_params,
+                    **assist.kwargs,
+                    **_stop_kwargs(cancel_event, clock, criteria)
+                )
+        for i, output in zip(pending, outputs):
+            results[i] = output[0]["generated_text"].strip()
+            if budgets and not supports_per_sequence():
+                # The batch decoded on past this sequence's budget
+                results[i] = _truncate_tokens(pipe, results[i], budgets[i])
+            if use_cache and not _cancelled(cancel_event):
+                cache.put(_cache_key(prompts[i], params), results[i])
+        assist.generated_tokens = _record_generation(
+            pipe, clock, [prompts[i] for i in pending], [results[i] for i in pending]
+        )
+    print(f"✓ Generated {len(pending)} work units (batch size {batch_size})", file=sys.stderr)
+    return results
+
+def _truncate_tokens(pipe, text, max_tokens):
+    encode = getattr(pipe.tokenizer, "encode", None)
+    if encode is None:
+        return text
+    ids = encode(text, add_special_tokens=False)
+    if len(ids) <= max_tokens:
+        return text
+    return pipe.tokenizer.decode(ids[:max_tokens], skip_special_tokens=True).strip()
+
+def _run_coalesced(items, cancel_event):
+    """Coalescer batch body: (prompt, budget) pairs in one padded generation"""
+    prompts = [prompt for prompt, _ in items]
+    budgets = [budget for _, budget in items]
+    # Callers look up and fill the generation cache under their own budgets
+    return generate_prompts(prompts, len(prompts), max(budgets), False, cancel_event, budgets=budgets)
+
+_coalescer = None
+_coalescer_lock = Lock()
+
+def get_coalescer(lock=None):
+    """The coalescer batching concurrent generate_code_from_description calls
+    (see llm.coalescer), or None while HASHIRA_COALESCE_WINDOW_MS is 0.
+    Its batches take the pipeline lock like every other generation; lock,
+    when the first caller passes one, is held around each batch as well."""
+    global _coalescer
+    window = configured_window()
+    if not window:
+        return None
+    with _coalescer_lock:
+        if _coalescer is None:
+            _coalescer = Coalescer(_run_coalesced, window, configured_max_batch(), lock)
+    return _coalescer
+
+def generate_code_chunked(
+    api_desc, archetype="", batch_size=4, group_by="operation", max_new_tokens=None, use_cache=True, cancel_event=None,
+    archetype_dir=None
+):
+    """Generate code one work unit at a time, running units in padded batches.
+
+    Each operation (or resource, see split_operations) gets its own prompt and
+    token budget, so large specs are no longer truncated, and the pipeline
+    decodes batch_size units together. Results are merged in spec order.
+    """
+    units = split_operations(api_desc, group_by)
+    try:
+        results = generate_units(units, archetype, batch_size, max_new_tokens, use_cache, cancel_event, archetype_dir)
+    except Exception as e:
+        print(f"Generation error: {str(e)}", file=sys.stderr)
+        return _fallback_code(api_desc)
+
+    return "\n\n".join(results)
+
+def generate_skeleton_code(
+    spec, archetype="", batch_size=4, max_new_tokens=BODY_MAX_NEW_TOKENS, use_cache=True, cancel_event=None,
+    archetype_dir=None, package=DEFAULT_PACKAGE
+):
+    """Generate code for an ApiSpec with the model writing only method bodies.
+
+    Controllers, signatures and DTOs are rendered from the spec by
+    templates.skeleton; each method body is one short batched prompt. Bodies
+    the model fails on, or that do not balance, keep a placeholder that throws.
+    """
+    skeleton = build_skeleton(spec, package)
+    contexts = [skeleton.method_context(method) for method in skeleton.methods]
+    if archetype_dir:
+        prompts = [build_body_prompt(context, select_archetype(archetype_dir, context)) for context in contexts]
+    else:
+        prompts = [build_body_prompt(context, archetype) for context in contexts]
+    print(f"✓ Skeleton: {len(skeleton.dtos)} DTOs and {len(skeleton.methods)} method signatures rendered from the spec", file=sys.stderr)
+    metrics.incr("skeleton_methods", len(skeleton.methods))
+
+    bodies = []
+    try:
+        bodies = [
+            extract_body(text)
+            for text in generate_prompts(prompts, batch_size, max_new_tokens, use_cache, cancel_event, complete="body")
+        ]
+    except Exception as e:
+        print(f"Generation error: {str(e)}", file=sys.stderr)
+    rejected = sum(body is None for body in bodies)
+    if rejected:
+        print(f"⚠️  Kept the placeholder for {rejected} method bodies the model did not complete", file=sys.stderr)
+    return skeleton.render(bodies)
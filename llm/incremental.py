@@ -0,0 +1,122 @@
+import hashlib
+
+from parsers.openapi import load_openapi, render_operation
+from parsers.word import read_word_doc
+from llm.generator import generate_units, split_operations
+from templates.writer import (
+    DirectorySink, JavaTypeSplitter, MemorySink, java_file_path, load_manifest, save_manifest, write_generated_code
+)
+
+def operation_units(input_path, detail="summary"):
+    """Map each operation key to (content hash, prompt text).
+
+    OpenAPI hashes cover the full rendering of an operation (parameters and
+    schemas included) even when the prompt only uses the summary line, so a
+    changed schema still triggers regeneration. Word documents are handled
+    the same way through their endpoint tables; one without any falls back
+    to the text units from split_operations, keyed by their first line.
+    """
+    units = {}
+    if input_path.suffix in [".yaml", ".yml", ".json"]:
+        spec, header = load_openapi(input_path), "OpenAPI Spec:"
+    elif input_path.suffix == ".docx":
+        spec, lines = read_word_doc(input_path)
+        header = "Word API Spec:"
+        if not spec.operations:
+            for text in split_operations("\n".join(lines)):
+                key = text.splitlines()[0].strip()
+                units[key] = (hashlib.sha256(text.encode("utf-8")).hexdigest(), text)
+            return units
+    else:
+        raise ValueError("Unsupported file type. Use .yaml, .json, or .docx")
+
+    for op in spec.operations:
+        full = render_operation(op, "full")
+        text = f"{header}\n" + (full if detail == "full" else render_operation(op))
+        units[op.key] = (hashlib.sha256(full.encode("utf-8")).hexdigest(), text)
+    return units
+
+def diff_manifest(units, manifest):
+    """Split operation keys into added, changed, removed and unchanged.
+
+    Entries without their generated code (written before it was kept) count
+    as changed, since shared files could not be rebuilt without it.
+    """
+    def current(key):
+        entry = manifest[key]
+        return entry["hash"] == units[key][0] and "code" in entry
+
+    added = [key for key in units if key not in manifest]
+    changed = [key for key in units if key in manifest and not current(key)]
+    removed = [key for key in manifest if key not in units]
+    unchanged = [key for key in units if key in manifest and current(key)]
+    return added, changed, removed, unchanged
+
+def _type_files(code):
+    """Files the types in code go to, without writing anything"""
+    splitter = JavaTypeSplitter()
+    types = splitter.feed(code) + splitter.close()
+    return sorted({java_file_path(java_type) for java_type in types})
+
+def regenerate_incremental(input_path, output_dir, detail="summary", generate=generate_units, **generate_kwargs):
+    """Regenerate only the operations that changed since the last run.
+
+    Compares the spec against the manifest in output_dir and generates code
+    for added and changed operations (one work unit each, via generate).
+    Operations on one resource usually share a controller, so every file an
+    added, changed or removed operation touches is rebuilt from the code of
+    all operations that still contribute to it, and deleted once none does.
+    Files left by a full run that no operation produces any more are
+    deleted as well. Saves the new manifest and returns counts for reporting.
+
+    When generate_kwargs' cancel_event is set by the time generation returns,
+    its output may be truncated, so nothing is written and the manifest is
+    left as it was; the counts then have "cancelled" set.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    units = operation_units(input_path, detail)
+    manifest = load_manifest(output_dir)
+    operations = manifest["operations"]
+    added, changed, removed, unchanged = diff_manifest(units, operations)
+    todo = added + changed
+
+    results = generate([units[key][1] for key in todo], **generate_kwargs) if todo else []
+    cancel_event = generate_kwargs.get("cancel_event")
+    if cancel_event is not None and cancel_event.is_set():
+        # Saving truncated code under the new hashes would make it look up to date
+        return {
+            "added": len(added), "changed": len(changed), "removed": len(removed), "unchanged": len(unchanged),
+            "files_written": 0, "files_deleted": 0, "cancelled": True,
+        }
+
+    owned = {path for entry in operations.values() for path in entry["files"]}
+    affected = {path for path in manifest["files"] if path not in owned}
+    for key in changed + removed:
+        affected.update(operations.pop(key)["files"])
+    for key, code in zip(todo, results):
+        operations[key] = {"hash": units[key][0], "code": code, "files": _type_files(code)}
+        affected.update(operations[key]["files"])
+
+    # Rebuild in spec order, so members keep the order a full run would give them
+    contributors = [key for key in units if key in operations and affected.intersection(operations[key]["files"])]
+    rebuilt = MemorySink()
+    write_generated_code("\n\n".join(operations[key]["code"] for key in contributors), rebuilt)
+
+    directory, written, deleted = DirectorySink(output_dir), 0, 0
+    for path in sorted(affected):
+        if path in rebuilt.files:
+            directory.write(path, rebuilt.read(path))
+            written += 1
+        elif (output_dir / path).exists():
+            (output_dir / path).unlink()
+            deleted += 1
+    save_manifest(output_dir, operations, {path for entry in operations.values() for path in entry["files"]})
+
+    return {
+        "added": len(added),
+        "changed": len(changed),
+        "removed": len(removed),
+        "unchanged": len(unchanged),
+        "files_written": written,
+        "files_deleted": deleted,
+    }
@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Finished jobs kept around for polling before the oldest are dropped
+MAX_FINISHED_JOBS = 100
+
+class QueueFullError(RuntimeError):
+    """Raised when a job is submitted while every worker and queue slot is taken"""
+
+class Job:
+    """State of one generation job as seen by pollers"""
+
+    def __init__(self, job_id, description, timeout):
+        self.id = job_id
+        self.description = description
+        self.timeout = timeout
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self.task = None
+        self.future = None
+        self.holds_slot = True
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed", "cancelled", "timeout")
+
+    def to_dict(self, include_result=False):
+        end = self.finished or time.time()
+        info = {
+            "job_id": self.id,
+            "description": self.description,
+            "status": self.status,
+            "queued_seconds": round((self.started or end) - self.created, 3),
+            "run_seconds": round(end - self.started, 3) if self.started else 0.0,
+            "error": self.error,
+        }
+        if include_result and self.status == "done":
+            info["result"] = self.result
+        return info
+
+    async def wait(self):
+        await self.task
+        return self
+
+class JobManager:
+    """Runs blocking generation calls on a bounded thread pool.
+
+    At most max_workers jobs decode at once and at most max_queue more wait
+    for a worker; submitting beyond that raises QueueFullError so callers get
+    backpressure instead of an ever-growing backlog. Each job has a timeout
+    and can be cancelled. Threads cannot be interrupted, so the job function
+    receives a cancel_event keyword that the generator turns into a stopping
+    criterion, which ends the decode at the next token.
+    """
+
+    def __init__(self, max_workers=1, max_queue=8, timeout=900):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.jobs = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hashira-gen")
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    def inflight(self):
+        """Jobs queued or still occupying a worker thread"""
+        with self._lock:
+            return self._inflight
+
+    def submit(self, func, *args, description="", timeout=None, **kwargs):
+        """Schedule func(*args, cancel_event=..., **kwargs) and return its Job.
+
+        Must be called from the event loop thread.
+        """
+        with self._lock:
+            if self._inflight >= self.max_workers + self.max_queue:
+                raise QueueFullError(
+                    f"Generation queue is full ({self.max_workers} running, {self.max_queue} queued). Try again later."
+                )
+            self._inflight += 1
+
+        job = Job(uuid.uuid4().hex[:12], description, timeout or self.timeout)
+        self.jobs[job.id] = job
+        job.task = asyncio.ensure_future(self._run(job, func, args, kwargs))
+        job.task.add_done_callback(lambda task: self._task_done(job))
+        self._prune()
+        return job
+
+    def _task_done(self, job):
+        if job.future is None:
+            # Cancelled before _run reached the executor, so nothing else finishes it
+            job.status = "cancelled"
+            job.finished = time.time()
+            self._release(job)
+
+    def _release(self, job):
+        with self._lock:
+            if job.holds_slot:
+                job.holds_slot = False
+                self._inflight -= 1
+
+    async def _run(self, job, func, args, kwargs):
+        def work():
+            if job.cancel_event.is_set():
+                return None
+            job.status = "running"
+            job.started = time.time()
+            return func(*args, cancel_event=job.cancel_event, **kwargs)
+
+        job.future = self._executor.submit(work)
+        # Runs when work() returns or raises, and when a queued job is cancelled
+        # or times out before a worker picks it up
+        job.future.add_done_callback(lambda future: self._release(job))
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(job.future), job.timeout)
+            if job.cancel_event.is_set():
+                job.status = "cancelled"
+            else:
+                job.result = result
+                job.status = "done"
+        except asyncio.TimeoutError:
+            job.cancel_event.set()
+            job.status = "timeout"
+            job.error = f"Job exceeded the {job.timeout}s timeout"
+        except asyncio.CancelledError:
+            job.cancel_event.set()
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished = time.time()
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns False if it already finished"""
+        job = self.jobs.get(job_id)
+        if job is None or job.done:
+            return False
+        job.cancel_event.set()
+        job.task.cancel()
+        return True
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def shutdown(self):
+        for job in self.jobs.values():
+            job.cancel_event.set()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,216 @@
+"""
+Model resolution and loading for get_pipeline.
+
+Cold start used to try each candidate model straight from the Hub, so a
+candidate that could not load (no network, not enough memory) cost its
+retries and timeouts on every start before the next one was tried. Now:
+
+- A candidate found in the local Hugging Face cache is loaded from its
+  snapshot directory, without contacting the Hub at all. Offline
+  (HF_HUB_OFFLINE, TRANSFORMERS_OFFLINE or HASHIRA_OFFLINE set) a candidate
+  that is not cached is skipped at once.
+- Candidates that failed to load are remembered in
+  ~/.cache/hashira/failed-models.json, per precision (a model too big for
+  fp32 may fit in int8), and skipped for HASHIRA_MODEL_RETRY_HOURS
+  (default 24; 0 always retries). A load is marked before it starts, so
+  one that gets the process killed for lack of memory counts as failed
+  too; an interrupted one (Ctrl-C, SystemExit, SIGTERM) does not. The last
+  candidate is always tried.
+- safetensors weights are preferred and loaded with low_cpu_mem_usage, so
+  tensors are read from the memory-mapped file instead of being copied
+  into a randomly initialized model first. Replicas are separate processes
+  and each holds its own copy of the weights; only reading the file is
+  shared, through the page cache.
+
+The failures file is updated under an exclusive lock, since sibling
+replicas load (and record markers) at the same time.
+"""
+import importlib.util
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from llm.cache import cache_root
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: updates are still atomic, but concurrent ones can lose each other's entries
+    fcntl = None
+
+FAILURES_NAME = "failed-models.json"
+
+# Failure keys of the loads this process has in progress
+_loading = set()
+_watching = False
+
+def offline():
+    return any(
+        os.environ.get(name, "").lower() in ("1", "true", "yes", "on")
+        for name in ("HF_HUB_OFFLINE", "TRANSFORMERS_OFFLINE", "HASHIRA_OFFLINE")
+    )
+
+def retry_seconds():
+    return float(os.environ.get("HASHIRA_MODEL_RETRY_HOURS", "24")) * 3600
+
+def local_snapshot(model_name):
+    """Directory holding model_name locally (a path, or its snapshot in the
+    Hugging Face cache), or None; never touches the network"""
+    if Path(model_name).is_dir():
+        return Path(model_name)
+    from huggingface_hub import snapshot_download
+    try:
+        return Path(snapshot_download(model_name, local_files_only=True))
+    except Exception:
+        # LocalEntryNotFoundError, or an incomplete download
+        return None
+
+def pretrained_kwargs(source):
+    """from_pretrained options for loading from source with little memory"""
+    kwargs = {}
+    if isinstance(source, Path):
+        kwargs["local_files_only"] = True
+        if any(source.glob("*.safetensors")):
+            kwargs["use_safetensors"] = True
+    elif offline():
+        kwargs["local_files_only"] = True
+    if importlib.util.find_spec("accelerate") is not None:
+        # Older transformers only skip the random init with accelerate installed
+        kwargs["low_cpu_mem_usage"] = True
+    return kwargs
+
+def _failures_path():
+    return cache_root() / FAILURES_NAME
+
+def load_failures():
+    try:
+        with open(_failures_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_failures(failures):
+    path = _failures_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_suffix(f".{os.getpid()}.tmp")
+        temp.write_text(json.dumps(failures, indent=2), encoding="utf-8")
+        os.replace(temp, path)
+    except OSError:
+        pass
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists, but belongs to someone else
+        return True
+    return True
+
+def recently_failed(key, failures=None):
+    failure = (load_failures() if failures is None else failures).get(key)
+    if failure is None or time.time() - failure["at"] >= retry_seconds():
+        return False
+    # A load still in progress in another process (e.g. a sibling replica) has not failed
+    return not (failure.get("pid") and _alive(failure["pid"]))
+
+@contextmanager
+def _failures_lock():
+    # Serializes read-modify-write cycles of the failures file between processes
+    path = _failures_path().with_suffix(".lock")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(path, "a")
+    except OSError:
+        yield
+        return
+    with lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+def record_failure(key, error, pid=None):
+    with _failures_lock():
+        failures = load_failures()
+        failures[key] = {"at": time.time(), "error": str(error)[:500], "pid": pid}
+        _save_failures(failures)
+
+def clear_failure(key):
+    with _failures_lock():
+        failures = load_failures()
+        if failures.pop(key, None) is not None:
+            _save_failures(failures)
+
+def watch_signals():
+    """Clear this process's in-progress markers when SIGTERM stops it, which
+    would otherwise look like a load killed for lack of memory. Signal
+    handlers can only be set from the main thread, so entry points that load
+    on other threads call this at startup; the loads may run anywhere."""
+    global _watching
+    if _watching or threading.current_thread() is not threading.main_thread():
+        return
+    if signal.getsignal(signal.SIGTERM) is not signal.SIG_DFL:
+        # Someone else handles it, and the process may not even exit
+        return
+
+    def terminate(signum, frame):
+        for key in list(_loading):
+            clear_failure(key)
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+
+    signal.signal(signal.SIGTERM, terminate)
+    _watching = True
+
+def load_first(candidates, load, precision="fp32"):
+    """Load the first candidate that works; returns (result, model name).
+
+    load(model_name, source=..., **kwargs) builds the model from source, a
+    local directory or a Hub name, passing kwargs on to from_pretrained.
+    """
+    watch_signals()
+    failures = load_failures()
+    errors = []
+    for i, model_name in enumerate(candidates):
+        key = f"{model_name}@{precision}"
+        last = i == len(candidates) - 1
+        if not last and recently_failed(key, failures):
+            print(f"⏭️  Skipping {model_name}: it failed to load at {time.ctime(failures[key]['at'])} ({failures[key]['error']})", file=sys.stderr)
+            continue
+
+        source = local_snapshot(model_name)
+        if source is None:
+            if offline():
+                print(f"⏭️  Skipping {model_name}: offline and not in the local cache", file=sys.stderr)
+                errors.append(f"{model_name}: not cached")
+                continue
+            source = model_name
+
+        # Stays behind only if the process is killed while loading
+        _loading.add(key)
+        record_failure(key, "the process exited while loading it", pid=os.getpid())
+        error = None
+        try:
+            result = load(model_name, source=source, **pretrained_kwargs(source))
+        except Exception as e:
+            error = e
+        finally:
+            # Also runs for KeyboardInterrupt and SystemExit, which are not load failures
+            _loading.discard(key)
+            if error is None:
+                clear_failure(key)
+            else:
+                record_failure(key, error)
+        if error is not None:
+            print(f"⚠️  Could not load {model_name}: {str(error)}", file=sys.stderr)
+            errors.append(f"{model_name}: {str(error)}")
+            continue
+        return result, model_name
+    raise RuntimeError("No model could be loaded (" + "; ".join(errors) + ")")
@@ -0,0 +1,219 @@
+"""
+Process-wide timings and counters for each pipeline stage.
+
+Stages are timed with `timed("parse_openapi")` or `observe(stage, seconds)`
+and counted with `incr(name, n)`. The stages recorded are:
+
+    parse_openapi, parse_word   input parsing (cache misses and hits alike)
+    model_load                  loading the text-generation pipeline
+    prefill                     prompt processing, up to each batch's first token
+    decode                      the remaining token-by-token generation
+    write                       splitting generated code and writing files
+    queue_wait                  time a coalesced request waited for its batch
+                                (overlaps the others, so it has no share)
+
+Everything is cheap enough to leave on: one perf_counter pair and a locked
+dict update per stage call.
+"""
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+class Metrics:
+    """Thread-safe registry of stage timers and counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._counters = {}
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            timer = self._timers.setdefault(stage, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            timer["count"] += 1
+            timer["seconds"] += seconds
+            timer["max_seconds"] = max(timer["max_seconds"], seconds)
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    @contextmanager
+    def timed(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "stages": {stage: dict(timer) for stage, timer in self._timers.items()},
+                "counters": dict(self._counters),
+            }
+
+    def merge(self, snapshot):
+        """Add a snapshot taken in another process (e.g. hashira-daemon)"""
+        with self._lock:
+            for stage, other in snapshot.get("stages", {}).items():
+                timer = self._timers.setdefault(stage, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+                timer["count"] += other["count"]
+                timer["seconds"] += other["seconds"]
+                timer["max_seconds"] = max(timer["max_seconds"], other["max_seconds"])
+            for name, value in snapshot.get("counters", {}).items():
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+_metrics = Metrics()
+
+def get_metrics():
+    return _metrics
+
+def timed(stage):
+    return _metrics.timed(stage)
+
+def observe(stage, seconds):
+    _metrics.observe(stage, seconds)
+
+def incr(name, value=1):
+    _metrics.incr(name, value)
+
+def since(before):
+    """What was recorded after the snapshot `before` was taken.
+
+    Only meaningful while nothing else records concurrently; max_seconds is
+    the process-wide maximum of stages that ran in between.
+    """
+    after = _metrics.snapshot()
+    stages = {}
+    for stage, timer in after["stages"].items():
+        previous = before["stages"].get(stage, {"count": 0, "seconds": 0.0})
+        if timer["count"] > previous["count"]:
+            stages[stage] = {
+                "count": timer["count"] - previous["count"],
+                "seconds": timer["seconds"] - previous["seconds"],
+                "max_seconds": timer["max_seconds"],
+            }
+    counters = {
+        name: value - before["counters"].get(name, 0)
+        for name, value in after["counters"].items()
+        if value != before["counters"].get(name, 0)
+    }
+    return {"stages": stages, "counters": counters}
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def collect():
+    """Stage timings, counters, derived rates, cache statistics and peak RSS"""
+    from llm.cache import get_cache
+    from llm.prefix_cache import get_prefix_cache
+
+    snapshot = _metrics.snapshot()
+    counters = snapshot["counters"]
+    decode = snapshot["stages"].get("decode", {}).get("seconds", 0.0)
+    snapshot["tokens_per_second"] = counters.get("generated_tokens", 0) / decode if decode else None
+    proposed = counters.get("draft_proposed_tokens", 0)
+    snapshot["draft_acceptance_rate"] = counters.get("draft_accepted_tokens", 0) / proposed if proposed else None
+    snapshot["cache"] = get_cache().stats()
+    snapshot["prefix_cache"] = get_prefix_cache().stats()
+    snapshot["peak_rss_bytes"] = peak_rss_bytes()
+    return snapshot
+
+def to_prometheus(snapshot=None):
+    """Render collect() output in the Prometheus text exposition format"""
+    snapshot = snapshot or collect()
+    lines = [
+        "# HELP hashira_stage_seconds Wall time spent in each pipeline stage.",
+        "# TYPE hashira_stage_seconds summary",
+    ]
+    for stage, timer in sorted(snapshot["stages"].items()):
+        lines.append(f'hashira_stage_seconds_sum{{stage="{stage}"}} {timer["seconds"]:.6f}')
+        lines.append(f'hashira_stage_seconds_count{{stage="{stage}"}} {timer["count"]}')
+    lines += [
+        "# HELP hashira_stage_max_seconds Longest single call of each pipeline stage.",
+        "# TYPE hashira_stage_max_seconds gauge",
+    ]
+    for stage, timer in sorted(snapshot["stages"].items()):
+        lines.append(f'hashira_stage_max_seconds{{stage="{stage}"}} {timer["max_seconds"]:.6f}')
+
+    for name, value in sorted(snapshot["counters"].items()):
+        lines += [f"# TYPE hashira_{name}_total counter", f"hashira_{name}_total {value}"]
+
+    cache = snapshot["cache"]
+    lines += [
+        "# TYPE hashira_cache_hits_total counter", f"hashira_cache_hits_total {cache['hits']}",
+        "# TYPE hashira_cache_misses_total counter", f"hashira_cache_misses_total {cache['misses']}",
+        "# TYPE hashira_cache_bytes gauge", f"hashira_cache_bytes {cache['bytes']}",
+        "# TYPE hashira_prefix_cache_bytes gauge", f"hashira_prefix_cache_bytes {snapshot['prefix_cache']['bytes']}",
+    ]
+    if snapshot["tokens_per_second"] is not None:
+        lines += ["# TYPE hashira_tokens_per_second gauge", f"hashira_tokens_per_second {snapshot['tokens_per_second']:.3f}"]
+    if snapshot["draft_acceptance_rate"] is not None:
+        lines += [
+            "# TYPE hashira_draft_acceptance_rate gauge",
+            f"hashira_draft_acceptance_rate {snapshot['draft_acceptance_rate']:.4f}",
+        ]
+    if snapshot["peak_rss_bytes"] is not None:
+        lines += ["# TYPE hashira_peak_rss_bytes gauge", f"hashira_peak_rss_bytes {snapshot['peak_rss_bytes']}"]
+    return "\n".join(lines) + "\n"
+
+def format_report(snapshot=None):
+    """Human-readable stage table for `cli.py --profile`"""
+    snapshot = snapshot or collect()
+    stages = dict(snapshot["stages"])
+    queue_wait = stages.pop("queue_wait", None)
+    total = sum(timer["seconds"] for timer in stages.values()) or 1.0
+    lines = [f"{'stage':<15} {'calls':>6} {'seconds':>9} {'share':>6}"]
+    for stage, timer in sorted(stages.items(), key=lambda item: -item[1]["seconds"]):
+        lines.append(f"{stage:<15} {timer['count']:>6} {timer['seconds']:>9.3f} {timer['seconds'] / total:>6.0%}")
+
+    counters = snapshot["counters"]
+    if counters.get("prompt_tokens") or counters.get("generated_tokens"):
+        lines.append(f"Tokens: {counters.get('prompt_tokens', 0)} prompt, {counters.get('generated_tokens', 0)} generated")
+    if snapshot["tokens_per_second"] is not None:
+        lines.append(f"Decode speed: {snapshot['tokens_per_second']:.1f} tokens/s")
+    if counters.get("structure_stops") or counters.get("budget_exhausted"):
+        lines.append(
+            f"Token budget: {counters.get('structure_stops', 0)} outputs ended once complete, "
+            f"{counters.get('tokens_saved', 0)} tokens saved; {counters.get('budget_exhausted', 0)} hit the budget"
+        )
+    if queue_wait is not None:
+        batches = counters.get("coalesced_batches", 0)
+        lines.append(
+            f"Coalescing: {counters.get('coalesced_requests', 0)} requests in {batches} batches, "
+            f"queue wait {queue_wait['seconds'] / queue_wait['count'] * 1000:.0f} ms mean, "
+            f"{queue_wait['max_seconds'] * 1000:.0f} ms max"
+        )
+    if snapshot["draft_acceptance_rate"] is not None:
+        lines.append(
+            f"Draft acceptance: {snapshot['draft_acceptance_rate']:.0%} "
+            f"({counters['draft_accepted_tokens']} of {counters['draft_proposed_tokens']} drafted tokens)"
+        )
+    cache = snapshot["cache"]
+    if cache["hits"] + cache["misses"]:
+        lines.append(f"Cache hit rate: {cache['hit_rate']:.0%} ({cache['hits']} hits, {cache['misses']} misses)")
+    prefix = snapshot["prefix_cache"]
+    if prefix["hits"] + prefix["misses"]:
+        lines.append(
+            f"Prefix cache: {prefix['hits']} hits, {counters.get('prefix_tokens_reused', 0)} prompt tokens not re-encoded"
+        )
+    if snapshot["peak_rss_bytes"] is not None:
+        lines.append(f"Peak RSS: {snapshot['peak_rss_bytes'] / (1 << 20):.0f} MB")
+    return "\n".join(lines)
@@ -0,0 +1,133 @@
+"""
+Key/value cache reuse for the shared start of prompts.
+
+Prompts built by llm.generator begin with fixed instructions and the
+archetype text; only what follows a marker line ("API Specification:" or
+"Method:") differs between calls. The model's past_key_values for that
+prefix are computed once per (model, prefix) and handed to generate() as a
+copy, so prefill only runs over the rest of the prompt.
+
+Entries are kept in memory, least recently used first out, within
+HASHIRA_PREFIX_CACHE_MB (default 512; 0 turns reuse off). Left padding would
+shift a cached prefix, so reuse applies to prompts decoded one at a time.
+"""
+import copy
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from llm import metrics
+
+DEFAULT_MAX_MB = 512
+
+# Shorter prefixes are not worth a cache entry
+MIN_PREFIX_TOKENS = 32
+
+def _nbytes(obj):
+    """Bytes held by the tensors in a cache object, whatever its layout"""
+    if hasattr(obj, "element_size") and hasattr(obj, "nelement"):
+        return obj.element_size() * obj.nelement()
+    if isinstance(obj, (list, tuple)):
+        return sum(_nbytes(item) for item in obj)
+    if hasattr(obj, "__dict__"):
+        return sum(_nbytes(value) for value in vars(obj).values())
+    return 0
+
+class PrefixCache:
+    """LRU map of (model name, prefix text) to (prefix token ids, past_key_values)"""
+
+    def __init__(self, max_bytes=None):
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get("HASHIRA_PREFIX_CACHE_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._unsupported = set()
+        self._lock = threading.Lock()
+
+    def past_for(self, pipe, model_name, prompt, prefix):
+        """generate() kwargs that reuse the cached key/values of prefix, the
+        start of prompt, or {} when they cannot be used"""
+        if self.max_bytes <= 0 or model_name in self._unsupported or not hasattr(pipe, "model"):
+            return {}
+
+        key = (model_name, prefix)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        hit = entry is not None
+        if not hit:
+            entry = self._compute(pipe, model_name, prefix)
+            if entry is None:
+                return {}
+
+        prefix_ids, past, _ = entry
+        # Only reusable if the prompt tokenizes to the prefix tokens plus more
+        prompt_ids = pipe.tokenizer(prompt)["input_ids"]
+        if len(prompt_ids) <= len(prefix_ids) or tuple(prompt_ids[:len(prefix_ids)]) != prefix_ids:
+            return {}
+        if hit:
+            self.hits += 1
+            metrics.incr("prefix_cache_hits")
+            metrics.incr("prefix_tokens_reused", len(prefix_ids))
+        else:
+            self.misses += 1
+        # generate() appends to the cache it is given
+        return {"past_key_values": copy.deepcopy(past)}
+
+    def _compute(self, pipe, model_name, prefix):
+        prefix_ids = tuple(pipe.tokenizer(prefix)["input_ids"])
+        if len(prefix_ids) < MIN_PREFIX_TOKENS:
+            return None
+        try:
+            import torch
+            from transformers import DynamicCache
+
+            with torch.no_grad():
+                input_ids = torch.tensor([prefix_ids], device=pipe.model.device)
+                past = pipe.model(input_ids=input_ids, past_key_values=DynamicCache(), use_cache=True).past_key_values
+        except Exception as e:
+            # Older transformers, or a model without Cache object support
+            print(f"⚠️  Prefix cache disabled for {model_name}: {str(e)}", file=sys.stderr)
+            self._unsupported.add(model_name)
+            return None
+
+        entry = (prefix_ids, past, _nbytes(past))
+        if entry[2] > self.max_bytes:
+            return entry
+        with self._lock:
+            self._entries[(model_name, prefix)] = entry
+            self.bytes += entry[2]
+            while self.bytes > self.max_bytes:
+                _, (_, _, size) = self._entries.popitem(last=False)
+                self.bytes -= size
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+_cache = None
+
+def get_prefix_cache():
+    """The process-wide prefix cache"""
+    global _cache
+    if _cache is None:
+        _cache = PrefixCache()
+    return _cache
@@ -0,0 +1,141 @@
+"""
+Reduced-precision inference on CPU.
+
+HASHIRA_PRECISION (or --precision) chooses how the main model is loaded:
+
+- fp32: as published (the default)
+- int8: dynamic int8 quantization of every nn.Linear. Weights are stored as
+  int8 and activations are quantized on the fly, so matrix multiplies run in
+  int8 on any x86 or ARM CPU; quality is close to fp32 for code models.
+  The quantized model is saved under ~/.cache/hashira/quantized and loaded
+  from there afterwards, without reading the fp32 weights again. Producing
+  it loads the fp32 model once, so the first run needs a host with memory
+  for the full fp32 weights; the saved file can then be copied into the
+  same path on smaller hosts running the same torch and transformers.
+- bf16: weights and activations in bfloat16, where the CPU supports it
+  natively (AVX512-BF16 or AMX); elsewhere it would be emulated and slower
+  than fp32, so the model stays in fp32.
+
+Outputs differ slightly between precisions, so the generation cache keeps
+them apart. `python -m benchmarks.bench_quantize` compares memory and
+tokens/sec against fp32.
+"""
+import os
+import re
+import sys
+import time
+
+from llm.cache import cache_root
+
+PRECISIONS = ("fp32", "int8", "bf16")
+
+def configured_precision():
+    precision = os.environ.get("HASHIRA_PRECISION", "fp32").lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f"HASHIRA_PRECISION must be one of {', '.join(PRECISIONS)}, not {precision}")
+    return precision
+
+def bf16_supported():
+    """Whether this CPU runs bfloat16 natively"""
+    import torch
+    try:
+        return torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    except (AttributeError, RuntimeError):
+        return False
+
+def footprint_bytes(model):
+    """Bytes held by the model's weights and buffers, packed int8 weights included"""
+    def size(value):
+        if isinstance(value, (tuple, list)):
+            return sum(size(item) for item in value)
+        if hasattr(value, "element_size"):
+            return value.element_size() * value.nelement()
+        return 0
+    return sum(size(value) for value in model.state_dict().values())
+
+def quantized_dir():
+    return cache_root() / "quantized"
+
+def artifact_path(model_name):
+    """Where the int8 model is cached; pickled modules only load into the
+    torch and transformers versions that saved them, so both are in the name"""
+    import torch
+    import transformers
+
+    slug = re.sub(r"[^\w.-]+", "--", model_name)
+    return quantized_dir() / f"{slug}-int8-torch{torch.__version__}-transformers{transformers.__version__}.pt"
+
+def quantize_int8(model):
+    """Dynamically quantize model's nn.Linear layers to int8, in place; returns the layer count"""
+    import torch
+
+    before = footprint_bytes(model)
+    linear = sum(isinstance(module, torch.nn.Linear) for module in model.modules())
+    # GPT-2 style models use Conv1D projections, which dynamic quantization leaves in fp32
+    torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    print(f"✓ Quantized {linear} linear layers to int8: {before >> 20} MB -> {footprint_bytes(model) >> 20} MB", file=sys.stderr)
+    return linear
+
+def _save_artifact(model, path):
+    import torch
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        torch.save(model, temp)
+        os.replace(temp, path)
+    except Exception as e:
+        # The model still works; only the next start has to quantize again
+        print(f"⚠️  Could not cache the quantized model: {str(e)}", file=sys.stderr)
+        temp.unlink(missing_ok=True)
+
+def load_model(model_name, precision=None, source=None, **kwargs):
+    """AutoModelForCausalLM for model_name in the given precision (default:
+    HASHIRA_PRECISION), read from source (default: model_name); kwargs go to
+    from_pretrained"""
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    precision = precision or configured_precision()
+    source = source or model_name
+    if precision == "bf16" and not bf16_supported():
+        print("⚠️  This CPU has no native bfloat16 support; loading in fp32", file=sys.stderr)
+        precision = "fp32"
+
+    if precision == "int8":
+        path = artifact_path(model_name)
+        if path.exists():
+            # Written by this user into their own cache, never downloaded.
+            # Memory-mapped: tensors kept as stored (embeddings, norms) are
+            # paged in from the file, shared between replicas through the
+            # page cache, while packed int8 weights are rebuilt per process
+            try:
+                model = torch.load(path, weights_only=False, mmap=True)
+            except TypeError:
+                # torch before 2.1
+                model = torch.load(path, weights_only=False)
+            print(f"✓ Loaded int8 model from {path}", file=sys.stderr)
+            return model.eval()
+        print(
+            f"⚠️  No int8 model cached at {path}; loading {model_name} in fp32 to quantize it. "
+            "This needs memory for the fp32 weights once; the result can be copied to other hosts",
+            file=sys.stderr
+        )
+        model = AutoModelForCausalLM.from_pretrained(source, **kwargs)
+        start = time.perf_counter()
+        quantize_int8(model.eval())
+        print(f"✓ Quantized in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        _save_artifact(model, path)
+        return model
+
+    if precision == "bf16":
+        kwargs["torch_dtype"] = torch.bfloat16
+    return AutoModelForCausalLM.from_pretrained(source, **kwargs).eval()
+
+def load_pipeline(model_name, precision=None, source=None, **kwargs):
+    """text-generation pipeline around load_model(model_name, precision, source, **kwargs)"""
+    from transformers import AutoTokenizer, pipeline
+
+    model = load_model(model_name, precision, source, **kwargs)
+    tokenizer = AutoTokenizer.from_pretrained(source or model_name, local_files_only=kwargs.get("local_files_only", False))
+    return pipeline("text-generation", model=model, tokenizer=tokenizer)
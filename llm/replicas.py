@@ -0,0 +1,389 @@
+"""
+Pool of model replicas in separate processes.
+
+One pipeline in one process uses a many-core box poorly and serializes
+every request. ReplicaPool starts N worker processes, each with its own
+copy of the model. Every replica gets a contiguous share of the cores:
+torch's intra-op threads are limited to that share, and where the OS
+allows it the process is pinned to those cores, so replicas do not
+oversubscribe or migrate. A scheduler thread hands each request to an
+idle replica (the least used one first) and queues it while all are busy.
+Chunked generations are split into shards that run on several replicas
+at once.
+
+HASHIRA_REPLICAS sets N (default 1, which leaves the pool off), and
+HASHIRA_REPLICA_THREADS overrides the threads per replica (default: the
+replica's cores). Each replica holds a full model, so memory bounds N as
+well as cores; stats() reports per-replica utilization to size it.
+"""
+import atexit
+import itertools
+import math
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from pathlib import Path
+
+from llm import metrics
+
+OPS = ("generate", "generate_chunked", "generate_units", "generate_skeleton")
+
+# How often waiting callers check their cancel_event and the collector checks for dead replicas
+POLL_SECONDS = 0.2
+
+def configured_replicas():
+    return max(int(os.environ.get("HASHIRA_REPLICAS", "1")), 1)
+
+def available_cores():
+    """CPU ids this process may run on"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        # No affinity API (macOS, Windows)
+        return list(range(os.cpu_count() or 1))
+
+def partition_cores(cores, replicas):
+    """Split cores into contiguous groups, one per replica; neighbouring
+    cores usually share caches. With more replicas than cores they take turns."""
+    size, extra = divmod(len(cores), replicas)
+    if size == 0:
+        return [[cores[i % len(cores)]] for i in range(replicas)]
+    groups, start = [], 0
+    for i in range(replicas):
+        end = start + size + (i < extra)
+        groups.append(cores[start:end])
+        start = end
+    return groups
+
+def _dispatch(op, args, cancel_event):
+    from llm import generator
+
+    if op == "generate_units":
+        return generator.generate_units(cancel_event=cancel_event, **args)
+    if op == "generate_chunked":
+        return generator.generate_code_chunked(cancel_event=cancel_event, **args)
+    if op == "generate_skeleton":
+        from parsers import load_spec
+        spec = load_spec(Path(args.pop("input_path")))
+        return generator.generate_skeleton_code(spec, cancel_event=cancel_event, **args)
+    return generator.generate_code_from_description(cancel_event=cancel_event, **args)
+
+def _replica_main(index, cores, threads, pin, inbox, outbox, cancel_event):
+    """Worker process: pin, size thread pools, load the model, serve requests"""
+    # The parent's stdout may carry the MCP protocol
+    sys.stdout = sys.stderr
+    if pin and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    # Set before torch is imported so the OpenMP/MKL pools match
+    os.environ["OMP_NUM_THREADS"] = os.environ["MKL_NUM_THREADS"] = str(threads)
+
+    before = metrics.get_metrics().snapshot()
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+
+        from llm import generator, speculative
+        speculative.get_draft_model(generator.get_pipeline())
+    except Exception as e:
+        outbox.put({"event": "failed", "replica": index, "error": str(e)})
+        return
+    outbox.put({"event": "ready", "replica": index, "pid": os.getpid(), "metrics": metrics.since(before)})
+
+    from llm.cache import get_cache
+    while True:
+        message = inbox.get()
+        if message is None:
+            break
+        request_id, op, args = message
+        before = metrics.get_metrics().snapshot()
+        start = time.perf_counter()
+        response = {"event": "done", "replica": index, "id": request_id, "result": None, "error": None}
+        try:
+            response["result"] = _dispatch(op, args, cancel_event)
+        except Exception as e:
+            response["error"] = str(e)
+        response.update(seconds=time.perf_counter() - start, metrics=metrics.since(before), cache=get_cache().stats())
+        outbox.put(response)
+
+class _Replica:
+    __slots__ = (
+        "index", "cores", "threads", "process", "inbox", "cancel_event", "pid", "state", "ready_at", "current",
+        "busy_since", "busy_seconds", "requests", "cache",
+    )
+
+    def __init__(self, index, cores, threads):
+        self.index = index
+        self.cores = cores
+        self.threads = threads
+        self.pid = None
+        self.state = "loading"   # loading, idle, busy or failed
+        self.ready_at = None
+        self.current = None      # (request id, Future) being served
+        self.busy_since = None
+        self.busy_seconds = 0.0
+        self.requests = 0
+        self.cache = None
+
+class ReplicaPool:
+    """N model replicas in worker processes behind one request queue.
+
+    run() blocks like the generator functions it stands in for, so it can
+    be called from job worker threads; submit() returns a Future.
+    """
+
+    def __init__(self, replicas, threads=None, pin=True):
+        context = multiprocessing.get_context("spawn")
+        self._outbox = context.Queue()
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._closed = False
+        self.started = time.time()
+        self.replicas = []
+        for index, cores in enumerate(partition_cores(available_cores(), replicas)):
+            replica = _Replica(index, cores, threads or len(cores))
+            replica.inbox = context.Queue()
+            replica.cancel_event = context.Event()
+            replica.process = context.Process(
+                target=_replica_main,
+                args=(index, cores, replica.threads, pin, replica.inbox, self._outbox, replica.cancel_event),
+                name=f"hashira-replica-{index}",
+                daemon=True,
+            )
+            replica.process.start()
+            self.replicas.append(replica)
+        print(
+            f"🧵 Starting {replicas} model replicas on {len(available_cores())} cores "
+            f"({self.replicas[0].threads} threads each)",
+            file=sys.stderr
+        )
+        self._collector = threading.Thread(target=self._collect, name="hashira-replicas", daemon=True)
+        self._collector.start()
+
+    def submit(self, op, **args):
+        """Queue one generator call; the Future resolves to its result"""
+        if op not in OPS:
+            raise ValueError(f"Unknown op: {op}")
+        future = Future()
+        with self._lock:
+            if self._closed or all(r.state == "failed" for r in self.replicas):
+                raise RuntimeError("No model replica is available")
+            self._pending.append((next(self._ids), op, args, future))
+            self._schedule()
+        return future
+
+    def run(self, op, cancel_event=None, **args):
+        """Run one generator call on an idle replica and wait for it.
+
+        Setting cancel_event drops a queued request, or stops the replica
+        serving it at the next token; None is returned for a dropped one.
+        """
+        if op == "generate_chunked":
+            return self._generate_chunked(cancel_event=cancel_event, **args)
+        return self._wait(self.submit(op, **args), cancel_event)
+
+    def _generate_chunked(self, api_desc, archetype="", batch_size=4, group_by="operation", max_new_tokens=None,
+                          use_cache=True, cancel_event=None, archetype_dir=None):
+        from llm.generator import BASE_NEW_TOKENS, _fallback_code, split_operations, token_budget
+
+        units = split_operations(api_desc, group_by)
+        # The budget of the whole spec, so shards share cache keys with unsharded runs
+        max_new_tokens = max_new_tokens or max((token_budget(unit) for unit in units), default=BASE_NEW_TOKENS)
+        live = sum(r.state != "failed" for r in self.replicas) or 1
+        size = max(batch_size, math.ceil(len(units) / live))
+        futures = [
+            self.submit(
+                "generate_units", units=units[i:i + size], archetype=archetype, batch_size=batch_size,
+                max_new_tokens=max_new_tokens, use_cache=use_cache, archetype_dir=archetype_dir
+            )
+            for i in range(0, len(units), size)
+        ]
+        results = []
+        try:
+            for future in futures:
+                results.extend(self._wait(future, cancel_event) or [])
+        except Exception as e:
+            print(f"Generation error: {str(e)}", file=sys.stderr)
+            return _fallback_code(api_desc)
+        return "\n\n".join(results)
+
+    def _wait(self, future, cancel_event):
+        while True:
+            try:
+                return future.result(timeout=POLL_SECONDS)
+            except FutureTimeout:
+                if cancel_event is not None and cancel_event.is_set():
+                    self._cancel(future)
+            if future.cancelled():
+                return None
+
+    def _cancel(self, future):
+        if future.cancel():
+            return
+        with self._lock:
+            for replica in self.replicas:
+                if replica.current is not None and replica.current[1] is future:
+                    replica.cancel_event.set()
+
+    def _schedule(self):
+        # Called with the lock held
+        while self._pending:
+            idle = [r for r in self.replicas if r.state == "idle"]
+            if not idle:
+                return
+            request_id, op, args, future = self._pending.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            replica = min(idle, key=lambda r: r.busy_seconds)
+            replica.state = "busy"
+            replica.current = (request_id, future)
+            replica.busy_since = time.time()
+            replica.cancel_event.clear()
+            replica.inbox.put((request_id, op, args))
+
+    def _collect(self):
+        while not self._closed:
+            try:
+                message = self._outbox.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                self._check_alive()
+                continue
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                replica = self.replicas[message["replica"]]
+                event = message["event"]
+                if event == "ready":
+                    replica.pid = message["pid"]
+                    replica.state = "idle"
+                    replica.ready_at = time.time()
+                    metrics.get_metrics().merge(message["metrics"])
+                    print(
+                        f"✓ Replica {replica.index} ready in {replica.ready_at - self.started:.1f}s "
+                        f"(pid {replica.pid}, cores {_core_range(replica.cores)})",
+                        file=sys.stderr
+                    )
+                elif event == "failed":
+                    print(f"❌ Replica {replica.index} failed to load the model: {message['error']}", file=sys.stderr)
+                    self._fail(replica, message["error"])
+                else:
+                    _, future = replica.current
+                    replica.state = "idle"
+                    replica.current = None
+                    replica.busy_seconds += message["seconds"]
+                    replica.requests += 1
+                    replica.cache = message["cache"]
+                    metrics.get_metrics().merge(message["metrics"])
+                    if message["error"] is not None:
+                        future.set_exception(RuntimeError(message["error"]))
+                    else:
+                        future.set_result(message["result"])
+                self._schedule()
+
+    def _check_alive(self):
+        with self._lock:
+            for replica in self.replicas:
+                if replica.state != "failed" and not replica.process.is_alive():
+                    print(f"❌ Replica {replica.index} exited with code {replica.process.exitcode}", file=sys.stderr)
+                    self._fail(replica, f"replica {replica.index} exited")
+
+    def _fail(self, replica, error):
+        replica.state = "failed"
+        if replica.current is not None:
+            replica.current[1].set_exception(RuntimeError(error))
+            replica.current = None
+        if all(r.state == "failed" for r in self.replicas):
+            while self._pending:
+                future = self._pending.popleft()[3]
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(RuntimeError("No model replica is available"))
+
+    def cache_stats(self):
+        """Generation cache statistics summed over the replicas"""
+        from llm.cache import get_cache
+
+        reports = [r.cache for r in self.replicas if r.cache]
+        if not reports:
+            return get_cache().stats()
+        hits = sum(report["hits"] for report in reports)
+        misses = sum(report["misses"] for report in reports)
+        # The entries live in one shared directory
+        latest = reports[-1]
+        return dict(latest, hits=hits, misses=misses, hit_rate=hits / (hits + misses) if hits + misses else 0.0)
+
+    def stats(self):
+        """Per-replica busy time and utilization (busy share of the time since it was ready)"""
+        now = time.time()
+        with self._lock:
+            replicas = []
+            for r in self.replicas:
+                busy = r.busy_seconds + (now - r.busy_since if r.current is not None else 0.0)
+                up = now - r.ready_at if r.ready_at else 0.0
+                replicas.append({
+                    "replica": r.index,
+                    "pid": r.pid,
+                    "state": r.state,
+                    "cores": _core_range(r.cores),
+                    "threads": r.threads,
+                    "requests": r.requests,
+                    "busy_seconds": round(busy, 3),
+                    "utilization": round(busy / up, 4) if up else 0.0,
+                })
+            queued = len(self._pending)
+        ready = [r["utilization"] for r in replicas if r["state"] in ("idle", "busy")]
+        return {
+            "replicas": replicas,
+            "queued": queued,
+            "utilization": round(sum(ready) / len(ready), 4) if ready else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for replica in self.replicas:
+                replica.cancel_event.set()
+                replica.inbox.put(None)
+        for replica in self.replicas:
+            replica.process.join(timeout=5)
+            if replica.process.is_alive():
+                replica.process.terminate()
+
+def _core_range(cores):
+    return f"{cores[0]}-{cores[-1]}" if len(cores) > 1 else str(cores[0])
+
+def format_stats(stats):
+    """Utilization table for `cli.py --profile` and the batch report"""
+    lines = [f"{'replica':<8} {'cores':>7} {'threads':>7} {'requests':>8} {'busy':>9} {'util':>6}"]
+    for r in stats["replicas"]:
+        lines.append(
+            f"{r['replica']:<8} {r['cores']:>7} {r['threads']:>7} {r['requests']:>8} "
+            f"{r['busy_seconds']:>8.1f}s {r['utilization']:>6.0%}"
+        )
+    lines.append(f"Mean utilization {stats['utilization']:.0%}, {stats['queued']} requests queued")
+    return "\n".join(lines)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_replica_pool():
+    """The process-wide replica pool, started on first use; None unless
+    HASHIRA_REPLICAS asks for more than one replica"""
+    global _pool
+    replicas = configured_replicas()
+    if replicas <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            threads = os.environ.get("HASHIRA_REPLICA_THREADS")
+            _pool = ReplicaPool(replicas, int(threads) if threads else None)
+            atexit.register(_pool.close)
+    return _pool
@@ -0,0 +1,137 @@
+"""
+Assisted (speculative) decoding with a small draft model.
+
+When HASHIRA_DRAFT_MODEL names a model, it drafts a few tokens at a time and
+the main model verifies them all in one forward pass, keeping the longest
+prefix it agrees with plus one token of its own. Decoding is greedy, so the
+output is exactly what the main model alone would produce greedily; only the
+number of slow forward passes goes down.
+
+The draft must share the main model's tokenizer (e.g. bigcode/tiny_starcoder_py
+for bigcode/starcoderbase, or distilgpt2 for gpt2-family models). A mismatched
+draft is rejected once and generation continues without it.
+"""
+import os
+import sys
+from contextlib import contextmanager
+
+from llm import loader, metrics
+
+# Draft tokens proposed per verification step; transformers adapts it as it
+# goes, raising it after fully accepted drafts and lowering it otherwise
+DEFAULT_DRAFT_TOKENS = 5
+
+_draft = None
+_draft_name = None
+_rejected = set()
+_stats = {"target_forwards": 0, "draft_forwards": 0, "generated_tokens": 0}
+
+def draft_model_name():
+    return os.environ.get("HASHIRA_DRAFT_MODEL") or None
+
+def enabled():
+    name = draft_model_name()
+    return name is not None and name not in _rejected
+
+def greedy(params):
+    """Generation parameters with sampling turned off: assisted decoding only
+    reproduces the main model's output for greedy search"""
+    params = {key: value for key, value in params.items() if key not in ("temperature", "top_p")}
+    params["do_sample"] = False
+    return params
+
+def tokenizers_match(target_tokenizer, draft_tokenizer):
+    """Draft tokens are verified by id, so both vocabularies must be identical"""
+    return (
+        target_tokenizer.get_vocab() == draft_tokenizer.get_vocab()
+        and target_tokenizer.eos_token_id == draft_tokenizer.eos_token_id
+    )
+
+def get_draft_model(pipe):
+    """Load the configured draft model for pipe, or None if there is none or
+    its tokenizer does not match"""
+    global _draft, _draft_name
+    name = draft_model_name()
+    if not enabled():
+        return None
+    if _draft is not None and _draft_name == name:
+        return _draft
+
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    source = loader.local_snapshot(name) or name
+    kwargs = loader.pretrained_kwargs(source)
+    tokenizer = AutoTokenizer.from_pretrained(source, local_files_only=kwargs.get("local_files_only", False))
+    if not tokenizers_match(pipe.tokenizer, tokenizer):
+        print(f"⚠️  Draft model {name} does not share the main model's tokenizer; assisted decoding disabled", file=sys.stderr)
+        _rejected.add(name)
+        return None
+
+    draft = AutoModelForCausalLM.from_pretrained(source, **kwargs)
+    draft.generation_config.num_assistant_tokens = int(
+        os.environ.get("HASHIRA_DRAFT_TOKENS", DEFAULT_DRAFT_TOKENS)
+    )
+    draft.eval()
+    _draft, _draft_name = draft, name
+    print(f"✓ Loaded draft model: {name}", file=sys.stderr)
+    return _draft
+
+class _Assist:
+    """Pipeline kwargs for one generation plus forward-pass counters.
+
+    The caller sets generated_tokens once the pipeline returns; each main
+    model pass yields the accepted draft tokens plus one of its own, so
+    accepted = generated - main passes, out of one proposal per draft pass.
+    """
+
+    def __init__(self, pipe, draft):
+        self.kwargs = {"assistant_model": draft} if draft is not None else {}
+        self.generated_tokens = 0
+        self.target_forwards = 0
+        self.draft_forwards = 0
+        self._hooks = []
+        if draft is not None:
+            self._hooks = [
+                pipe.model.register_forward_hook(self._count_target),
+                draft.register_forward_hook(self._count_draft),
+            ]
+
+    def _count_target(self, module, inputs, output):
+        self.target_forwards += 1
+
+    def _count_draft(self, module, inputs, output):
+        self.draft_forwards += 1
+
+    def close(self):
+        for hook in self._hooks:
+            hook.remove()
+        if not self._hooks:
+            return
+        accepted = max(self.generated_tokens - self.target_forwards, 0)
+        _stats["target_forwards"] += self.target_forwards
+        _stats["draft_forwards"] += self.draft_forwards
+        _stats["generated_tokens"] += self.generated_tokens
+        metrics.incr("draft_proposed_tokens", self.draft_forwards)
+        metrics.incr("draft_accepted_tokens", min(accepted, self.draft_forwards))
+
+@contextmanager
+def assist(pipe):
+    """Yield the assisted-decoding kwargs (empty when disabled) for one pipeline call"""
+    tracker = _Assist(pipe, get_draft_model(pipe))
+    try:
+        yield tracker
+    finally:
+        tracker.close()
+
+def stats():
+    """Draft acceptance since startup"""
+    proposed = _stats["draft_forwards"]
+    accepted = min(max(_stats["generated_tokens"] - _stats["target_forwards"], 0), proposed)
+    return {
+        "draft_model": _draft_name,
+        "draft_proposed_tokens": proposed,
+        "draft_accepted_tokens": accepted,
+        "acceptance_rate": accepted / proposed if proposed else 0.0,
+        "tokens_per_target_forward": (
+            _stats["generated_tokens"] / _stats["target_forwards"] if _stats["target_forwards"] else 0.0
+        ),
+    }
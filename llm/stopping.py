@@ -0,0 +1,154 @@
+"""
+Stopping criteria that end decoding once the generated Java is complete.
+
+With only max_new_tokens to stop it, the model either runs on after its
+last class (prose, Markdown, a second copy of what it already wrote) or is
+cut off mid-class. JavaCompleteCriteria feeds each sequence's new text to
+templates.writer.JavaTypeSplitter, the scanner that later splits the output
+into files, so braces in strings and comments are ignored, and stops it:
+
+- "types": at brace depth 0 after at least one top-level type has closed,
+  as soon as the model starts a Markdown fence, a line of prose or a type
+  it has already written
+- "body": at the brace that closes the method whose body is being written
+
+Sequences may have budgets of their own below max_new_tokens (requests of
+different sizes coalesced into one batch); they stop at their budget.
+Budget tokens left when a sequence stops are counted as tokens_saved, and
+sequences that reach the budget before completing as budget_exhausted.
+"""
+import re
+
+from llm import metrics
+from templates.writer import JavaTypeSplitter
+
+_TYPE_DECL = re.compile(r'\b(?:class|interface|enum|record)\s+([A-Za-z_$][\w$]*)')
+
+# Lines that can appear between top-level types; anything else is prose
+_JAVA_LINE = re.compile(
+    r"\s*(?:$|[@/*]|(?:package|import|public|protected|private|abstract|final|static|sealed|non-sealed|strictfp"
+    r"|class|interface|enum|record)\b)"
+)
+
+_per_sequence = None
+
+def supports_per_sequence():
+    """transformers 4.39+ stops each sequence of a batch on its own"""
+    global _per_sequence
+    if _per_sequence is None:
+        try:
+            from transformers import StopStringCriteria  # noqa: F401
+            _per_sequence = True
+        except ImportError:
+            _per_sequence = False
+    return _per_sequence
+
+class _Sequence:
+    __slots__ = ("splitter", "prefix_offset", "read_offset", "names", "done", "budget")
+
+    def __init__(self, budget):
+        self.splitter = JavaTypeSplitter()
+        # Generated tokens [prefix_offset:read_offset] were fed last and give
+        # the next decode its context; everything from read_offset is new
+        self.prefix_offset = 0
+        self.read_offset = 0
+        self.names = set()
+        self.done = False
+        self.budget = budget
+
+class JavaCompleteCriteria:
+    """Stop each sequence once its Java is complete (see the module docstring).
+
+    Like CancelCriteria in llm.generator, a plain callable for
+    StoppingCriteriaList. prompt_lengths lists the prompt token count of
+    each generate() call in order; without it the first step of a call is
+    taken to add one token, which holds unless decoding is assisted.
+    budgets, if given, lists the budget of each sequence in the same order.
+    Older transformers stop a whole batch at once, so there a batch ends
+    when all of its sequences are complete.
+    """
+
+    def __init__(self, tokenizer, max_new_tokens, mode="types", prompt_lengths=None, budgets=None):
+        self.tokenizer = tokenizer
+        self.max_new_tokens = max_new_tokens
+        self.mode = mode
+        self._prompt_lengths = list(prompt_lengths or [])
+        self._budgets = list(budgets or [])
+        self._prompt = None
+        self._length = None
+        self._sequences = []
+
+    def _new_call(self, input_ids):
+        length = input_ids.shape[-1]
+        if self._length is None or length <= self._length:
+            return True
+        # A longer prompt can follow a short generation; the prompt tokens tell them apart
+        return not input_ids[0, :self._prompt.shape[-1]].equal(self._prompt)
+
+    def __call__(self, input_ids, scores, **kwargs):
+        length = input_ids.shape[-1]
+        if self._new_call(input_ids):
+            prompt_length = self._prompt_lengths.pop(0) if self._prompt_lengths else length - 1
+            self._prompt = input_ids[0, :prompt_length].clone()
+            rows = input_ids.shape[0]
+            budgets, self._budgets = self._budgets[:rows], self._budgets[rows:]
+            self._sequences = [_Sequence(budget) for budget in budgets + [self.max_new_tokens] * (rows - len(budgets))]
+        self._length = length
+
+        prompt_length = self._prompt.shape[-1]
+        generated = length - prompt_length
+        for row, sequence in zip(input_ids, self._sequences):
+            if sequence.done:
+                continue
+            if self._complete(sequence, row[prompt_length:].tolist()):
+                sequence.done = True
+                metrics.incr("structure_stops")
+                metrics.incr("tokens_saved", max(sequence.budget - generated, 0))
+            elif generated >= sequence.budget:
+                # Stopping is all that keeps a sequence below the batch's max_new_tokens
+                sequence.done = sequence.budget < self.max_new_tokens
+                metrics.incr("budget_exhausted")
+
+        done = [sequence.done for sequence in self._sequences]
+        if not supports_per_sequence():
+            return all(done)
+        import torch
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+    def _new_text(self, sequence, generated_ids):
+        # Decoding the whole sequence every step is quadratic in its length,
+        # so only the new tokens are decoded, behind the previous few: the
+        # tokenizer needs them to place spaces and merge bytes correctly
+        start = sequence.prefix_offset
+        prefix = self.tokenizer.decode(generated_ids[start:sequence.read_offset], skip_special_tokens=True)
+        text = self.tokenizer.decode(generated_ids[start:], skip_special_tokens=True)
+        if len(text) <= len(prefix) or text.endswith("\ufffd"):
+            # Nothing printable yet, or a multi-byte character split across tokens
+            return ""
+        sequence.prefix_offset, sequence.read_offset = sequence.read_offset, len(generated_ids)
+        return text[len(prefix):]
+
+    def _complete(self, sequence, generated_ids):
+        new_text = self._new_text(sequence, generated_ids)
+        if not new_text:
+            # Nothing changed since the last step, which did not stop
+            return False
+        splitter = sequence.splitter
+        closed = splitter.feed(new_text)
+        if self.mode == "body":
+            return splitter.stray_closes > 0
+
+        for java_type in closed:
+            if java_type.name in sequence.names:
+                return True
+            sequence.names.add(java_type.name)
+        if not sequence.names or splitter.depth:
+            return False
+        pending = splitter.pending()
+        if "```" in pending:
+            return True
+        declared = _TYPE_DECL.search(pending)
+        if declared and declared.group(1) in sequence.names:
+            return True
+        # Only whole lines: a partial one may still turn out to be Java
+        return any(not _JAVA_LINE.match(line) for line in pending.split("\n")[:-1])
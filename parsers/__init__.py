@@ -0,0 +1,9 @@
+def load_spec(file_path, use_cache=True):
+    """ApiSpec of an OpenAPI file (.yaml/.yml/.json) or a Word manual (.docx)"""
+    if file_path.suffix == ".docx":
+        from parsers.word import load_word_spec
+        return load_word_spec(file_path)
+    if file_path.suffix in (".yaml", ".yml", ".json"):
+        from parsers.openapi import load_openapi
+        return load_openapi(file_path, use_cache)
+    raise ValueError("Unsupported file type. Use .yaml, .json, or .docx")
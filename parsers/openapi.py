@@ -1,17 +1,289 @@
-import yaml
+import hashlib
 import json
+import os
+import pickle
+import sys
+import tempfile
+
+import yaml
+
+from llm.cache import cache_root
+from llm.metrics import timed
+
+try:
+    # libyaml bindings parse large specs an order of magnitude faster
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+
+# Bump when the IR classes change so stale cached parses are ignored
+IR_VERSION = 1
+
+class Schema:
+    """A resolved schema; `name` is set for named component schemas"""
+    __slots__ = ("name", "type", "format", "properties", "items", "required", "enum", "ref")
+
+    def __init__(self, name=None, type=None, format=None, properties=None, items=None, required=(), enum=None, ref=None):
+        self.name = name
+        self.type = type
+        self.format = format
+        self.properties = properties or {}
+        self.items = items
+        self.required = tuple(required)
+        self.enum = enum
+        self.ref = ref
+
+    def label(self):
+        """Short type label, e.g. "User", "array<User>" or "string(date)" """
+        if self.name:
+            return self.name
+        if self.type == "array" and self.items is not None:
+            return f"array<{self.items.label()}>"
+        if self.format:
+            return f"{self.type}({self.format})"
+        return self.type or "object"
+
+class Parameter:
+    __slots__ = ("name", "location", "required", "schema", "description")
+
+    def __init__(self, name, location, required=False, schema=None, description=""):
+        self.name = name
+        self.location = location
+        self.required = required
+        self.schema = schema
+        self.description = description
+
+class Operation:
+    __slots__ = (
+        "method", "path", "operation_id", "summary", "description", "tags", "parameters", "request_body", "responses"
+    )
+
+    def __init__(self, method, path, operation_id=None, summary="", description="", tags=(), parameters=(),
+                 request_body=None, responses=None):
+        self.method = method
+        self.path = path
+        self.operation_id = operation_id
+        self.summary = summary
+        self.description = description
+        self.tags = tuple(tags)
+        self.parameters = tuple(parameters)
+        self.request_body = request_body
+        self.responses = responses or {}
+
+    @property
+    def key(self):
+        return f"{self.method.upper()} {self.path}"
+
+class ApiSpec:
+    __slots__ = ("title", "version", "operations", "schemas")
+
+    def __init__(self, title="", version="", operations=(), schemas=None):
+        self.title = title
+        self.version = version
+        self.operations = list(operations)
+        self.schemas = schemas or {}
+
+class _RefResolver:
+    """Resolves local $refs ("#/components/schemas/User") with memoization.
+
+    Each named schema is converted once and shared by every operation that
+    references it. The Schema is memoized before its properties are filled
+    in, so recursive schemas resolve to themselves instead of looping.
+    """
 
-def parse_openapi(file_path):
-    with open(file_path, 'r') as f:
-        if file_path.suffix in ['.yaml', '.yml']:
-            data = yaml.safe_load(f)
-        elif file_path.suffix == '.json':
-            data = json.load(f)
-        else:
-            raise ValueError("Unsupported OpenAPI file format")
-
-    description = "OpenAPI Spec:\n"
-    for path, methods in data.get("paths", {}).items():
-        for method, details in methods.items():
-            description += f"- {method.upper()} {path}: {details.get('summary', '')}\n"
+    def __init__(self, document):
+        self.document = document
+        self._schemas = {}
+
+    def lookup(self, ref):
+        if not ref.startswith("#/"):
+            raise KeyError(ref)
+        node = self.document
+        for part in ref[2:].split("/"):
+            node = node[part.replace("~1", "/").replace("~0", "~")]
+        return node
+
+    def deref(self, node):
+        """Follow $ref chains on a non-schema object (parameter, request body)"""
+        seen = set()
+        while isinstance(node, dict) and "$ref" in node and node["$ref"] not in seen:
+            seen.add(node["$ref"])
+            try:
+                node = self.lookup(node["$ref"])
+            except KeyError:
+                return {}
+        return node if isinstance(node, dict) else {}
+
+    def schema(self, node, name=None):
+        if not isinstance(node, dict):
+            return Schema(name=name)
+        if "$ref" in node:
+            ref = node["$ref"]
+            if ref not in self._schemas:
+                try:
+                    target = self.lookup(ref)
+                except KeyError:
+                    # External or broken reference: keep the pointer, not the body
+                    return Schema(name=ref.rsplit("/", 1)[-1], ref=ref)
+                schema = Schema(name=ref.rsplit("/", 1)[-1], ref=ref)
+                self._schemas[ref] = schema
+                self._fill(schema, target)
+            return self._schemas[ref]
+        schema = Schema(name=name)
+        self._fill(schema, node)
+        return schema
+
+    def _fill(self, schema, node):
+        if not isinstance(node, dict):
+            return
+        for part in node.get("allOf", ()):
+            self._fill(schema, self.deref(part) if "$ref" in part else part)
+        schema.type = node.get("type", schema.type or ("object" if "properties" in node else None))
+        schema.format = node.get("format", schema.format)
+        schema.enum = node.get("enum", schema.enum)
+        schema.required = schema.required + tuple(node.get("required", ()))
+        for prop, prop_node in node.get("properties", {}).items():
+            schema.properties[prop] = self.schema(prop_node)
+        if "items" in node:
+            schema.items = self.schema(node["items"])
+
+def _media_schema(resolver, node):
+    """Schema of the first media type in a requestBody/response (or Swagger 2 schema)"""
+    node = resolver.deref(node)
+    if "schema" in node:
+        return resolver.schema(node["schema"])
+    for media in node.get("content", {}).values():
+        if isinstance(media, dict) and "schema" in media:
+            return resolver.schema(media["schema"])
+    return None
+
+def build_spec(data):
+    """Convert a loaded OpenAPI/Swagger document into the ApiSpec IR"""
+    resolver = _RefResolver(data)
+    info = data.get("info", {})
+    components = data.get("components", {}).get("schemas", {}) or data.get("definitions", {})
+    schemas = {
+        name: resolver.schema({"$ref": f"#/components/schemas/{name}" if "components" in data else f"#/definitions/{name}"})
+        for name in components
+    }
+
+    operations = []
+    for path, path_item in (data.get("paths") or {}).items():
+        path_item = resolver.deref(path_item)
+        shared = path_item.get("parameters", [])
+        for method, details in path_item.items():
+            if method not in HTTP_METHODS or not isinstance(details, dict):
+                continue
+            parameters, request_body = {}, None
+            for param in list(shared) + list(details.get("parameters", [])):
+                param = resolver.deref(param)
+                if param.get("in") == "body":
+                    request_body = _media_schema(resolver, param)
+                    continue
+                # Operation-level parameters override path-level ones with the same name
+                parameters[(param.get("name"), param.get("in"))] = Parameter(
+                    param.get("name", ""),
+                    param.get("in", ""),
+                    param.get("required", False),
+                    resolver.schema(param.get("schema", param)),
+                    param.get("description", ""),
+                )
+            if "requestBody" in details:
+                request_body = _media_schema(resolver, details["requestBody"])
+            responses = {
+                str(status): _media_schema(resolver, response)
+                for status, response in (details.get("responses") or {}).items()
+            }
+            operations.append(Operation(
+                method,
+                path,
+                details.get("operationId"),
+                details.get("summary", ""),
+                details.get("description", ""),
+                details.get("tags", ()),
+                parameters.values(),
+                request_body,
+                responses,
+            ))
+
+    return ApiSpec(info.get("title", ""), str(info.get("version", "")), operations, schemas)
+
+def _cache_path(digest):
+    return cache_root() / "openapi" / f"{digest}.pickle"
+
+def load_openapi(file_path, use_cache=True):
+    """Parse an OpenAPI file into an ApiSpec, reusing a cached parse when the
+    file content (by SHA-256) has been parsed before"""
+    if file_path.suffix not in ['.yaml', '.yml', '.json']:
+        raise ValueError("Unsupported OpenAPI file format")
+
+    raw = file_path.read_bytes()
+    digest = hashlib.sha256(raw + f"ir-v{IR_VERSION}".encode()).hexdigest()
+    cache_path = _cache_path(digest)
+    if use_cache:
+        try:
+            with open(cache_path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass
+
+    if file_path.suffix in ['.yaml', '.yml']:
+        data = yaml.load(raw, Loader=SafeLoader)
+    else:
+        data = json.loads(raw)
+    spec = build_spec(data or {})
+
+    if use_cache:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(spec, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_path)
+        except OSError as e:
+            print(f"OpenAPI cache write failed: {str(e)}", file=sys.stderr)
+    return spec
+
+def _schema_text(schema):
+    """Type label plus the fields of object schemas, e.g. "User { id: integer, name: string? }" """
+    target = schema.items if schema.type == "array" and schema.items is not None else schema
+    if not target.properties:
+        return schema.label()
+    required = set(target.required)
+    fields = ", ".join(
+        f"{name}: {prop.label()}{'' if name in required else '?'}" for name, prop in target.properties.items()
+    )
+    return f"{schema.label()} {{ {fields} }}"
+
+def render_operation(op, detail="summary"):
+    """One operation as prompt text.
+
+    "summary" gives the one-line "- METHOD path: summary" form; "full" adds
+    indented lines for parameters, the request body and response schemas,
+    so each operation carries everything needed to generate it on its own.
+    """
+    lines = [f"- {op.key}: {op.summary}"]
+    if detail != "full":
+        return lines[0]
+    for param in op.parameters:
+        flag = ", required" if param.required else ""
+        type_label = param.schema.label() if param.schema else "string"
+        lines.append(f"    param {param.name} ({param.location}, {type_label}{flag})")
+    if op.request_body is not None:
+        lines.append(f"    body {_schema_text(op.request_body)}")
+    for status, schema in op.responses.items():
+        lines.append(f"    response {status}" + (f" {_schema_text(schema)}" if schema is not None else ""))
+    return "\n".join(lines)
+
+def describe_spec(spec, detail="summary", header="OpenAPI Spec:"):
+    """Render an ApiSpec as the text description used in prompts"""
+    description = header + "\n"
+    for op in spec.operations:
+        description += render_operation(op, detail) + "\n"
     return description
+
+def parse_openapi(file_path, detail="summary"):
+    with timed("parse_openapi"):
+        return describe_spec(load_openapi(file_path), detail)
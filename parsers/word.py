@@ -1,5 +1,264 @@
-from docx import Document
+"""
+Streaming parser for Word (.docx) API manuals.
 
-def parse_word_doc(file_path):
-    doc = Document(file_path)
-    return "\n".join(p.text for p in doc.paragraphs if p.text.strip())
+word/document.xml is read straight out of the zip with incremental XML
+parsing, and every top-level paragraph or table is discarded once it has
+been handled, so memory stays flat however long the manual is. Headings and
+endpoint tables are turned into the same ApiSpec IR as OpenAPI files:
+
+    | Method | Path        | Description  |      one Operation per row, tagged
+    | GET    | /users/{id} | Get a user   |      with the heading above it
+
+A two-column "Method / Path / Description" table describes one endpoint,
+"GET /users - List users" lines in the prose are endpoints too, and a table
+with Name and Type (or In/Required) columns right after an endpoint lists
+its parameters.
+"""
+import re
+import zipfile
+from functools import lru_cache
+from xml.etree.ElementTree import iterparse
+
+from llm.metrics import timed
+from parsers.openapi import ApiSpec, Operation, Parameter, Schema, describe_spec
+
+HTTP_METHODS = ("get", "post", "put", "patch", "delete", "head", "options", "trace")
+
+_METHOD_COLUMNS = ("method", "http method", "verb")
+_PATH_COLUMNS = ("path", "endpoint", "url", "uri", "route", "resource")
+_SUMMARY_COLUMNS = ("description", "summary", "purpose", "operation", "notes")
+_PARAM_NAME_COLUMNS = ("parameter", "name", "field")
+_PARAM_TYPE_COLUMNS = ("type", "data type")
+_PARAM_LOCATION_COLUMNS = ("in", "location", "param type")
+_PARAM_REQUIRED_COLUMNS = ("required", "mandatory", "optional")
+
+_ENDPOINT_LINE = re.compile(r"^\s*(GET|POST|PUT|PATCH|DELETE|HEAD|OPTIONS|TRACE)\s+(/\S*)\s*(?:[-:–—]\s*)?(.*)$")
+_HEADING_STYLE = re.compile(r"heading\s*(\d)", re.IGNORECASE)
+_TYPE_WORDS = {
+    "int": "integer", "integer": "integer", "long": "integer", "number": "number", "float": "number",
+    "double": "number", "decimal": "number", "bool": "boolean", "boolean": "boolean", "array": "array",
+    "list": "array", "object": "object", "string": "string", "text": "string", "date": "string",
+}
+
+@lru_cache(maxsize=None)
+def _local(tag):
+    # Transitional and Strict OOXML use different namespaces; only the local name matters
+    return tag.rsplit("}", 1)[-1]
+
+def _attribute(elem, name):
+    for key, value in elem.attrib.items():
+        if _local(key) == name:
+            return value
+    return None
+
+def _paragraph_text(paragraph):
+    parts = []
+    for node in paragraph.iter():
+        tag = _local(node.tag)
+        if tag == "t" and node.text:
+            parts.append(node.text)
+        elif tag == "tab":
+            parts.append("\t")
+        elif tag in ("br", "cr"):
+            parts.append("\n")
+    return "".join(parts).strip()
+
+def _heading_level(paragraph):
+    """Outline level of a heading paragraph (1 = top), or None for body text"""
+    for props in paragraph:
+        if _local(props.tag) != "pPr":
+            continue
+        for prop in props:
+            tag = _local(prop.tag)
+            if tag == "pStyle":
+                style = _attribute(prop, "val") or ""
+                if style.lower() == "title":
+                    return 1
+                match = _HEADING_STYLE.search(style)
+                if match:
+                    return int(match.group(1))
+            elif tag == "outlineLvl":
+                level = _attribute(prop, "val")
+                if level is not None and level.isdigit() and int(level) < 9:
+                    return int(level) + 1
+    return None
+
+def _table_rows(table):
+    rows = []
+    for row in table:
+        if _local(row.tag) != "tr":
+            continue
+        cells = []
+        for cell in row:
+            if _local(cell.tag) == "tc":
+                cells.append(" ".join(
+                    text for text in (_paragraph_text(p) for p in cell.iter() if _local(p.tag) == "p") if text
+                ))
+        rows.append(cells)
+    return rows
+
+def _open_document(file_path):
+    try:
+        docx = zipfile.ZipFile(file_path)
+    except zipfile.BadZipFile:
+        raise ValueError(f"{file_path} is not a Word (.docx) document")
+    try:
+        return docx, docx.open("word/document.xml")
+    except KeyError:
+        docx.close()
+        raise ValueError(f"{file_path} has no word/document.xml")
+
+def iter_blocks(file_path):
+    """Yield ("heading", level, text), ("paragraph", text) and ("table", rows)
+    in document order, holding at most one top-level block in memory"""
+    docx, document = _open_document(file_path)
+    with docx, document:
+        stack, body, table_depth = [], None, 0
+        for event, elem in iterparse(document, events=("start", "end")):
+            tag = _local(elem.tag)
+            if event == "start":
+                stack.append(tag)
+                if tag == "body":
+                    body = elem
+                elif tag == "tbl":
+                    table_depth += 1
+                continue
+
+            stack.pop()
+            if tag == "tbl":
+                table_depth -= 1
+                if table_depth == 0:
+                    yield ("table", _table_rows(elem))
+            elif tag == "p" and table_depth == 0:
+                text = _paragraph_text(elem)
+                if text:
+                    level = _heading_level(elem)
+                    yield ("heading", level, text) if level else ("paragraph", text)
+            if body is not None and stack and stack[-1] == "body":
+                # Done with this top-level element and everything inside it
+                body.clear()
+
+def _column(header, names):
+    for i, cell in enumerate(header):
+        if cell in names:
+            return i
+    for i, cell in enumerate(header):
+        if cell.startswith(names):
+            return i
+    return None
+
+def _cell(row, index):
+    return row[index].strip() if index is not None and index < len(row) else ""
+
+def _endpoint(method, path, summary, tag):
+    method, path = method.strip().lower(), path.strip()
+    if method not in HTTP_METHODS:
+        match = _ENDPOINT_LINE.match(path) or _ENDPOINT_LINE.match(method.upper())
+        if not match:
+            return None
+        method, path, summary = match.group(1).lower(), match.group(2), summary or match.group(3)
+    if not path.startswith("/"):
+        return None
+    return Operation(method, path, summary=summary, tags=(tag,) if tag else ())
+
+def _parameters(rows):
+    header = [cell.strip().lower() for cell in rows[0]]
+    name_col = _column(header, _PARAM_NAME_COLUMNS)
+    type_col = _column(header, _PARAM_TYPE_COLUMNS)
+    location_col = _column(header, _PARAM_LOCATION_COLUMNS)
+    required_col = _column(header, _PARAM_REQUIRED_COLUMNS)
+    description_col = _column(header, _SUMMARY_COLUMNS)
+    if name_col is None or (type_col is None and location_col is None and required_col is None):
+        return None
+
+    parameters = []
+    for row in rows[1:]:
+        name = _cell(row, name_col)
+        if not name:
+            continue
+        type_word = _cell(row, type_col).lower().split("(")[0].strip()
+        required = _cell(row, required_col).lower()
+        if required_col is not None and header[required_col].startswith("optional"):
+            required = "no" if required in ("yes", "y", "true", "x", "✓") else "yes"
+        parameters.append(Parameter(
+            name,
+            _cell(row, location_col).lower() or "query",
+            required in ("yes", "y", "true", "required", "mandatory", "x", "✓"),
+            Schema(type=_TYPE_WORDS.get(type_word, "string")),
+            _cell(row, description_col),
+        ))
+    return parameters
+
+def _table_operations(rows, tag):
+    """Operations described by a table, or None if it is not an endpoint table"""
+    rows = [row for row in rows if any(cell.strip() for cell in row)]
+    if len(rows) < 2:
+        return None
+    header = [cell.strip().lower() for cell in rows[0]]
+    method_col = _column(header, _METHOD_COLUMNS)
+    path_col = _column(header, _PATH_COLUMNS)
+    if path_col is not None:
+        summary_col = _column(header, _SUMMARY_COLUMNS)
+        operations = [
+            _endpoint(_cell(row, method_col), _cell(row, path_col), _cell(row, summary_col), tag) for row in rows[1:]
+        ]
+        return [op for op in operations if op is not None]
+
+    # Two-column key/value table describing a single endpoint
+    if all(len(row) == 2 for row in rows):
+        fields = {row[0].strip().lower(): row[1] for row in rows}
+        method = next((fields[key] for key in fields if key.startswith(_METHOD_COLUMNS)), "")
+        path = next((fields[key] for key in fields if key.startswith(_PATH_COLUMNS)), "")
+        summary = next((fields[key] for key in fields if key.startswith(_SUMMARY_COLUMNS)), "")
+        if path:
+            op = _endpoint(method, path, summary, tag)
+            return [op] if op else None
+    return None
+
+def read_word_doc(file_path):
+    """Stream a .docx once; returns the ApiSpec found in it and, if it has no
+    endpoints, its text lines (kept only until the first endpoint turns up)"""
+    title, heading, operations, lines = "", "", [], []
+    last_ops = []
+    for block in iter_blocks(file_path):
+        kind = block[0]
+        if kind == "heading":
+            heading = block[2]
+            title = title or heading
+            text_lines = [heading]
+            last_ops = []
+        elif kind == "paragraph":
+            text_lines = [block[1]]
+            match = _ENDPOINT_LINE.match(block[1])
+            if match:
+                last_ops = [_endpoint(match.group(1), match.group(2), match.group(3), heading)]
+                operations += last_ops
+        else:
+            rows = block[1]
+            text_lines = [" | ".join(row) for row in rows]
+            found = _table_operations(rows, heading)
+            if found:
+                operations += found
+                last_ops = found
+            elif len(last_ops) == 1:
+                parameters = _parameters(rows) if rows else None
+                if parameters:
+                    last_ops[0].parameters += tuple(parameters)
+        if operations:
+            lines = []
+        else:
+            lines += text_lines
+    return ApiSpec(title, "", operations), lines
+
+def load_word_spec(file_path):
+    """The endpoints of a Word API manual as an ApiSpec"""
+    return read_word_doc(file_path)[0]
+
+def parse_word_doc(file_path, detail="summary"):
+    """API description of a Word manual: its endpoints in the same form as
+    OpenAPI specs, or the document text if no endpoint could be found"""
+    with timed("parse_word"):
+        spec, lines = read_word_doc(file_path)
+        if spec.operations:
+            return describe_spec(spec, detail, header="Word API Spec:")
+        return "\n".join(lines)
@@ -4,22 +4,101 @@ Hashira MCP Server
 Exposes API code generation capabilities as MCP tools for AI assistants
 """
 
+import time
+_import_start = time.perf_counter()
+
 import asyncio
+import itertools
 import json
+import os
+import sys
 from pathlib import Path
 from typing import Optional
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 import mcp.server.stdio
 
+from parsers import load_spec
 from parsers.openapi import parse_openapi
 from parsers.word import parse_word_doc
-from llm.generator import generate_code_from_description
-from templates.writer import write_generated_code
+from llm.generator import (
+    generate_code_from_description, generate_code_chunked, generate_skeleton_code, get_coalescer,
+    stream_code_from_description
+)
+from llm.jobs import JobManager
+from llm import loader, metrics
+from llm.archetype import select_archetype
+from llm.incremental import regenerate_incremental
+from llm.coalescer import configured_max_batch, configured_window
+from llm.replicas import configured_replicas, get_replica_pool
+from templates.writer import DirectorySink, MemorySink, TeeSink, ZipSink, write_generated_code
+
+# The model stack is imported on the first generation call, never at startup,
+# so the handshake and the parse tools stay fast
+IMPORT_SECONDS = time.perf_counter() - _import_start
 
 # Initialize MCP server
 app = Server("hashira")
 
+# Generation runs on a bounded worker pool so the stdio loop keeps answering
+# list_tools and parse calls while a model is decoding. With HASHIRA_REPLICAS
+# the workers hand jobs to model replicas in other processes, one job each;
+# with HASHIRA_COALESCE_WINDOW_MS enough of them wait to fill a batch. Jobs
+# that use the in-process model still take turns on its pipeline lock
+jobs = JobManager(
+    max_workers=int(os.environ.get(
+        "HASHIRA_MAX_WORKERS", str(max(configured_replicas(), configured_max_batch() if configured_window() else 1))
+    )),
+    max_queue=int(os.environ.get("HASHIRA_MAX_QUEUE", "8")),
+    timeout=float(os.environ.get("HASHIRA_JOB_TIMEOUT", "900")),
+)
+
+# Input schema properties shared by every tool that runs the model
+GENERATION_OPTIONS = {
+    "chunked": {
+        "type": "boolean",
+        "description": "Generate each operation separately in batched pipeline calls instead of one prompt for the whole spec (recommended for large specs)"
+    },
+    "batch_size": {
+        "type": "integer",
+        "description": "Number of operations decoded together when chunked is true (default: 4)"
+    },
+    "use_cache": {
+        "type": "boolean",
+        "description": "Reuse previously generated code for an identical prompt from the shared on-disk cache (default: true)"
+    },
+    "spec_detail": {
+        "type": "string",
+        "enum": ["summary", "full"],
+        "description": "OpenAPI detail given to the model when generating from a file: summary (default) or full (parameters and schemas)"
+    },
+    "timeout_seconds": {
+        "type": "number",
+        "description": "Cancel the generation if it runs longer than this (default: HASHIRA_JOB_TIMEOUT or 900)"
+    }
+}
+
+# For tools that take an input_file
+SKELETON_OPTION = {
+    "skeleton": {
+        "type": "boolean",
+        "description": "Render controllers, method signatures and DTOs directly from the spec (OpenAPI, or endpoint tables in a .docx) and ask the model only for method bodies (far fewer generated tokens)"
+    }
+}
+
+# Where generated files go and what the tool result carries
+OUTPUT_OPTIONS = {
+    "output_zip": {
+        "type": "string",
+        "description": "Optional absolute path of a .zip archive to stream the generated .java files into, one entry per class"
+    },
+    "result_format": {
+        "type": "string",
+        "enum": ["code", "files", "paths"],
+        "description": "code: the generated text as one block (default). files: a JSON object of relative path to file contents, split in memory. paths: only the locations written to output_directory or output_zip"
+    }
+}
+
 @app.list_tools()
 async def list_tools() -> list[Tool]:
     """List available tools for code generation"""
@@ -33,6 +112,11 @@ async def list_tools() -> list[Tool]:
                     "file_path": {
                         "type": "string",
                         "description": "Absolute path to the OpenAPI specification file (.yaml, .yml, or .json)"
+                    },
+                    "detail": {
+                        "type": "string",
+                        "enum": ["summary", "full"],
+                        "description": "summary: one line per operation (default). full: also parameters, request body and response schemas with $refs resolved"
                     }
                 },
                 "required": ["file_path"]
@@ -40,7 +124,7 @@ async def list_tools() -> list[Tool]:
         ),
         Tool(
             name="parse_word_api_doc",
-            description="Parse a Word document (.docx) containing API descriptions and extract the text content.",
+            description="Parse a Word document (.docx) containing API descriptions. Endpoint tables are returned as an API summary; documents without any return their text content.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -54,7 +138,7 @@ async def list_tools() -> list[Tool]:
         ),
         Tool(
             name="generate_java_code",
-            description="Generate Java code implementation from an API description using AI. Uses bigcode/starcoderbase model with fallbacks. Optionally accepts archetype code as reference.",
+            description="Generate Java code implementation from an API description using AI. Uses bigcode/starcoderbase model with fallbacks. Optionally accepts archetype code as reference. When the request carries a progressToken, partial code is streamed as progress notifications while it is decoded.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -65,7 +149,9 @@ async def list_tools() -> list[Tool]:
                     "archetype_code": {
                         "type": "string",
                         "description": "Optional reference Java code to guide the generation style and patterns"
-                    }
+                    },
+                    **OUTPUT_OPTIONS,
+                    **GENERATION_OPTIONS
                 },
                 "required": ["api_description"]
             }
@@ -82,18 +168,262 @@ async def list_tools() -> list[Tool]:
                     },
                     "output_directory": {
                         "type": "string",
-                        "description": "Optional absolute path to directory where generated .java files will be saved. If not provided, code is returned without saving."
+                        "description": "Optional absolute path to directory where generated .java files will be saved. If neither this nor output_zip is given, code is returned without saving."
                     },
                     "archetype_directory": {
                         "type": "string",
-                        "description": "Optional absolute path to directory containing example .java files to use as archetypes"
-                    }
+                        "description": "Optional absolute path to directory containing example .java files to use as archetypes. The classes and methods most relevant to each endpoint are selected within a fixed token budget."
+                    },
+                    "incremental": {
+                        "type": "boolean",
+                        "description": "Diff the spec against the manifest in output_directory and regenerate only added or changed operations, deleting outputs of removed ones (requires output_directory)"
+                    },
+                    **SKELETON_OPTION,
+                    **OUTPUT_OPTIONS,
+                    **GENERATION_OPTIONS
                 },
                 "required": ["input_file"]
             }
+        ),
+        Tool(
+            name="submit_generation_job",
+            description="Start a code generation in the background and return a job id immediately. Pass either api_description or input_file. Poll with get_generation_job and stop with cancel_generation_job.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "api_description": {
+                        "type": "string",
+                        "description": "Text description of the API to implement"
+                    },
+                    "input_file": {
+                        "type": "string",
+                        "description": "Absolute path to input file (.yaml, .yml, .json, or .docx), used instead of api_description"
+                    },
+                    "archetype_code": {
+                        "type": "string",
+                        "description": "Optional reference Java code to guide the generation style and patterns"
+                    },
+                    "archetype_directory": {
+                        "type": "string",
+                        "description": "Optional absolute path to directory containing example .java files to use as archetypes. The classes and methods most relevant to each endpoint are selected within a fixed token budget."
+                    },
+                    "output_directory": {
+                        "type": "string",
+                        "description": "Optional absolute path to directory where generated .java files will be saved when the job finishes"
+                    },
+                    **SKELETON_OPTION,
+                    **OUTPUT_OPTIONS,
+                    **GENERATION_OPTIONS
+                }
+            }
+        ),
+        Tool(
+            name="get_generation_job",
+            description="Get the status of a generation job (queued, running, done, failed, cancelled or timeout) and its generated code once done. Without job_id, lists all known jobs.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "job_id": {
+                        "type": "string",
+                        "description": "Job id returned by submit_generation_job"
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="cancel_generation_job",
+            description="Cancel a queued or running generation job. A running job stops decoding at the next token.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "job_id": {
+                        "type": "string",
+                        "description": "Job id returned by submit_generation_job"
+                    }
+                },
+                "required": ["job_id"]
+            }
+        ),
+        Tool(
+            name="get_metrics",
+            description="Time spent per pipeline stage (parse, model load, prefill, decode, write) since the server started, with prompt and generated token counts, decode tokens/sec, generation cache hit rate, peak RSS and in-flight jobs.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "format": {
+                        "type": "string",
+                        "enum": ["json", "prometheus"],
+                        "description": "json (default) or the Prometheus text exposition format",
+                        "default": "json"
+                    }
+                }
+            }
         )
     ]
 
+def _parse_input(input_file: Path, detail: str = "summary") -> str:
+    """Parse an OpenAPI spec or Word document into an API description"""
+    if input_file.suffix in [".yaml", ".yml", ".json"]:
+        return parse_openapi(input_file, detail)
+    if input_file.suffix == ".docx":
+        return parse_word_doc(input_file, detail)
+    raise ValueError("Unsupported file type. Use .yaml, .json, or .docx")
+
+def _load_archetype(archetype_dir: Optional[str], api_description: str) -> str:
+    """Archetype snippets under archetype_dir most relevant to the API, within a token budget"""
+    return select_archetype(archetype_dir, api_description)
+
+def _run_generation(api_description: str, archetype: str, arguments: dict, on_chunk=None, cancel_event=None) -> str:
+    """Blocking generation body, executed on a job worker thread"""
+    use_cache = arguments.get("use_cache", True)
+    if not archetype and not arguments.get("chunked", False):
+        # Building the archetype index reads the whole tree, so it happens here
+        # rather than on the event loop; chunked runs select snippets per unit
+        archetype = _load_archetype(arguments.get("archetype_directory"), api_description)
+    pool = get_replica_pool()
+    if pool is not None:
+        # Replicas return whole results, so progress arrives as one chunk
+        if arguments.get("chunked", False):
+            code = pool.run(
+                "generate_chunked", cancel_event, api_desc=api_description, archetype=archetype,
+                batch_size=arguments.get("batch_size", 4), use_cache=use_cache,
+                archetype_dir=arguments.get("archetype_directory")
+            )
+        else:
+            code = pool.run("generate", cancel_event, api_desc=api_description, archetype=archetype, use_cache=use_cache)
+        code = (code or "").strip()
+        if on_chunk is not None and code:
+            on_chunk(code)
+        return code
+    if arguments.get("chunked", False):
+        return generate_code_chunked(
+            api_description, archetype, arguments.get("batch_size", 4), use_cache=use_cache, cancel_event=cancel_event,
+            archetype_dir=arguments.get("archetype_directory")
+        )
+    if get_coalescer() is not None:
+        # Batched with concurrent requests, so progress arrives as one chunk
+        code = generate_code_from_description(
+            api_description, archetype, use_cache=use_cache, cancel_event=cancel_event
+        ).strip()
+        if on_chunk is not None and code:
+            on_chunk(code)
+        return code
+
+    chunks = []
+    for chunk in stream_code_from_description(api_description, archetype, use_cache=use_cache, cancel_event=cancel_event):
+        chunks.append(chunk)
+        if on_chunk is not None:
+            on_chunk(chunk)
+    return "".join(chunks).strip()
+
+def _output_error(arguments: dict) -> Optional[str]:
+    """Error text for output options that cannot be honoured, checked before generating"""
+    if arguments.get("result_format") == "paths" and not (arguments.get("output_directory") or arguments.get("output_zip")):
+        return 'Error: result_format "paths" needs output_directory or output_zip'
+    return None
+
+def _save_outputs(generated_code: str, arguments: dict) -> str:
+    """Split generated code once into every requested output (output_directory,
+    output_zip, and memory for result_format "files"); returns the result text"""
+    result_format = arguments.get("result_format", "code")
+    memory = MemorySink() if result_format == "files" else None
+    sinks = [memory] if memory is not None else []
+    if arguments.get("output_zip"):
+        zip_path = Path(arguments["output_zip"])
+        zip_path.parent.mkdir(parents=True, exist_ok=True)
+        sinks.append(ZipSink(zip_path))
+    if arguments.get("output_directory"):
+        output_path = Path(arguments["output_directory"])
+        output_path.mkdir(parents=True, exist_ok=True)
+        sinks.append(DirectorySink(output_path))
+
+    written = []
+    if sinks:
+        output = TeeSink(*sinks)
+        try:
+            written = write_generated_code(generated_code, output)
+        finally:
+            output.close()
+    if result_format == "files":
+        return json.dumps(memory.files, indent=2)
+    if result_format == "paths":
+        return "\n".join(str(location) for location in written)
+    return generated_code
+
+def _run_generation_job(api_description: str, archetype: str, arguments: dict, cancel_event=None) -> str:
+    """Background job body: generate, then save to the requested outputs"""
+    generated_code = _run_generation(api_description, archetype, arguments, cancel_event=cancel_event)
+    if cancel_event.is_set():
+        return generated_code
+    return _save_outputs(generated_code, arguments)
+
+def _run_skeleton(input_file: Path, arguments: dict, cancel_event=None, save=False) -> str:
+    """Job body for skeleton generation; saves to the requested outputs if save is set"""
+    options = dict(
+        archetype=arguments.get("archetype_code", ""),
+        batch_size=arguments.get("batch_size", 4),
+        use_cache=arguments.get("use_cache", True),
+        archetype_dir=arguments.get("archetype_directory"),
+    )
+    pool = get_replica_pool()
+    if pool is not None:
+        # The replica parses the spec itself; only the path crosses the process boundary
+        generated_code = pool.run("generate_skeleton", cancel_event, input_path=str(input_file), **options) or ""
+    else:
+        generated_code = generate_skeleton_code(load_spec(input_file), cancel_event=cancel_event, **options)
+    if save and not cancel_event.is_set():
+        return _save_outputs(generated_code, arguments)
+    return generated_code
+
+def _run_incremental(input_file: Path, arguments: dict, cancel_event=None) -> dict:
+    """Job body for incremental generate_code_from_file runs"""
+    pool = get_replica_pool()
+    generate = {"generate": lambda units, **kwargs: pool.run("generate_units", units=units, **kwargs)} if pool else {}
+    return regenerate_incremental(
+        input_file,
+        Path(arguments["output_directory"]),
+        arguments.get("spec_detail", "summary"),
+        **generate,
+        batch_size=arguments.get("batch_size", 4),
+        use_cache=arguments.get("use_cache", True),
+        cancel_event=cancel_event,
+        archetype_dir=arguments.get("archetype_directory"),
+    )
+
+async def _generate(api_description: str, archetype: str, arguments: dict) -> str:
+    """Run generation on the job pool and wait for it.
+
+    When the client passed a progressToken, partial code is forwarded as
+    progress notifications while it is decoded; the complete code is always
+    returned as the tool result.
+    """
+    ctx = app.request_context
+    progress_token = ctx.meta.progressToken if ctx.meta else None
+    on_chunk = None
+
+    if progress_token is not None:
+        loop = asyncio.get_running_loop()
+        progress = itertools.count(1)
+
+        def on_chunk(chunk):
+            asyncio.run_coroutine_threadsafe(_send_progress(ctx, progress_token, next(progress), chunk), loop)
+
+    job = jobs.submit(
+        _run_generation, api_description, archetype, arguments, on_chunk,
+        description="generate_java_code", timeout=arguments.get("timeout_seconds")
+    )
+    await job.wait()
+    if job.status != "done":
+        raise RuntimeError(job.error or f"Generation {job.status}")
+    return job.result
+
+async def _send_progress(ctx, progress_token, progress: int, chunk: str):
+    try:
+        await ctx.session.send_progress_notification(progress_token, progress, message=chunk)
+    except TypeError:
+        # Older mcp releases have no message field on progress notifications
+        await ctx.session.send_progress_notification(progress_token, progress)
+
 @app.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     """Handle tool calls"""
@@ -107,7 +437,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
             return [TextContent(type="text", text=f"Error: Unsupported file type. Expected .yaml, .yml, or .json")]
         
         try:
-            description = parse_openapi(file_path)
+            description = parse_openapi(file_path, arguments.get("detail", "summary"))
             return [TextContent(type="text", text=description)]
         except Exception as e:
             return [TextContent(type="text", text=f"Error parsing OpenAPI spec: {str(e)}")]
@@ -129,66 +459,175 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     elif name == "generate_java_code":
         api_description = arguments["api_description"]
         archetype_code = arguments.get("archetype_code", "")
+        output_error = _output_error(arguments)
+        if output_error:
+            return [TextContent(type="text", text=output_error)]
         
         try:
-            generated_code = generate_code_from_description(api_description, archetype_code)
-            return [TextContent(type="text", text=generated_code)]
+            generated_code = await _generate(api_description, archetype_code, arguments)
+            # Sink writes block, so they run off the event loop
+            result = await asyncio.to_thread(_save_outputs, generated_code, arguments)
+            return [TextContent(type="text", text=result)]
         except Exception as e:
             return [TextContent(type="text", text=f"Error generating code: {str(e)}")]
     
     elif name == "generate_code_from_file":
         input_file = Path(arguments["input_file"])
         output_dir = arguments.get("output_directory")
-        archetype_dir = arguments.get("archetype_directory")
         
         if not input_file.exists():
             return [TextContent(type="text", text=f"Error: Input file not found: {input_file}")]
         
-        # Parse input file
-        try:
-            if input_file.suffix in [".yaml", ".yml", ".json"]:
-                api_description = parse_openapi(input_file)
-            elif input_file.suffix == ".docx":
-                api_description = parse_word_doc(input_file)
-            else:
-                return [TextContent(type="text", text="Error: Unsupported file type. Use .yaml, .json, or .docx")]
-        except Exception as e:
-            return [TextContent(type="text", text=f"Error parsing input file: {str(e)}")]
+        if input_file.suffix not in [".yaml", ".yml", ".json", ".docx"]:
+            return [TextContent(type="text", text="Error: Unsupported file type. Use .yaml, .json, or .docx")]
         
-        # Load archetype if provided
-        archetype_snippets = ""
-        if archetype_dir:
-            archetype_path = Path(archetype_dir)
-            if archetype_path.exists():
-                for java_file in archetype_path.rglob("*.java"):
-                    archetype_snippets += f"\n// FILE: {java_file.name}\n" + java_file.read_text()
+        output_error = None if arguments.get("incremental", False) else _output_error(arguments)
+        if output_error:
+            return [TextContent(type="text", text=output_error)]
+        
+        if arguments.get("incremental", False):
+            if not output_dir:
+                return [TextContent(type="text", text="Error: incremental mode requires output_directory")]
+            try:
+                job = jobs.submit(
+                    _run_incremental, input_file, arguments,
+                    description=str(input_file), timeout=arguments.get("timeout_seconds")
+                )
+                await job.wait()
+            except Exception as e:
+                return [TextContent(type="text", text=f"Error generating code: {str(e)}")]
+            if job.status != "done":
+                return [TextContent(type="text", text=f"Error generating code: {job.error or job.status}")]
+            return [TextContent(
+                type="text",
+                text=f"Incremental generation complete!\n\nOutput saved to: {output_dir}\n\n{json.dumps(job.result, indent=2)}"
+            )]
+        
+        if arguments.get("skeleton", False):
+            try:
+                job = jobs.submit(
+                    _run_skeleton, input_file, arguments,
+                    description=str(input_file), timeout=arguments.get("timeout_seconds")
+                )
+                await job.wait()
+            except Exception as e:
+                return [TextContent(type="text", text=f"Error generating code: {str(e)}")]
+            if job.status != "done":
+                return [TextContent(type="text", text=f"Error generating code: {job.error or job.status}")]
+            generated_code = job.result
+        else:
+            # Parse input file
+            try:
+                api_description = _parse_input(input_file, arguments.get("spec_detail", "summary"))
+            except Exception as e:
+                return [TextContent(type="text", text=f"Error parsing input file: {str(e)}")]
+            
+            # Generate code; archetype snippets are selected on the worker thread
+            try:
+                generated_code = await _generate(api_description, "", arguments)
+            except Exception as e:
+                return [TextContent(type="text", text=f"Error generating code: {str(e)}")]
         
-        # Generate code
+        # Save to output directory and/or archive if provided
         try:
-            generated_code = generate_code_from_description(api_description, archetype_snippets)
+            result = await asyncio.to_thread(_save_outputs, generated_code, arguments)
         except Exception as e:
-            return [TextContent(type="text", text=f"Error generating code: {str(e)}")]
-        
-        # Save to output directory if provided
-        if output_dir:
+            return [TextContent(type="text", text=f"Error saving files: {str(e)}\n\nGenerated code:\n{generated_code}")]
+        targets = [target for target in (output_dir, arguments.get("output_zip")) if target]
+        if targets:
+            return [TextContent(
+                type="text",
+                text=f"Code generated successfully!\n\nOutput saved to: {', '.join(targets)}\n\n{result}"
+            )]
+        return [TextContent(type="text", text=result)]
+    
+    elif name == "submit_generation_job":
+        archetype = arguments.get("archetype_code", "")
+        output_error = _output_error(arguments)
+        if output_error:
+            return [TextContent(type="text", text=output_error)]
+        if arguments.get("skeleton", False):
+            input_file = Path(arguments.get("input_file", ""))
+            if input_file.suffix not in [".yaml", ".yml", ".json", ".docx"] or not input_file.exists():
+                return [TextContent(type="text", text="Error: skeleton mode needs an existing input_file")]
+            try:
+                job = jobs.submit(
+                    _run_skeleton, input_file, arguments, save=True,
+                    description=str(input_file), timeout=arguments.get("timeout_seconds")
+                )
+            except Exception as e:
+                return [TextContent(type="text", text=f"Error submitting job: {str(e)}")]
+            return [TextContent(type="text", text=json.dumps(job.to_dict(), indent=2))]
+        if arguments.get("input_file"):
+            input_file = Path(arguments["input_file"])
+            if not input_file.exists():
+                return [TextContent(type="text", text=f"Error: Input file not found: {input_file}")]
             try:
-                output_path = Path(output_dir)
-                output_path.mkdir(parents=True, exist_ok=True)
-                write_generated_code(generated_code, output_path)
-                return [TextContent(
-                    type="text", 
-                    text=f"Code generated successfully!\n\nOutput saved to: {output_path}\n\n{generated_code}"
-                )]
+                api_description = _parse_input(input_file, arguments.get("spec_detail", "summary"))
             except Exception as e:
-                return [TextContent(type="text", text=f"Error saving files: {str(e)}\n\nGenerated code:\n{generated_code}")]
+                return [TextContent(type="text", text=f"Error parsing input file: {str(e)}")]
+        elif arguments.get("api_description"):
+            api_description = arguments["api_description"]
         else:
-            return [TextContent(type="text", text=generated_code)]
+            return [TextContent(type="text", text="Error: Provide either api_description or input_file")]
+        try:
+            job = jobs.submit(
+                _run_generation_job, api_description, archetype, arguments,
+                description=arguments.get("input_file", "api_description"),
+                timeout=arguments.get("timeout_seconds")
+            )
+        except Exception as e:
+            return [TextContent(type="text", text=f"Error submitting job: {str(e)}")]
+        return [TextContent(type="text", text=json.dumps(job.to_dict(), indent=2))]
+    
+    elif name == "get_generation_job":
+        job_id = arguments.get("job_id")
+        if not job_id:
+            listing = [job.to_dict() for job in jobs.jobs.values()]
+            return [TextContent(type="text", text=json.dumps(listing, indent=2))]
+        
+        job = jobs.get(job_id)
+        if job is None:
+            return [TextContent(type="text", text=f"Error: Unknown job: {job_id}")]
+        return [TextContent(type="text", text=json.dumps(job.to_dict(include_result=True), indent=2))]
+    
+    elif name == "cancel_generation_job":
+        job_id = arguments["job_id"]
+        if jobs.get(job_id) is None:
+            return [TextContent(type="text", text=f"Error: Unknown job: {job_id}")]
+        if not jobs.cancel(job_id):
+            return [TextContent(type="text", text=f"Job {job_id} already finished")]
+        return [TextContent(type="text", text=f"Job {job_id} cancelled")]
+    
+    elif name == "get_metrics":
+        pool = get_replica_pool()
+        snapshot = metrics.collect()
+        if pool is not None:
+            # Generation runs in the replicas; their counters are merged as requests finish
+            snapshot["cache"] = pool.cache_stats()
+        if arguments.get("format") == "prometheus":
+            text = metrics.to_prometheus(snapshot)
+            text += f"# TYPE hashira_jobs_inflight gauge\nhashira_jobs_inflight {jobs.inflight()}\n"
+            if pool is not None:
+                text += "# TYPE hashira_replica_utilization gauge\n" + "".join(
+                    f'hashira_replica_utilization{{replica="{r["replica"]}"}} {r["utilization"]}\n'
+                    for r in pool.stats()["replicas"]
+                )
+            return [TextContent(type="text", text=text)]
+        snapshot["jobs_inflight"] = jobs.inflight()
+        if pool is not None:
+            snapshot["replicas"] = pool.stats()
+        return [TextContent(type="text", text=json.dumps(snapshot, indent=2))]
     
     else:
         return [TextContent(type="text", text=f"Error: Unknown tool: {name}")]
 
 async def main():
     """Run the MCP server"""
+    # stdout carries the MCP protocol, so diagnostics go to stderr
+    print(f"Hashira MCP server imports took {IMPORT_SECONDS:.2f}s", file=sys.stderr)
+    # The model loads on a worker thread, where no signal handler can be set
+    loader.watch_signals()
     async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
         await app.run(
             read_stream,
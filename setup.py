@@ -30,7 +30,6 @@ setup(
         "transformers>=4.30.0",
         "torch>=2.0.0",
         "pyyaml>=6.0",
-        "python-docx>=0.8.11",
         "mcp>=1.0.0",
     ],
     extras_require={
@@ -40,6 +39,7 @@ setup(
         "console_scripts": [
             "hashira=cli:main",
             "hashira-mcp=server:main",
+            "hashira-daemon=llm.daemon:main",
         ],
     },
     include_package_data=True,
@@ -0,0 +1,339 @@
+"""
+Deterministic Java skeletons from the OpenAPI IR.
+
+Everything the spec already pins down is rendered here without the model:
+one @RestController per tag (or first path segment) with a mapped method per
+operation, and one DTO per schema. Named component schemas become one class
+each, however many operations use them; inline object schemas are
+deduplicated by their fields. Each method starts with a placeholder body,
+which llm.generator.generate_skeleton_code asks the model to replace.
+"""
+import re
+import textwrap
+from collections import namedtuple
+
+DEFAULT_PACKAGE = "com.example.api"
+
+PLACEHOLDER_BODY = 'throw new UnsupportedOperationException("Not implemented");'
+
+_JAVA_KEYWORDS = frozenset("""
+    abstract assert boolean break byte case catch char class const continue default do double else enum extends
+    false final finally float for goto if implements import instanceof int interface long native new null package
+    private protected public return short static strictfp super switch synchronized this throw throws transient
+    true try void volatile while var record yield
+""".split())
+
+_FORMAT_TYPES = {
+    ("string", "date"): "LocalDate",
+    ("string", "date-time"): "OffsetDateTime",
+    ("string", "uuid"): "UUID",
+    ("string", "binary"): "byte[]",
+    ("string", "byte"): "byte[]",
+    ("integer", "int64"): "Long",
+    ("number", "float"): "Float",
+    ("number", "double"): "Double",
+}
+_BASIC_TYPES = {"string": "String", "integer": "Integer", "number": "Double", "boolean": "Boolean"}
+
+_MAPPINGS = {"get": "GetMapping", "post": "PostMapping", "put": "PutMapping", "delete": "DeleteMapping", "patch": "PatchMapping"}
+_PARAM_ANNOTATIONS = {"path": "PathVariable", "query": "RequestParam", "header": "RequestHeader", "cookie": "CookieValue"}
+
+_MODEL_IMPORTS = [
+    "import java.math.*;",
+    "import java.time.*;",
+    "import java.util.*;",
+    "import com.fasterxml.jackson.annotation.JsonProperty;",
+]
+_CONTROLLER_IMPORTS = [
+    "import java.time.*;",
+    "import java.util.*;",
+    "import org.springframework.http.ResponseEntity;",
+    "import org.springframework.web.bind.annotation.*;",
+]
+
+# DTO outlines shown to the model per method body, nearest first
+MAX_CONTEXT_TYPES = 6
+
+_WORD = re.compile(r"[A-Za-z0-9]+")
+_IDENTIFIER = re.compile(r"[A-Za-z_$][\w$]*")
+
+# A body that declares these was not a body, e.g. a whole class
+_NOT_A_BODY = re.compile(r"^\s*(package|import)\s|\b(class|interface|enum|record)\s+[A-Za-z_$][\w$]*\s*(extends|implements|\{)", re.MULTILINE)
+
+# Braces and the tokens that hide them, for extract_body
+_BODY_SPECIAL = re.compile(r'//[^\n]*|/\*.*?(?:\*/|$)|"(?:\\.|[^"\\\n])*"?|\'(?:\\.|[^\'\\\n])*\'?|[{}]', re.DOTALL)
+
+Field = namedtuple("Field", ["name", "wire_name", "java_type"])
+Dto = namedtuple("Dto", ["name", "kind", "fields", "values"])
+Method = namedtuple("Method", ["key", "controller", "name", "summary", "annotations", "signature", "types"])
+
+def pascal_case(text):
+    words = _WORD.findall(text or "")
+    name = "".join(word[:1].upper() + word[1:] for word in words)
+    return name if name and not name[0].isdigit() else f"_{name}"
+
+def camel_case(text):
+    name = pascal_case(text)
+    name = name[:1].lower() + name[1:] if name[:1] != "_" else name
+    return f"{name}_" if name in _JAVA_KEYWORDS else name
+
+def _unique(name, taken):
+    candidate, n = name, 2
+    while candidate in taken:
+        candidate, n = f"{name}{n}", n + 1
+    taken.add(candidate)
+    return candidate
+
+def _enum_constant(value):
+    name = re.sub(r"[^A-Za-z0-9]+", "_", str(value)).strip("_").upper() or "VALUE"
+    return f"_{name}" if name[0].isdigit() else name
+
+class Skeleton:
+    """Controllers and DTOs for one ApiSpec.
+
+    `methods` lists every operation in spec order; render() takes the
+    generated bodies in the same order (None keeps the placeholder).
+    """
+
+    def __init__(self, spec, package=DEFAULT_PACKAGE):
+        self.package = package
+        self.dtos = []
+        self.methods = []
+        self._dtos_by_name = {}
+        self._class_names = set()
+        self._named = {}
+        self._inline = {}
+        self._method_names = {}
+        for op in spec.operations:
+            self._add_operation(op)
+
+    # Types
+
+    def java_type(self, schema, hint):
+        """Java type for a schema, registering DTOs for object and enum schemas"""
+        if schema is None:
+            return "Object"
+        if schema.type == "array" or (schema.items is not None and not schema.properties):
+            return f"List<{self.java_type(schema.items, hint + 'Item')}>"
+        if schema.name and (schema.properties or schema.enum or schema.type in (None, "object")):
+            return self._named_dto(schema)
+        if schema.properties:
+            return self._inline_dto(schema, hint)
+        if schema.type == "object" or schema.type is None:
+            return "Map<String, Object>"
+        return _FORMAT_TYPES.get((schema.type, schema.format), _BASIC_TYPES.get(schema.type, "Object"))
+
+    def _named_dto(self, schema):
+        key = schema.ref or schema.name
+        if key in self._named:
+            return self._named[key]
+        if not schema.properties and not schema.enum:
+            # A named free-form object has nothing to generate
+            self._named[key] = "Map<String, Object>"
+            return self._named[key]
+        name = _unique(pascal_case(schema.name), self._class_names)
+        # Registered before its fields so recursive schemas refer to themselves
+        self._named[key] = name
+        self._add_dto(name, schema)
+        return name
+
+    def _inline_dto(self, schema, hint):
+        signature = tuple(
+            (prop, prop_schema.label(), prop in schema.required) for prop, prop_schema in schema.properties.items()
+        )
+        if signature in self._inline:
+            return self._inline[signature]
+        name = _unique(pascal_case(hint), self._class_names)
+        self._inline[signature] = name
+        self._add_dto(name, schema)
+        return name
+
+    def _add_dto(self, name, schema):
+        if schema.enum and not schema.properties:
+            dto = Dto(name, "enum", (), tuple(schema.enum))
+        else:
+            fields, taken = [], set()
+            for prop, prop_schema in schema.properties.items():
+                field_name = _unique(camel_case(prop), taken)
+                fields.append(Field(field_name, prop, self.java_type(prop_schema, name + pascal_case(prop))))
+            dto = Dto(name, "class", tuple(fields), ())
+        self.dtos.append(dto)
+        self._dtos_by_name[name] = dto
+
+    # Operations
+
+    def _method_name(self, op, controller):
+        if op.operation_id:
+            base = camel_case(op.operation_id)
+        else:
+            words = [op.method]
+            for segment in op.path.strip("/").split("/"):
+                words.append(f"by {segment[1:-1]}" if segment.startswith("{") else segment)
+            base = camel_case(" ".join(words))
+        return _unique(base, self._method_names.setdefault(controller, set()))
+
+    def _add_operation(self, op):
+        if op.tags:
+            controller = pascal_case(op.tags[0]) + "Controller"
+        else:
+            segment = next((s for s in op.path.strip("/").split("/") if s and not s.startswith("{")), "Default")
+            controller = pascal_case(segment) + "Controller"
+        name = self._method_name(op, controller)
+
+        arguments, taken = [], set()
+        for param in op.parameters:
+            annotation = _PARAM_ANNOTATIONS.get(param.location)
+            if annotation is None:
+                continue
+            java_type = self.java_type(param.schema, name + pascal_case(param.name)) if param.schema else "String"
+            if java_type == "Object":
+                java_type = "String"
+            options = f'"{param.name}"' if param.location == "path" or param.required else (
+                f'value = "{param.name}", required = false'
+            )
+            arguments.append(f"@{annotation}({options}) {java_type} {_unique(camel_case(param.name), taken)}")
+        if op.request_body is not None:
+            body_type = self.java_type(op.request_body, name + "Request")
+            arguments.append(f"@RequestBody {body_type} {_unique('body', taken)}")
+
+        response = self._success_schema(op)
+        return_type = self.java_type(response, name + "Response") if response is not None else "Void"
+
+        mapping = _MAPPINGS.get(op.method)
+        if mapping:
+            annotations = [f'@{mapping}("{op.path}")']
+        else:
+            annotations = [f'@RequestMapping(value = "{op.path}", method = RequestMethod.{op.method.upper()})']
+        signature = f"public ResponseEntity<{return_type}> {name}({', '.join(arguments)})"
+        types = self._referenced_types(signature)
+        self.methods.append(Method(op.key, controller, name, op.summary, tuple(annotations), signature, types))
+
+    @staticmethod
+    def _success_schema(op):
+        for status in sorted(op.responses):
+            if status.startswith("2") and op.responses[status] is not None:
+                return op.responses[status]
+        return None
+
+    def _referenced_types(self, signature):
+        """DTOs a method uses, directly or through their fields"""
+        pending = [word for word in _IDENTIFIER.findall(signature) if word in self._dtos_by_name]
+        used = []
+        while pending and len(used) < MAX_CONTEXT_TYPES:
+            name = pending.pop(0)
+            if name in used:
+                continue
+            used.append(name)
+            for field in self._dtos_by_name[name].fields:
+                pending += [word for word in _IDENTIFIER.findall(field.java_type) if word in self._dtos_by_name]
+        return tuple(used)
+
+    # Rendering
+
+    def dto_summary(self, name):
+        """One-line outline of a DTO for prompts, e.g. "class User { Long id; String name; }" """
+        dto = self._dtos_by_name[name]
+        if dto.kind == "enum":
+            return f"enum {dto.name} {{ {', '.join(_enum_constant(value) for value in dto.values)} }}"
+        return f"class {dto.name} {{ " + " ".join(f"{f.java_type} {f.name};" for f in dto.fields) + " }"
+
+    def method_context(self, method):
+        """What the model sees when writing one method body"""
+        lines = []
+        if method.types:
+            lines.append("Types:")
+            lines += [self.dto_summary(name) for name in method.types]
+            lines.append("")
+        lines.append(f"Controller: {method.controller}")
+        if method.summary:
+            lines.append(f"// {method.summary}")
+        lines += list(method.annotations)
+        lines.append(method.signature + " {")
+        return "\n".join(lines)
+
+    def _render_dto(self, dto):
+        if dto.kind == "enum":
+            constants = ",\n".join(
+                f'    @JsonProperty("{value}")\n    {_enum_constant(value)}' for value in dto.values
+            )
+            return f"public enum {dto.name} {{\n{constants}\n}}\n"
+        fields, accessors = [], []
+        for field in dto.fields:
+            if field.name != field.wire_name:
+                fields.append(f'    @JsonProperty("{field.wire_name}")')
+            fields.append(f"    private {field.java_type} {field.name};")
+            suffix = field.name[:1].upper() + field.name[1:]
+            accessors.append(
+                f"    public {field.java_type} get{suffix}() {{\n        return {field.name};\n    }}\n\n"
+                f"    public void set{suffix}({field.java_type} {field.name}) {{\n        this.{field.name} = {field.name};\n    }}"
+            )
+        body = "\n".join(fields)
+        if accessors:
+            body += "\n\n" + "\n\n".join(accessors)
+        return f"public class {dto.name} {{\n{body}\n}}\n"
+
+    def render(self, bodies=()):
+        """Java source of every DTO and controller, as one stream for the writer"""
+        bodies = list(bodies) + [None] * (len(self.methods) - len(bodies))
+        parts = []
+        if self.dtos:
+            parts.append(f"package {self.package}.model;\n\n" + "\n".join(_MODEL_IMPORTS) + "\n")
+            parts += [self._render_dto(dto) for dto in self.dtos]
+
+        parts.append(f"package {self.package};\n\n" + "\n".join(_CONTROLLER_IMPORTS))
+        if self.dtos:
+            parts[-1] += f"\nimport {self.package}.model.*;"
+        parts[-1] += "\n"
+        controllers = {}
+        for method, body in zip(self.methods, bodies):
+            body = body if body is not None else PLACEHOLDER_BODY
+            lines = []
+            if method.summary:
+                lines.append(f"    /** {method.summary} */")
+            lines += [f"    {annotation}" for annotation in method.annotations]
+            lines.append(f"    {method.signature} {{")
+            lines.append(textwrap.indent(body, " " * 8))
+            lines.append("    }")
+            controllers.setdefault(method.controller, []).append("\n".join(lines))
+        for controller, methods in controllers.items():
+            parts.append(f"@RestController\npublic class {controller} {{\n\n" + "\n\n".join(methods) + "\n}\n")
+        return "\n".join(parts)
+
+def build_skeleton(spec, package=DEFAULT_PACKAGE):
+    return Skeleton(spec, package)
+
+def extract_body(text):
+    """The statements of a method body from model output, or None if unusable.
+
+    Accepts bare statements (stopping at the brace that closes the method) or
+    a whole method, in or out of a Markdown code fence. Output whose braces
+    never balance, as from a truncated generation, or that declares a
+    package, imports or a type is rejected.
+    """
+    fence = re.search(r"```(?:java)?\n(.*?)(?:```|$)", text, re.DOTALL)
+    if fence:
+        text = fence.group(1)
+    text = text.strip("\n")
+
+    depth, start, end = 0, 0, None
+    wrapped = re.match(r"\s*(@\w+|public|private|protected)\b", text) is not None
+    for match in _BODY_SPECIAL.finditer(text):
+        token = match.group()
+        if token == "{":
+            if wrapped and depth == 0 and start == 0:
+                start = match.end()
+            depth += 1
+        elif token == "}":
+            depth -= 1
+            if depth == (0 if wrapped else -1):
+                end = match.start()
+                break
+    if end is None:
+        if depth != 0 or wrapped:
+            return None
+        end = len(text)
+
+    body = textwrap.dedent(text[start:end].strip("\n")).strip()
+    if not body or _NOT_A_BODY.search(body):
+        return None
+    return body
@@ -1,22 +1,489 @@
+import json
+import os
 import re
+import tempfile
+import warnings
+import zipfile
+from collections import namedtuple
+from pathlib import Path
 
-def write_generated_code(code_str, output_dir):
-    class_defs = re.findall(r'(public\s+class\s+\w+\s*\{[^}]*\})', code_str, re.DOTALL)
-    if not class_defs:
-        # fallback to simple split if regex fails
-        parts = code_str.split("class ")
-        for part in parts[1:]:
-            lines = part.splitlines()
-            class_name = lines[0].split(" ")[0].strip("{")
-            file_path = output_dir / f"{class_name}.java"
-            with open(file_path, "w") as f:
-                f.write("class " + part)
-        return
-
-    for class_def in class_defs:
-        match = re.search(r'public\s+class\s+(\w+)', class_def)
-        if match:
-            class_name = match.group(1)
-            file_path = output_dir / f"{class_name}.java"
-            with open(file_path, "w") as f:
-                f.write(class_def)
+from llm.metrics import incr, timed
+
+# Written next to the generated sources, listing the files hashira owns
+MANIFEST_NAME = ".hashira-manifest.json"
+
+# Characters held back at the end of each fed chunk, so that two- and
+# three-character tokens (//, /*, */, """) split across chunks are still seen
+_LOOKAHEAD = 2
+
+_TYPE_DECL = re.compile(r'\b(class|interface|enum|record|@interface)\s+([A-Za-z_$][\w$]*)')
+_PACKAGE = re.compile(r'^\s*package\s+([\w.]+)\s*;', re.MULTILINE)
+
+_CODE_SPECIAL = re.compile(r'[{};/"\']')
+# At the top level, annotation arguments are tracked too: the braces of
+# @SuppressWarnings({"unchecked"}) neither open nor close a type
+_TOP_SPECIAL = re.compile(r'[{};/"\'()]')
+_ANNOTATION_NAME = re.compile(r'@[A-Za-z_$][\w$.]*\s*$')
+_LITERAL_SPECIAL = {
+    '"': re.compile(r'[\\"\n]'),
+    "'": re.compile(r"[\\'\n]"),
+    '"""': re.compile(r'[\\"]'),
+}
+
+# imports are those of the package section the type was declared in
+def _body_brace(segment):
+    """Index of the { opening a type's body: the first one outside comments,
+    literals and annotation arguments, or -1"""
+    parens, i, n = 0, 0, len(segment)
+    while i < n:
+        c = segment[i]
+        if segment.startswith("//", i) or segment.startswith("/*", i):
+            close = segment.find("\n" if c == "/" and segment[i + 1] == "/" else "*/", i + 2)
+            if close == -1:
+                return -1
+            i = close + 1
+        elif c in "\"'":
+            # Like the splitter, a newline ends a broken literal (an apostrophe in prose)
+            i += 1
+            while i < n and segment[i] not in (c, "\n"):
+                i += 2 if segment[i] == "\\" else 1
+            i += 1
+        else:
+            if c == "(":
+                parens += 1
+            elif c == ")":
+                parens = max(parens - 1, 0)
+            elif c == "{" and not parens:
+                return i
+            i += 1
+    return -1
+
+JavaType = namedtuple("JavaType", ["package", "name", "kind", "source", "imports"], defaults=((),))
+
+class JavaTypeSplitter:
+    """Single-pass splitter of generated Java text into top-level types.
+
+    Feed it the model output in chunks of any size (whole strings or streamed
+    tokens); each call returns the top-level types that closed within the
+    chunk. Braces inside string, char and text-block literals and comments
+    are ignored, so method bodies never cut a class short. Package and import
+    statements seen at the top level are kept with the types of their
+    section: a package statement, or imports following a type, start a new
+    one, as at the top of each file the model writes. Prose the model writes
+    between types is dropped.
+    """
+
+    def __init__(self):
+        self.package = None
+        # Imports of the current section, and whether a type has closed in it
+        self.imports = []
+        self._section_types = False
+        self._buf = ""
+        self._pos = 0        # next character to scan
+        self._start = 0      # start of the current top-level segment
+        self._depth = 0
+        self._parens = 0     # open parentheses of a top-level annotation
+        self._state = None   # None, "line", "block", '"', "'" or '"""'
+        # "}" with nothing open, e.g. the brace ending a method body
+        self.stray_closes = 0
+
+    @property
+    def depth(self):
+        """Brace depth after the text scanned so far"""
+        return self._depth
+
+    def pending(self):
+        """Scanned top-level text since the last type or statement ended"""
+        return self._buf[self._start:self._pos]
+
+    def feed(self, text):
+        self._buf += text
+        types = self._scan(len(self._buf) - _LOOKAHEAD)
+        # Drop everything before the current segment; it has been consumed
+        if self._start:
+            self._buf = self._buf[self._start:]
+            self._pos -= self._start
+            self._start = 0
+        return types
+
+    def close(self):
+        """Flush the rest of the input; a type left open by a truncated
+        generation is closed with the braces it is missing"""
+        types = self._scan(len(self._buf))
+        if self._depth > 0:
+            segment = self._buf[self._start:].rstrip() + "\n" + "}" * self._depth + "\n"
+            java_type = self._make_type(segment)
+            if java_type:
+                types.append(java_type)
+        self._buf, self._pos, self._start, self._depth, self._state = "", 0, 0, 0, None
+        self._parens = 0
+        return types
+
+    def _scan(self, end):
+        # Jump between significant characters with regexes instead of
+        # stepping through every character of the output
+        buf, i, types = self._buf, self._pos, []
+        while i < end:
+            state = self._state
+            if state is None:
+                top = self._depth == 0
+                match = (_TOP_SPECIAL if top else _CODE_SPECIAL).search(buf, i, end)
+                if not match:
+                    i = end
+                    break
+                i = match.start()
+                c = buf[i]
+                if c == "/":
+                    if buf.startswith("//", i):
+                        self._state, i = "line", i + 2
+                    elif buf.startswith("/*", i):
+                        self._state, i = "block", i + 2
+                    else:
+                        i += 1
+                elif c == '"':
+                    if buf.startswith('"""', i):
+                        self._state, i = '"""', i + 3
+                    else:
+                        self._state, i = '"', i + 1
+                elif c == "'":
+                    self._state, i = "'", i + 1
+                elif c == "(":
+                    if self._parens or _ANNOTATION_NAME.search(buf, max(self._start, i - 256), i):
+                        self._parens += 1
+                    i += 1
+                elif c == ")":
+                    self._parens = max(self._parens - 1, 0)
+                    i += 1
+                elif top and self._parens:
+                    # { } ; inside annotation arguments
+                    i += 1
+                elif c == "{":
+                    self._depth += 1
+                    i += 1
+                elif c == "}":
+                    if self._depth > 0:
+                        self._depth -= 1
+                        if self._depth == 0:
+                            java_type = self._make_type(buf[self._start:i + 1])
+                            if java_type:
+                                types.append(java_type)
+                            self._start = i + 1
+                    else:
+                        self.stray_closes += 1
+                    i += 1
+                else:
+                    if self._depth == 0:
+                        self._statement(buf[self._start:i + 1])
+                        self._start = i + 1
+                    i += 1
+            elif state == "line":
+                newline = buf.find("\n", i, end)
+                if newline == -1:
+                    i = end
+                else:
+                    self._state, i = None, newline + 1
+            elif state == "block":
+                close = buf.find("*/", i, end + 1)
+                if close == -1:
+                    i = end
+                else:
+                    self._state, i = None, close + 2
+            else:
+                # String, char or text-block literal; a newline ends a broken single-line one
+                match = _LITERAL_SPECIAL[state].search(buf, i, end)
+                if not match:
+                    i = end
+                    break
+                i = match.start()
+                if buf[i] == "\\":
+                    i += 2
+                elif state == '"""':
+                    if buf.startswith('"""', i):
+                        self._state, i = None, i + 3
+                    else:
+                        i += 1
+                else:
+                    self._state, i = None, i + 1
+        self._pos = i
+        return types
+
+    def _statement(self, text):
+        lines = text.strip().splitlines()
+        statement = lines[-1].strip() if lines else ""
+        if statement.startswith("package "):
+            match = _PACKAGE.match(statement)
+            if match:
+                self.package = match.group(1)
+                self.imports, self._section_types = [], False
+        elif statement.startswith("import "):
+            if self._section_types:
+                # The next file of the same package
+                self.imports, self._section_types = [], False
+            if statement not in self.imports:
+                self.imports.append(statement)
+
+    def _make_type(self, segment):
+        brace = _body_brace(segment)
+        match = _TYPE_DECL.search(segment[:brace] if brace != -1 else segment)
+        if not match:
+            return None
+        # Keep the declaration line plus the annotations and comments directly
+        # above it; anything earlier is prose or markdown from the model
+        head = segment[:match.start()]
+        line_start = head.rfind("\n") + 1
+        lines = head[:line_start].splitlines()
+        keep = len(lines)
+        while keep > 0 and lines[keep - 1].strip().startswith(("@", "/*", "*", "//")):
+            keep -= 1
+        source = "\n".join(lines[keep:] + [segment[line_start:].strip()]).strip()
+        self._section_types = True
+        return JavaType(self.package, match.group(2), match.group(1), source, tuple(self.imports))
+
+class _MemberSplitter(JavaTypeSplitter):
+    """Splits a type body into its members (fields, methods, nested types)
+    with the same literal- and comment-aware scan"""
+
+    def __init__(self):
+        super().__init__()
+        self.members = []
+
+    def _statement(self, text):
+        if text.strip() == ";" and self.members:
+            # The end of a field whose initializer has braces, e.g. int[] a = {1, 2};
+            self.members[-1] += ";"
+        elif text.strip():
+            self.members.append(text.strip())
+
+    def _make_type(self, segment):
+        self.members.append(segment.strip())
+        return None
+
+def _members(body):
+    splitter = _MemberSplitter()
+    splitter.feed(body)
+    splitter.close()
+    return splitter.members
+
+def _member_key(member):
+    # The declaration (signature or field) identifies a member; annotations,
+    # comments and bodies may differ between units
+    lines = member.splitlines()
+    while lines and lines[0].strip().startswith(("@", "//", "/*", "*")):
+        lines.pop(0)
+    declaration = re.split(r"[{;=]", " ".join(lines), maxsplit=1)[0]
+    return re.sub(r"\s+", " ", declaration).strip()
+
+def _body_bounds(source):
+    start = _body_brace(source)
+    if start == -1:
+        raise ValueError("no type body")
+    return start + 1, source.rindex("}")
+
+def merge_java_types(existing, addition):
+    """existing with the members of addition (a type of the same name) it does
+    not declare yet appended; per-operation units each generate the same
+    controller with different methods"""
+    try:
+        start, end = _body_bounds(existing.source)
+        new_start, new_end = _body_bounds(addition.source)
+    except ValueError:
+        return existing
+    keys = {_member_key(member) for member in _members(existing.source[start:end])}
+    added = [member for member in _members(addition.source[new_start:new_end]) if _member_key(member) not in keys]
+    imports = existing.imports + tuple(i for i in addition.imports if i not in existing.imports)
+    if not added:
+        return existing._replace(imports=imports)
+    # Only the first line lost its indentation to strip()
+    members = "\n\n".join("    " + member for member in added)
+    source = existing.source[:end].rstrip() + "\n\n" + members + "\n" + existing.source[end:]
+    return existing._replace(source=source, imports=imports)
+
+def _atomic_write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def render_java_file(java_type, imports=None):
+    """Source file text of java_type; imports default to those of its section"""
+    imports = java_type.imports if imports is None else imports
+    header = ""
+    if java_type.package:
+        header += f"package {java_type.package};\n\n"
+    if imports:
+        header += "\n".join(imports) + "\n\n"
+    return header + java_type.source + "\n"
+
+def java_file_path(java_type):
+    """Path of a type's source file relative to the source root, e.g. "com/example/api/User.java" """
+    package_path = java_type.package.replace(".", "/") + "/" if java_type.package else ""
+    return f"{package_path}{java_type.name}.java"
+
+class DirectorySink:
+    """Writes files under output_dir, replacing each one atomically; locations are absolute Paths"""
+
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+
+    def write(self, relative_path, text):
+        path = self.output_dir.joinpath(*relative_path.split("/"))
+        _atomic_write(path, text)
+        return path
+
+    def close(self):
+        pass
+
+class MemorySink:
+    """Keeps files in memory, in the order they were first written, keyed by relative path"""
+
+    def __init__(self):
+        self.files = {}
+
+    def write(self, relative_path, text):
+        self.files[relative_path] = text
+        return relative_path
+
+    def read(self, relative_path):
+        return self.files[relative_path]
+
+    def close(self):
+        pass
+
+class ZipSink:
+    """Streams files into a ZIP archive as they are written.
+
+    target is a path or a seekable binary file such as BytesIO. Nothing is
+    buffered beyond the entry being compressed. A file written twice is
+    stored twice and the later entry wins on extraction, like an overwrite.
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self._archive = zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED)
+
+    def write(self, relative_path, text):
+        with warnings.catch_warnings():
+            # zipfile warns about duplicate names; see the class docstring
+            warnings.simplefilter("ignore", UserWarning)
+            self._archive.writestr(relative_path, text)
+        return relative_path
+
+    def read(self, relative_path):
+        """Contents of a stored file; the archive must be closed first"""
+        if hasattr(self.target, "seek"):
+            self.target.seek(0)
+        with zipfile.ZipFile(self.target) as archive:
+            return archive.read(relative_path).decode("utf-8")
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+class TeeSink:
+    """Writes every file to each of sinks; locations are those of the first sink"""
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def write(self, relative_path, text):
+        locations = [sink.write(relative_path, text) for sink in self.sinks]
+        return locations[0]
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+def _as_sink(output):
+    # Plain paths keep meaning "write into this directory"
+    return output if hasattr(output, "write") else DirectorySink(output)
+
+def _output_dir(sink):
+    # The directory a sink writes into, if any
+    if isinstance(sink, DirectorySink):
+        return sink.output_dir
+    for inner in getattr(sink, "sinks", ()):
+        output_dir = _output_dir(inner)
+        if output_dir is not None:
+            return output_dir
+    return None
+
+class StreamingJavaWriter:
+    """Writes each top-level type to <package path>/<Name>.java in a sink as
+    soon as it closes in the fed text. output is a sink (DirectorySink,
+    MemorySink, ZipSink or TeeSink) or a directory path. Closing the writer
+    records the files written into a directory in its manifest."""
+
+    def __init__(self, output):
+        self.sink = _as_sink(output)
+        self.splitter = JavaTypeSplitter()
+        # Sink locations of the written files, e.g. Paths for a directory
+        self.written = []
+        self._seen = set()
+        # Written types by file path, to merge types that appear again
+        self._types = {}
+
+    def _write(self, types):
+        locations = []
+        for java_type in types:
+            path = java_file_path(java_type)
+            # A type that appears again, e.g. the same controller from another
+            # operation's unit, is merged into the file written before
+            if path in self._types:
+                java_type = merge_java_types(self._types[path], java_type)
+                incr("types_merged")
+            self._types[path] = java_type
+            location = self.sink.write(path, render_java_file(java_type))
+            locations.append(location)
+            incr("files_written")
+            if location not in self._seen:
+                self._seen.add(location)
+                self.written.append(location)
+        return locations
+
+    def feed(self, text):
+        with timed("write"):
+            return self._write(self.splitter.feed(text))
+
+    def close(self):
+        with timed("write"):
+            locations = self._write(self.splitter.close())
+            output_dir = _output_dir(self.sink)
+            if output_dir is not None and self._types:
+                # Lets a later --incremental run find (and clean up) these files
+                save_manifest(output_dir, {}, self._types)
+            return locations
+
+def write_generated_code(code_str, output):
+    """Split generated code into one .java file per top-level type in output
+    (a sink or a directory); returns the written locations. Sinks are left
+    open for the caller to close."""
+    writer = StreamingJavaWriter(output)
+    writer.feed(code_str)
+    writer.close()
+    return writer.written
+
+def load_manifest(output_dir):
+    """Read the manifest of an output directory.
+
+    "files" lists every file hashira wrote there, relative to output_dir.
+    "operations" maps each operation key ("GET /users") of an incremental
+    run to {"hash": content hash of the operation, "code": its generated
+    code, "files": [the files it contributes to]}; it is empty after a full
+    run, and both are empty when the directory has no manifest yet.
+    """
+    try:
+        with open(output_dir / MANIFEST_NAME, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    operations = manifest.get("operations", {})
+    files = manifest.get("files") or sorted({path for entry in operations.values() for path in entry["files"]})
+    return {"operations": operations, "files": files}
+
+def save_manifest(output_dir, operations, files):
+    fd, tmp = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"version": 2, "operations": operations, "files": sorted(files)}, f, indent=2, sort_keys=True)
+    os.replace(tmp, output_dir / MANIFEST_NAME)
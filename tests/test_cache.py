@@ -0,0 +1,26 @@
+import os
+import time
+
+from llm.cache import GenerationCache
+
+def test_eviction_drops_least_recently_used_entries_and_keeps_the_byte_count(tmp_path):
+    cache = GenerationCache(tmp_path, max_bytes=100)
+    start = time.time() - 100
+    for i, key in enumerate("abcde"):
+        cache.put(key, key * 20)
+        # Distinct mtimes, oldest first, whatever the filesystem's resolution
+        os.utime(cache._path(key), (start + i, start + i))
+    assert cache._bytes == 100
+    assert sorted(path.stem for path in tmp_path.glob("*.txt")) == list("abcde")
+
+    # Reading a makes it the most recently used, so b and c go first
+    assert cache.get("a") == "a" * 20
+    cache.put("f", "f" * 20)
+    assert sorted(path.stem for path in tmp_path.glob("*.txt")) == list("adef")
+    assert cache._bytes == 80
+
+    # Replacing an entry counts only the difference in size
+    cache.put("d", "d" * 30)
+    assert cache._bytes == 90 == cache.stats()["bytes"]
+    assert cache.get("b") is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
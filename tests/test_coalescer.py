@@ -0,0 +1,49 @@
+import threading
+import time
+
+from llm.coalescer import Coalescer
+
+class Recorder:
+    """Stands in for a batched pipeline call, keeping each batch it ran"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, items, cancel_event):
+        self.batches.append(list(items))
+        return [item.upper() for item in items]
+
+def submit_all(coalescer, items):
+    results = {}
+
+    def call(item):
+        results[item] = coalescer.submit(item)
+
+    threads = [threading.Thread(target=call, args=(item,)) for item in items]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+def test_concurrent_requests_share_a_batch_and_get_their_own_results():
+    run = Recorder()
+    results = submit_all(Coalescer(run, window=1.0, max_batch=3), ["a", "b", "c"])
+    assert results == {"a": "A", "b": "B", "c": "C"}
+    assert len(run.batches) == 1 and sorted(run.batches[0]) == ["a", "b", "c"]
+
+def test_requests_beyond_max_batch_go_to_the_next_batch():
+    run = Recorder()
+    results = submit_all(Coalescer(run, window=0.2, max_batch=2), ["a", "b", "c"])
+    assert results == {"a": "A", "b": "B", "c": "C"}
+    assert sorted(len(batch) for batch in run.batches) == [1, 2]
+
+def test_request_cancelled_in_the_window_is_left_out_of_the_batch():
+    run = Recorder()
+    coalescer, cancel_event = Coalescer(run, window=1.0, max_batch=4), threading.Event()
+    threading.Timer(0.05, cancel_event.set).start()
+    started = time.perf_counter()
+    assert coalescer.submit("a", cancel_event) is None
+    assert time.perf_counter() - started < 1.0
+    assert coalescer.submit("b") == "B"
+    assert run.batches == [["b"]]
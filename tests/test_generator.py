@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+import pytest
+
+from llm.generator import DecodeClock, context_length, fit_context, split_operations
+
+class WordTokenizer:
+    def __call__(self, text):
+        return {"input_ids": text.split()}
+
+def pipe(**config):
+    return SimpleNamespace(model=SimpleNamespace(config=SimpleNamespace(**config)), tokenizer=WordTokenizer())
+
+def test_budget_is_capped_by_what_the_context_leaves():
+    assert context_length(pipe(n_positions=1024)) == 1024
+    assert fit_context(pipe(max_position_embeddings=100), ["a b c", "a " * 40], 4096) == 60
+    assert fit_context(pipe(max_position_embeddings=100), ["a b c"], 50) == 50
+
+def test_unknown_context_keeps_the_budget():
+    assert fit_context(SimpleNamespace(tokenizer=WordTokenizer()), ["a"], 4096) == 4096
+
+def test_prompt_filling_the_context_is_rejected():
+    with pytest.raises(ValueError):
+        fit_context(pipe(n_positions=4), ["a b c d e"], 10)
+
+def test_prose_starting_with_a_method_word_is_not_an_operation():
+    api = "OpenAPI Spec:\n- GET /users: list users\n  Get returns every user.\n- DELETE /users/{id}: remove a user\nDelete is permanent.\n"
+    units = split_operations(api)
+    assert len(units) == 2
+    assert units[0].endswith("- GET /users: list users\n  Get returns every user.")
+    assert units[1].endswith("- DELETE /users/{id}: remove a user\nDelete is permanent.")
+
+def test_clock_counts_prefill_from_each_begin_to_the_first_token(monkeypatch):
+    now = iter([0.0, 1.0, 3.0, 10.0, 12.0])
+    monkeypatch.setattr("llm.generator.time.perf_counter", lambda: next(now))
+    clock = DecodeClock()
+    ids = SimpleNamespace(shape=(1, 5))
+    clock.begin()
+    clock(ids, None)
+    clock(ids, None)
+    # The next batch's prompt may be longer than the last sequence was
+    clock.begin()
+    clock(SimpleNamespace(shape=(1, 50)), None)
+    assert clock.prefill == 2.0 + 2.0
@@ -0,0 +1,83 @@
+import threading
+
+from llm.incremental import regenerate_incremental
+from templates.writer import MANIFEST_NAME, load_manifest, write_generated_code
+
+def spec(*operations):
+    paths = {}
+    for method, suffix, summary in operations:
+        paths.setdefault(suffix, []).append(
+            f"    {method}:\n      summary: {summary}\n      responses:\n        '200':\n          description: OK\n"
+        )
+    body = "".join(f"  /users{suffix}:\n" + "".join(methods) for suffix, methods in paths.items())
+    return f"openapi: 3.0.0\ninfo:\n  title: Users\n  version: 1.0.0\npaths:\n{body}"
+
+def generate(units, **kwargs):
+    # One UserController per unit, with a method named after the unit's summary
+    code = []
+    for unit in units:
+        summary = unit.splitlines()[-1].split(":", 1)[-1].strip().replace(" ", "_")
+        code.append(
+            "package com.example.api;\n\npublic class UserController {\n"
+            f"    public String {summary}() {{\n        return \"{summary}\";\n    }}\n}}\n"
+        )
+    return code
+
+def controller(output_dir):
+    return (output_dir / "com/example/api/UserController.java").read_text(encoding="utf-8")
+
+def test_shared_controller_keeps_unchanged_operations(tmp_path):
+    input_path, output_dir = tmp_path / "api.yaml", tmp_path / "out"
+    input_path.write_text(spec(("get", "", "list"), ("post", "", "create")), encoding="utf-8")
+    regenerate_incremental(input_path, output_dir, generate=generate)
+    assert "list()" in controller(output_dir) and "create()" in controller(output_dir)
+
+    input_path.write_text(spec(("get", "", "list"), ("post", "", "create_user")), encoding="utf-8")
+    summary = regenerate_incremental(input_path, output_dir, generate=generate)
+    assert (summary["changed"], summary["unchanged"]) == (1, 1)
+    assert "list()" in controller(output_dir)
+    assert "create_user()" in controller(output_dir)
+    assert "create()" not in controller(output_dir)
+
+    # Removing one operation must not delete the file the other still owns
+    input_path.write_text(spec(("get", "", "list")), encoding="utf-8")
+    summary = regenerate_incremental(input_path, output_dir, generate=generate)
+    assert summary["files_deleted"] == 0
+    assert "list()" in controller(output_dir) and "create_user()" not in controller(output_dir)
+
+    input_path.write_text(spec(("get", "/{id}", "one")), encoding="utf-8")
+    regenerate_incremental(input_path, output_dir, generate=generate)
+    assert "one()" in controller(output_dir) and "list()" not in controller(output_dir)
+
+def test_full_run_writes_manifest_and_incremental_replaces_its_files(tmp_path):
+    output_dir = tmp_path / "out"
+    write_generated_code("package a;\n\npublic class Old {\n}\n", output_dir)
+    assert (output_dir / MANIFEST_NAME).exists()
+    assert load_manifest(output_dir)["files"] == ["a/Old.java"]
+
+    input_path = tmp_path / "api.yaml"
+    input_path.write_text(spec(("get", "", "list")), encoding="utf-8")
+    summary = regenerate_incremental(input_path, output_dir, generate=generate)
+    assert summary["files_deleted"] == 1
+    assert not (output_dir / "a/Old.java").exists()
+    assert load_manifest(output_dir)["files"] == ["com/example/api/UserController.java"]
+
+def test_cancelled_run_leaves_files_and_manifest_alone(tmp_path):
+    input_path, output_dir = tmp_path / "api.yaml", tmp_path / "out"
+    input_path.write_text(spec(("get", "", "list")), encoding="utf-8")
+    regenerate_incremental(input_path, output_dir, generate=generate)
+    manifest = (output_dir / MANIFEST_NAME).read_text(encoding="utf-8")
+    before = controller(output_dir)
+
+    cancel_event = threading.Event()
+
+    def cancelled(units, **kwargs):
+        # Cancelled mid-decode: the output is truncated
+        kwargs["cancel_event"].set()
+        return [code[:40] for code in generate(units)]
+
+    input_path.write_text(spec(("get", "", "list_all"), ("post", "", "create")), encoding="utf-8")
+    summary = regenerate_incremental(input_path, output_dir, generate=cancelled, cancel_event=cancel_event)
+    assert summary["cancelled"]
+    assert (output_dir / MANIFEST_NAME).read_text(encoding="utf-8") == manifest
+    assert controller(output_dir) == before
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+import pytest
+
+from llm.jobs import JobManager, QueueFullError
+
+def blocked(release, cancel_event=None):
+    release.wait(5)
+    return "done"
+
+def until_cancelled(cancel_event):
+    # Stands in for a decode that stops at the next token once cancelled
+    cancel_event.wait(5)
+    return "partial"
+
+async def settle(manager, inflight):
+    for _ in range(100):
+        if manager.inflight() == inflight:
+            return
+        await asyncio.sleep(0.01)
+
+def test_full_queue_raises_and_frees_up_when_jobs_finish():
+    async def scenario():
+        manager, release = JobManager(max_workers=1, max_queue=1), threading.Event()
+        running = manager.submit(blocked, release)
+        queued = manager.submit(blocked, release)
+        with pytest.raises(QueueFullError):
+            manager.submit(blocked, release)
+        release.set()
+        await running.wait()
+        await queued.wait()
+        assert (running.status, running.result, queued.status) == ("done", "done", "done")
+        assert manager.inflight() == 0
+        await manager.submit(blocked, release).wait()
+        manager.shutdown()
+
+    asyncio.run(scenario())
+
+def test_cancelled_queued_job_never_runs_and_frees_its_slot():
+    async def scenario():
+        manager, release = JobManager(max_workers=1, max_queue=1), threading.Event()
+        ran = []
+        running = manager.submit(blocked, release)
+        queued = manager.submit(lambda cancel_event: ran.append(True))
+        await asyncio.sleep(0.01)
+        assert manager.cancel(queued.id)
+        await queued.wait()
+        assert queued.status == "cancelled"
+        assert manager.inflight() == 1
+        later = manager.submit(blocked, release)
+        release.set()
+        await running.wait()
+        await later.wait()
+        await asyncio.sleep(0.05)
+        assert not ran
+        manager.shutdown()
+
+    asyncio.run(scenario())
+
+def test_timed_out_job_is_cancelled_and_releases_its_slot():
+    async def scenario():
+        manager = JobManager(max_workers=1, max_queue=0)
+        job = manager.submit(until_cancelled, timeout=0.05)
+        await job.wait()
+        assert job.status == "timeout" and job.cancel_event.is_set()
+        await settle(manager, 0)
+        assert manager.inflight() == 0
+        assert (await manager.submit(until_cancelled, timeout=0.05).wait()).status == "timeout"
+        manager.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,74 @@
+from parsers import openapi
+from parsers.openapi import load_openapi, render_operation
+
+TREE = """openapi: 3.0.0
+info:
+  title: Tree
+  version: 1.0.0
+paths:
+  /nodes:
+    post:
+      summary: create a node
+      requestBody:
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/Node'
+      responses:
+        '201':
+          description: Created
+components:
+  schemas:
+    Node:
+      type: object
+      required: [name]
+      properties:
+        name:
+          type: string
+        parent:
+          $ref: '#/components/schemas/Node'
+        children:
+          type: array
+          items:
+            $ref: '#/components/schemas/Node'
+"""
+
+def test_recursive_ref_resolves_to_the_same_schema(monkeypatch, tmp_path):
+    monkeypatch.setenv("HASHIRA_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "tree.yaml"
+    path.write_text(TREE, encoding="utf-8")
+
+    for _ in range(2):
+        # The second load comes from the pickled parse, which must keep the cycle
+        spec = load_openapi(path)
+        node = spec.schemas["Node"]
+        assert node.properties["parent"] is node
+        assert node.properties["children"].items is node
+        assert spec.operations[0].request_body is node
+        assert "body Node { name: string, parent: Node?, children: array<Node>? }" in render_operation(
+            spec.operations[0], "full"
+        )
+
+def test_parse_cache_is_reused_until_the_file_changes(monkeypatch, tmp_path):
+    monkeypatch.setenv("HASHIRA_CACHE_DIR", str(tmp_path / "cache"))
+    built = []
+
+    def build_spec(data):
+        built.append(data["info"]["title"])
+        return real_build_spec(data)
+
+    real_build_spec = openapi.build_spec
+    monkeypatch.setattr(openapi, "build_spec", build_spec)
+    path = tmp_path / "tree.yaml"
+    path.write_text(TREE, encoding="utf-8")
+
+    assert load_openapi(path).title == "Tree"
+    assert load_openapi(path).title == "Tree"
+    assert built == ["Tree"]
+    assert len(list((tmp_path / "cache" / "openapi").glob("*.pickle"))) == 1
+
+    path.write_text(TREE.replace("title: Tree", "title: Forest"), encoding="utf-8")
+    assert load_openapi(path).title == "Forest"
+    assert built == ["Tree", "Forest"]
+    assert load_openapi(path, use_cache=False).title == "Forest"
+    assert built == ["Tree", "Forest", "Forest"]
@@ -0,0 +1,37 @@
+from llm.stopping import JavaCompleteCriteria, _Sequence
+
+class ByteTokenizer:
+    """One token per byte, so multi-byte characters span tokens"""
+
+    def __init__(self):
+        self.decoded = 0
+
+    def encode(self, text):
+        return list(text.encode("utf-8"))
+
+    def decode(self, ids, skip_special_tokens=True):
+        self.decoded += len(ids)
+        return bytes(ids).decode("utf-8", errors="replace")
+
+def stop_step(criteria, ids):
+    sequence = _Sequence(criteria.max_new_tokens)
+    for step in range(1, len(ids) + 1):
+        if criteria._complete(sequence, ids[:step]):
+            return step
+    return None
+
+def test_stops_at_prose_after_the_last_type_and_decodes_incrementally():
+    tokenizer = ByteTokenizer()
+    code = 'public class A {\n    String s = "é}";\n}\n\nThis class does things.\n'
+    ids = tokenizer.encode(code + "And more prose after it.\n")
+    criteria = JavaCompleteCriteria(tokenizer, 1000)
+    step = stop_step(criteria, ids)
+    assert step is not None and len(code.encode("utf-8")) <= step < len(ids)
+    # Each step decodes a few tokens, not the whole sequence again
+    assert tokenizer.decoded < 4 * step
+
+def test_body_mode_stops_at_the_closing_brace():
+    tokenizer = ByteTokenizer()
+    body = "if (x) {\n    return \"}\";\n}\nreturn y;\n}"
+    criteria = JavaCompleteCriteria(tokenizer, 1000, mode="body")
+    assert stop_step(criteria, tokenizer.encode(body + "\n\n}\n")) == len(body.encode("utf-8")) + 2
@@ -0,0 +1,8 @@
+from pathlib import Path
+
+from parsers.word import parse_word_doc
+
+SAMPLE_DOC = Path(__file__).parent / "sample_doc.docx"
+
+def test_sample_doc_is_a_real_docx():
+    assert parse_word_doc(SAMPLE_DOC).strip() == "Word API Spec:\n- GET /greet: Returns a greeting message"
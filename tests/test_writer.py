@@ -0,0 +1,83 @@
+from benchmarks.synthetic import StubPipeline
+from llm import generator
+from templates.writer import JavaTypeSplitter, MemorySink, write_generated_code
+
+class ResourcePipeline(StubPipeline):
+    """Answers every unit with a controller named after its resource, as a
+    model does for each operation on the same path"""
+
+    def _complete(self, prompt):
+        operations = [line.strip() for line in prompt.splitlines() if line.startswith("- ") and "/" in line]
+        methods = "".join(
+            f'    @{operation.split()[1].title()}Mapping("/users")\n'
+            f'    public ResponseEntity<String> {operation.split()[1].lower()}Users() {{\n'
+            f'        return ResponseEntity.ok("{{}}");\n'
+            f'    }}\n'
+            for operation in operations
+        )
+        return (
+            "package com.example.api;\n\n@RestController\npublic class UserController {\n"
+            f"    private final UserService userService;\n\n{methods}}}\n"
+        )
+
+API = """OpenAPI Spec:
+- GET /users: list users
+- POST /users: create a user
+"""
+
+def test_operations_on_one_path_share_a_controller(monkeypatch, tmp_path):
+    monkeypatch.setenv("HASHIRA_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(generator, "_pipe", None)
+    monkeypatch.setattr(generator, "_model_name", None)
+    generator.set_pipeline(ResourcePipeline(), "stub")
+
+    code = generator.generate_code_chunked(API, batch_size=1, group_by="operation", use_cache=False)
+    assert code.count("public class UserController") == 2
+
+    sink = MemorySink()
+    assert write_generated_code(code, sink) == ["com/example/api/UserController.java"]
+    source = sink.read("com/example/api/UserController.java")
+    assert "getUsers()" in source
+    assert "postUsers()" in source
+    assert source.count("private final UserService userService;") == 1
+    assert source.count("{") == source.count("}")
+
+def test_repeated_member_is_not_duplicated():
+    unit = "package a;\n\npublic class A {\n    public int x() {\n        return 1;\n    }\n}\n"
+    sink = MemorySink()
+    write_generated_code(unit + "\n" + unit, sink)
+    assert sink.read("a/A.java").count("public int x()") == 1
+
+def test_imports_stay_with_their_package_section():
+    code = (
+        "package com.example.api;\n\nimport org.springframework.web.bind.annotation.RestController;\n\n"
+        "@RestController\npublic class UserController {\n}\n\n"
+        "package com.example.model;\n\nimport java.time.Instant;\n\npublic class User {\n    private Instant created;\n}\n\n"
+        "import java.util.List;\n\npublic class Page {\n    private List<User> items;\n}\n"
+    )
+    sink = MemorySink()
+    write_generated_code(code, sink)
+    assert "RestController;" in sink.read("com/example/api/UserController.java")
+    assert "java.time" not in sink.read("com/example/api/UserController.java")
+    user = sink.read("com/example/model/User.java")
+    assert "import java.time.Instant;" in user and "springframework" not in user
+    page = sink.read("com/example/model/Page.java")
+    assert page.startswith("package com.example.model;\n\nimport java.util.List;\n\npublic class Page")
+
+ANNOTATED = 'package a;\n@SuppressWarnings({"unchecked"})\npublic class B { }'
+
+def test_annotation_array_braces_stay_with_the_type():
+    sink = MemorySink()
+    assert write_generated_code(ANNOTATED, sink) == ["a/B.java"]
+    assert '@SuppressWarnings({"unchecked"})\npublic class B { }' in sink.read("a/B.java")
+
+def test_annotation_array_braces_stay_with_the_type_when_streamed():
+    for size in (1, 2, 5):
+        splitter = JavaTypeSplitter()
+        types = []
+        for i in range(0, len(ANNOTATED), size):
+            types += splitter.feed(ANNOTATED[i:i + size])
+        types += splitter.close()
+        assert [(t.package, t.name, t.source) for t in types] == [
+            ("a", "B", '@SuppressWarnings({"unchecked"})\npublic class B { }')
+        ]